@@ -1,10 +1,11 @@
-from flask import Flask, render_template, request, jsonify, redirect, send_from_directory
+from flask import Flask, render_template, request, jsonify, redirect
 import pandas as pd
-import joblib
 from app_module.utils.xai import explain_model_prediction, explain_model_prediction_lime
 from app_module.utils.report import generate_professional_pdf
-from app_module.utils.database import db
+from app_module.utils.database import get_db
+from app_module.utils.models import registry
 from app_module.utils.certificate import generate_certificate_from_result
+from app_module.utils.certificate_cache import certificate_url
 import plotly.graph_objects as go
 import os
 from datetime import datetime
@@ -27,12 +28,9 @@ try:
 except Exception:
     pass
 
-MODELS = {
-    "log_reg": joblib.load("models/pipeline_logistic_regression.pkl"),
-    "random_forest": joblib.load("models/pipeline_random_forest.pkl"),
-    "gradient_boosting": joblib.load("models/pipeline_gradient_boosting.pkl"),
-    "knn": joblib.load("models/pipeline_knn.pkl")
-}
+# Registre partagé avec les blueprints: chaque modèle est chargé une fois, à la première utilisation
+# (avec gunicorn --preload, par le master avant le fork: voir gunicorn.conf.py)
+MODELS = registry
 
 def prepare_input(form):
     data = {
@@ -89,7 +87,7 @@ def api_predict():
             model_choice = form.get('model_choice', 'log_reg')
             df_input = prepare_input(form)
 
-        pipeline = MODELS.get(model_choice, MODELS['log_reg'])
+        pipeline = MODELS.get(model_choice) or MODELS['log_reg']
 
         pred = pipeline.predict(df_input)[0]
         prob = pipeline.predict_proba(df_input)[0][1] if hasattr(pipeline, "predict_proba") else 0
@@ -117,6 +115,7 @@ def api_predict():
             user_ip = request.remote_addr
             
             # Sauvegarder le test
+            db = get_db()
             test_id = db.save_test(
                 model_used=model_choice,
                 prediction=int(pred),
@@ -127,23 +126,23 @@ def api_predict():
                 user_ip=user_ip
             )
             
-            # Générer le certificat
-            test_data = {
-                'test_id': test_id,
-                'prediction': int(pred),
-                'probability': float(prob),
-                'model': model_choice,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'input_features': input_features
-            }
-            certificate_path = generate_certificate_from_result(test_data)
-            
-            # Mettre à jour le test avec le chemin du certificat
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('UPDATE tests SET certificate_path = ? WHERE id = ?', (certificate_path, test_id))
-            conn.commit()
-            conn.close()
+            if Config.CERTIFICATE_MODE == 'lazy':
+                # Rendu différé: l'image sera produite au premier téléchargement
+                certificate_path = certificate_url(test_id)
+            else:
+                # Générer le certificat
+                test_data = {
+                    'test_id': test_id,
+                    'prediction': int(pred),
+                    'probability': float(prob),
+                    'model': model_choice,
+                    'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'input_features': input_features
+                }
+                certificate_path = generate_certificate_from_result(test_data)
+                
+                # Mettre à jour le test avec le chemin du certificat
+                db.update_certificate_path(test_id, certificate_path)
             
         except Exception as e:
             # Ne pas faire échouer la requête si la sauvegarde échoue
@@ -182,7 +181,7 @@ def report():
             model_choice = form.get('model_choice', 'log_reg')
             df_input = prepare_input(form)
 
-        pipeline = MODELS.get(model_choice, MODELS['log_reg'])
+        pipeline = MODELS.get(model_choice) or MODELS['log_reg']
 
         # predict
         pred = pipeline.predict(df_input)[0]
@@ -261,9 +260,10 @@ def report():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-# Enregistrer le dashboard modular
-from app_module.routes.dashboard import dashboard_bp
-dashboard_bp(app)
+# Dashboards Dash (/dashboard/, /dashboard/live/): construits au premier accès ou par le
+# préchargement des workers (gunicorn.conf.py), pas à l'import
+from app_module.routes.dash_mount import mount_dashboards
+mount_dashboards(app)
 
 # Enregistrer les routes admin
 from app_module.routes.admin import admin_bp
@@ -273,12 +273,25 @@ app.register_blueprint(admin_bp)
 from app_module.routes.image_prediction import image_bp
 app.register_blueprint(image_bp)
 
-# Route pour servir les certificats (public, pour téléchargement)
-@app.route('/certificates/<path:filename>')
-def serve_certificate(filename):
-    """Servir les certificats (accessible publiquement pour téléchargement)"""
-    cert_dir = os.path.join(Config.BASE_DIR, 'data', 'certificates')
-    return send_from_directory(cert_dir, filename)
+# Enregistrer l'API des statistiques du dashboard
+from app_module.routes.stats import stats_bp
+app.register_blueprint(stats_bp)
+
+# Enregistrer l'API des modèles (importance globale des variables)
+from app_module.routes.models import models_bp
+app.register_blueprint(models_bp)
+
+# Enregistrer les routes des certificats (public, pour téléchargement)
+from app_module.routes.certificates import certificates_bp
+app.register_blueprint(certificates_bp)
+
+# Enregistrer les commandes CLI de maintenance
+from app_module.commands import register_commands
+register_commands(app)
+
+# Nettoyage périodique des certificats (si CERTIFICATE_GC_INTERVAL > 0)
+from app_module.utils.certificate_maintenance import start_certificate_sweeper
+start_certificate_sweeper()
 
 # Redirection pour /dashboard sans slash final
 @app.route('/dashboard')
@@ -23,11 +23,15 @@ def create_app(config_name=None):
     
     # Enregistrer les blueprints
     from app_module.routes.prediction import prediction_bp
-    from app_module.routes.dashboard import dashboard_bp
-    from app_module.routes.health import health_bp
+    from app_module.routes import health_bp
+    from app_module.routes.stats import stats_bp
+    from app_module.routes.models import models_bp
+    from app_module.routes.dash_mount import mount_dashboards
     
     app.register_blueprint(prediction_bp)
     app.register_blueprint(health_bp)
-    dashboard_bp(app)  # Dash intégré
+    app.register_blueprint(stats_bp)
+    app.register_blueprint(models_bp)
+    mount_dashboards(app)  # Dash intégré, construit au premier accès
     
     return app
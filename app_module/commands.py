@@ -0,0 +1,240 @@
+"""
+Commandes CLI de maintenance (flask --app app <groupe> <commande>)
+"""
+import sys
+import click
+from flask.cli import AppGroup
+from app_module.utils.certificate import CERTIFICATE_FORMATS
+from app_module.utils.export import EXPORT_FORMATS
+
+certificates_cli = AppGroup('certificates', help='Maintenance des certificats')
+db_cli = AppGroup('db', help='Maintenance de la base des tests')
+dataset_cli = AppGroup('dataset', help='Maintenance du dataset')
+workers_cli = AppGroup('workers', help='Processus gunicorn')
+models_cli = AppGroup('models', help='Modèles de prédiction')
+
+
+@certificates_cli.command('migrate')
+@click.option('--format', 'fmt', type=click.Choice(sorted(CERTIFICATE_FORMATS)), default=None,
+              help='Format cible (par défaut: CERTIFICATE_FORMAT)')
+@click.option('--batch-size', default=200, show_default=True, help='Nombre de tests traités par lot')
+@click.option('--dry-run', is_flag=True, help='Afficher ce qui serait migré sans rien modifier')
+@click.option('--force', is_flag=True, help='Réencoder aussi les certificats déjà au format cible (ex. après un changement de niveau de compression)')
+def migrate_certificates_command(fmt, batch_size, dry_run, force):
+    """Réencoder les certificats et les ranger dans l'arborescence partitionnée"""
+    from app_module.utils.database import get_db
+    from app_module.utils.certificate_maintenance import migrate_certificates
+
+    def report(stats):
+        click.echo(f"[certificates] {stats['scanned']} examinés, {stats['migrated']} migrés, "
+                   f"{stats['skipped']} à jour, {stats['missing']} manquants")
+
+    stats = migrate_certificates(get_db(), fmt=fmt, batch_size=batch_size, dry_run=dry_run, force=force,
+                                 progress=report)
+    if stats['bytes_before'] and not dry_run:
+        click.echo(f"[certificates] {stats['bytes_before']} -> {stats['bytes_after']} octets")
+
+
+@certificates_cli.command('gc')
+@click.option('--max-bytes', type=int, default=None, help='Volume maximal (par défaut: CERTIFICATE_MAX_BYTES)')
+@click.option('--max-age-days', type=int, default=None, help='Âge maximal (par défaut: CERTIFICATE_MAX_AGE_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='Taille des lots (par défaut: CERTIFICATE_GC_BATCH_SIZE)')
+@click.option('--dry-run', is_flag=True, help='Afficher ce qui serait supprimé sans rien modifier')
+def gc_certificates_command(max_bytes, max_age_days, batch_size, dry_run):
+    """Supprimer les certificats orphelins ou hors budget et nettoyer les chemins pendants"""
+    from app_module.utils.database import get_db
+    from app_module.utils.certificate_maintenance import sweep_certificates
+
+    def report(phase, stats):
+        click.echo(f"[certificates:{phase}] {stats['dangling_cleared']} chemins pendants, "
+                   f"{stats['orphans_removed']} orphelins, {stats['expired_removed']} expirés, "
+                   f"{stats['budget_removed']} hors budget, {stats['bytes_freed']} octets libérés")
+
+    stats = sweep_certificates(get_db(), max_bytes=max_bytes, max_age_days=max_age_days, batch_size=batch_size,
+                               dry_run=dry_run, progress=report)
+    click.echo(f"[certificates] Terminé: {stats['bytes_remaining']} octets restants")
+
+
+@db_cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recalculer les compteurs agrégés (tests_summary) à partir de la table tests"""
+    from app_module.utils.database import get_db
+
+    total = get_db().rebuild_summary()
+    click.echo(f"[db] Compteurs reconstruits: {total} tests")
+
+
+@db_cli.command('compact')
+@click.option('--to-json', is_flag=True, help='Revenir à l\'encodage JSON')
+@click.option('--batch-size', default=500, show_default=True, help='Nombre de tests réécrits par transaction')
+@click.option('--vacuum', is_flag=True, help='Exécuter VACUUM ensuite pour rendre l\'espace libéré')
+def compact_command(to_json, batch_size, vacuum):
+    """Convertir input_features / explanation des tests existants (JSON <-> binaire compact)"""
+    from app_module.utils.database import get_db
+
+    db = get_db()
+    if not db.supports_compact_encoding:
+        raise click.ClickException("Encodage compact propre au backend SQLite: PostgreSQL stocke déjà "
+                                   "input_features / explanation en JSONB (binaire, compressé par TOAST)")
+
+    def report(last_id, converted):
+        click.echo(f"[db] Jusqu'à l'id {last_id}: {converted} tests convertis")
+
+    converted = db.recode_storage(compact=not to_json, batch_size=batch_size, progress=report)
+    click.echo(f"[db] Terminé: {converted} tests convertis")
+    if vacuum:
+        db.get_connection().execute('VACUUM')
+        click.echo("[db] VACUUM terminé")
+
+
+@db_cli.command('export')
+@click.option('--format', 'fmt', type=click.Choice(sorted(EXPORT_FORMATS)), default='csv', show_default=True)
+@click.option('--output', '-o', default='-', help='Fichier de sortie (- pour la sortie standard)')
+@click.option('--model', default=None, help='Filtrer sur un modèle')
+@click.option('--outcome', type=click.Choice(['0', '1']), default=None, help='Filtrer sur la prédiction')
+@click.option('--date-from', type=click.DateTime(['%Y-%m-%d']), default=None, help='Date de début incluse')
+@click.option('--date-to', type=click.DateTime(['%Y-%m-%d']), default=None, help='Date de fin incluse')
+@click.option('--chunk-size', default=5000, show_default=True, help='Nombre de tests lus par requête')
+def export_command(fmt, output, model, outcome, date_from, date_to, chunk_size):
+    """Exporter la table tests en flux (CSV ou Parquet), variables d'entrée en colonnes"""
+    from app_module.utils.database import get_db
+    from app_module.utils.export import export_tests
+
+    filters = {
+        'model': model,
+        'prediction': int(outcome) if outcome is not None else None,
+        'date_from': date_from.strftime('%Y-%m-%d') if date_from else None,
+        'date_to': date_to.strftime('%Y-%m-%d') if date_to else None,
+    }
+
+    def report(exported):
+        click.echo(f"[db] {exported} tests exportés", err=True)
+
+    stream = export_tests(get_db(), fmt=fmt, chunk_size=chunk_size, progress=report, **filters)
+    binary = fmt == 'parquet'
+    if output == '-':
+        target = sys.stdout.buffer if binary else sys.stdout
+        for part in stream:
+            target.write(part)
+        target.flush()
+    else:
+        with open(output, 'wb' if binary else 'w', newline=None if binary else '') as target:
+            for part in stream:
+                target.write(part)
+
+
+@db_cli.command('archive')
+@click.option('--older-than-days', type=int, default=None,
+              help='Âge minimal des tests archivés (par défaut: DB_ARCHIVE_AFTER_DAYS)')
+@click.option('--batch-size', default=1000, show_default=True, help='Nombre de tests déplacés par transaction')
+@click.option('--no-vacuum', is_flag=True, help='Ne pas exécuter VACUUM sur la table courante ensuite')
+@click.option('--dry-run', is_flag=True, help='Afficher ce qui serait archivé sans rien modifier')
+def archive_command(older_than_days, batch_size, no_vacuum, dry_run):
+    """Déplacer les tests anciens vers les archives (SQLite: fichiers mensuels; PostgreSQL: table tests_archive)"""
+    from app_module.utils.database import get_db
+
+    def report(stats):
+        click.echo(f"[db] {stats['archived']} tests archivés ({', '.join(stats['months'])})")
+
+    stats = get_db().archive_tests(older_than_days=older_than_days, batch_size=batch_size,
+                                   vacuum=not no_vacuum, dry_run=dry_run, progress=report)
+    prefix = "[db] À archiver" if dry_run else "[db] Terminé"
+    click.echo(f"{prefix}: {stats['archived']} tests antérieurs au {stats['cutoff']}")
+
+
+@dataset_cli.command('build-cache')
+@click.option('--force', is_flag=True, help='Reconstruire même si le cache correspond au CSV')
+def build_dataset_cache_command(force):
+    """Construire la copie binaire en colonnes de data/dataset.csv"""
+    from app_module.config.settings import Config
+    from app_module.utils.dataset_cache import build_dataset_cache, ensure_dataset_cache
+
+    if force:
+        meta = build_dataset_cache(Config.DATASET_PATH, Config.DATASET_CACHE_DIR)
+    else:
+        meta = ensure_dataset_cache(Config.DATASET_PATH, Config.DATASET_CACHE_DIR)
+    categorical = sum(1 for column in meta['columns'] if column['kind'] == 'category')
+    click.echo(f"[dataset] {meta['rows']} lignes, {len(meta['columns'])} colonnes dont {categorical} catégorielles "
+               f"({meta['sha256'][:16]}) -> {Config.DATASET_CACHE_DIR}")
+
+
+@workers_cli.command('memory')
+@click.option('--pid', type=int, default=None, help='Pid du master gunicorn (par défaut: GUNICORN_PIDFILE)')
+def workers_memory_command(pid):
+    """Mémoire du master et des workers gunicorn: RSS, PSS et mémoire partagée économisée"""
+    from app_module.config.settings import Config
+    from app_module.utils.memory import memory_report
+
+    if pid is None:
+        try:
+            with open(Config.GUNICORN_PIDFILE) as f:
+                pid = int(f.read().strip())
+        except (OSError, ValueError):
+            raise click.ClickException(f"Pid du master introuvable ({Config.GUNICORN_PIDFILE}), utiliser --pid")
+
+    report = memory_report(pid)
+    if not report['processes']:
+        raise click.ClickException(f"Mémoire du processus {pid} illisible (/proc/{pid}/smaps_rollup)")
+    for process in report['processes']:
+        click.echo(f"{process['role']:<7} {process['pid']:>7}  rss={process['Rss'] / 1024:8.1f}Mo  "
+                   f"pss={process['Pss'] / 1024:8.1f}Mo  partagé={process['Shared'] / 1024:8.1f}Mo  "
+                   f"privé={process['Private'] / 1024:8.1f}Mo")
+    click.echo(f"[workers] Total rss={report['total_rss_kb'] / 1024:.1f}Mo, pss={report['total_pss_kb'] / 1024:.1f}Mo; "
+               f"économisé {report['saved_kb'] / 1024:.1f}Mo ({report['saved_per_worker_kb'] / 1024:.1f}Mo par worker)")
+
+
+@models_cli.command('info')
+def models_info_command():
+    """Charger les modèles du registre et afficher somme SHA-256, durée de chargement et mémoire"""
+    from app_module.utils.models import registry
+
+    registry.load_all()
+    for name, info in registry.info().items():
+        if not info['available']:
+            click.echo(f"{name:<18} absent ({info['path']})")
+            continue
+        rss = f"{info['rss_kb'] / 1024:.1f}Mo" if info.get('rss_kb') is not None else 'n/d'
+        click.echo(f"{name:<18} {info['sha256'][:16]}  {info['size'] / 1024:9.1f}Ko  "
+                   f"{info['load_seconds']:6.2f}s  rss +{rss}")
+
+
+@models_cli.command('score')
+@click.option('--force', is_flag=True, help='Recalculer même les modèles dont les scores sont à jour')
+@click.option('--workers', type=int, default=None, help='Nombre de processus (par défaut: SCORING_WORKERS ou nombre de CPU)')
+@click.option('--chunk-rows', type=int, default=None, help='Lignes par bloc (par défaut: SCORING_CHUNK_ROWS)')
+def models_score_command(force, workers, chunk_rows):
+    """Probabilités de chaque modèle sur tout le dataset (couche « risque prédit » du dashboard)"""
+    from app_module.utils.scoring import score_dataset
+
+    def report(done, total):
+        click.echo(f"[models] {done}/{total} lignes", err=True)
+
+    result = score_dataset(workers=workers, chunk_rows=chunk_rows, force=force, progress=report)
+    if result['scored']:
+        click.echo(f"[models] Scores calculés sur {result['rows']} lignes: {', '.join(result['scored'])}")
+    if result['skipped']:
+        click.echo(f"[models] À jour (modèle et dataset inchangés): {', '.join(result['skipped'])}")
+
+
+@models_cli.command('importance')
+@click.option('--force', is_flag=True, help='Recalculer même les modèles dont l\'artefact est à jour')
+@click.option('--workers', type=int, default=None, help='Nombre de processus (par défaut: SCORING_WORKERS ou nombre de CPU)')
+@click.option('--sample-size', type=int, default=None, help='Lignes de l\'échantillon stratifié (par défaut: IMPORTANCE_SAMPLE_SIZE)')
+def models_importance_command(force, workers, sample_size):
+    """Importance globale des variables (moyenne des |SHAP|) de chaque modèle, servie par /api/models/<nom>/importance"""
+    from app_module.utils.importance import compute_importance
+
+    result = compute_importance(workers=workers, sample_size=sample_size, force=force)
+    if result['computed']:
+        click.echo(f"[models] Importance calculée sur {result['sample_size']} lignes: {', '.join(result['computed'])}")
+    if result['skipped']:
+        click.echo(f"[models] À jour (modèle et dataset inchangés): {', '.join(result['skipped'])}")
+
+
+def register_commands(app):
+    """Enregistrer les groupes de commandes sur l'application Flask"""
+    app.cli.add_command(certificates_cli)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(dataset_cli)
+    app.cli.add_command(workers_cli)
+    app.cli.add_command(models_cli)
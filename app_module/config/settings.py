@@ -25,10 +25,99 @@ class Config:
         "knn": os.path.join(MODELS_DIR, "pipeline_knn.pkl")
     }
     
+    # Chargement des modèles joblib en mémoire mappée ('r'; '' pour désactiver)
+    MODEL_MMAP_MODE = os.getenv('MODEL_MMAP_MODE', 'r')
+    
+    # Calculs hors ligne sur le dataset (flask models score / importance): processus (0 = nombre de CPU)
+    SCORING_WORKERS = int(os.getenv('SCORING_WORKERS', 0))
+    # Probabilités de chaque modèle: lignes par bloc
+    SCORING_CHUNK_ROWS = int(os.getenv('SCORING_CHUNK_ROWS', 50000))
+    # Importance globale (moyenne des |SHAP|): artefacts versionnés, taille de l'échantillon stratifié et du fond SHAP
+    IMPORTANCE_DIR = os.getenv('IMPORTANCE_DIR', os.path.join(MODELS_DIR, 'importance'))
+    IMPORTANCE_SAMPLE_SIZE = int(os.getenv('IMPORTANCE_SAMPLE_SIZE', 1000))
+    IMPORTANCE_BACKGROUND_SIZE = int(os.getenv('IMPORTANCE_BACKGROUND_SIZE', 100))
+    
     # Dataset
     DATASET_PATH = os.path.join(DATA_DIR, 'dataset.csv')
+    # Copie binaire en colonnes du dataset (reconstruite quand le CSV change)
+    DATASET_CACHE_DIR = os.getenv('DATASET_CACHE_DIR', os.path.join(DATA_DIR, 'cache', 'dataset'))
+    # Taille des blocs de lecture du CSV et de la copie en colonnes (lignes)
+    DATASET_CHUNK_ROWS = int(os.getenv('DATASET_CHUNK_ROWS', 250000))
+    # Au-delà de ce nombre de lignes, le dashboard agrège la copie bloc par bloc sans DataFrame complet
+    DASHBOARD_OUT_OF_CORE_ROWS = int(os.getenv('DASHBOARD_OUT_OF_CORE_ROWS', 1000000))
+    
+    # Mémoïsation des callbacks du dashboard: LRU par worker + cache SQLite partagé ('' = LRU seul)
+    DASHBOARD_CACHE_PATH = os.getenv('DASHBOARD_CACHE_PATH', os.path.join(DATA_DIR, 'cache', 'dashboard.db'))
+    DASHBOARD_CACHE_SIZE = int(os.getenv('DASHBOARD_CACHE_SIZE', 512))
+    DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv('DASHBOARD_CACHE_MAX_ENTRIES', 20000))
+    
+    # Durée de validité des statistiques de /api/dashboard/stats (secondes)
+    DASHBOARD_STATS_TTL = int(os.getenv('DASHBOARD_STATS_TTL', 30))
+    
+    # Construction des dashboards Dash en arrière-plan au démarrage des workers (sinon au premier accès)
+    DASHBOARD_WARMUP = os.getenv('DASHBOARD_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+    
+    # Tableau de suivi des tests (/dashboard/live/): période de rafraîchissement (ms) et jours affichés
+    LIVE_DASHBOARD_INTERVAL_MS = int(os.getenv('LIVE_DASHBOARD_INTERVAL_MS', 10000))
+    LIVE_DASHBOARD_DAYS = int(os.getenv('LIVE_DASHBOARD_DAYS', 30))
+    
+    # Backend de stockage des tests: 'sqlite' (fichier local) ou 'postgresql' (partagé entre conteneurs)
+    DB_BACKEND = os.getenv('DB_BACKEND', 'sqlite').lower()
+    DATABASE_URL = os.getenv('DATABASE_URL', '')
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', 1))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', 10))
+    
+    # Base de données SQLite (connexions persistantes par thread)
+    DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+    DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+    DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', 16384))
+    DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    # Écriture groupée (write-behind): un thread insère les tests par lots
+    DB_WRITE_BEHIND = os.getenv('DB_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+    DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', 100))
+    DB_WRITE_QUEUE_SIZE = int(os.getenv('DB_WRITE_QUEUE_SIZE', 1000))
+    # Fenêtre d'attente pour regrouper les écritures concurrentes
+    DB_WRITE_MAX_DELAY_MS = int(os.getenv('DB_WRITE_MAX_DELAY_MS', 5))
+    # Contre-pression: délai maximal pour entrer dans une file pleine
+    DB_WRITE_QUEUE_TIMEOUT = float(os.getenv('DB_WRITE_QUEUE_TIMEOUT', 2))
+    DB_WRITE_RESULT_TIMEOUT = float(os.getenv('DB_WRITE_RESULT_TIMEOUT', 30))
+    # Archivage mensuel des tests anciens (flask db archive); '' = data/archive à côté de la base
+    DB_ARCHIVE_DIR = os.getenv('DB_ARCHIVE_DIR', '')
+    DB_ARCHIVE_AFTER_DAYS = int(os.getenv('DB_ARCHIVE_AFTER_DAYS', 365))
+    # Stocker input_features / explanation en binaire compact plutôt qu'en JSON
+    DB_COMPACT_ENCODING = os.getenv('DB_COMPACT_ENCODING', 'false').lower() in ('1', 'true', 'yes')
+    
+    # Certificats
+    # 'eager': une image PNG est écrite à chaque prédiction
+    # 'lazy': l'image est rendue à la première demande puis mise en cache
+    CERTIFICATES_DIR = os.path.join(DATA_DIR, 'certificates')
+    CERTIFICATE_MODE = os.getenv('CERTIFICATE_MODE', 'eager')
+    CERTIFICATE_CACHE_DIR = os.getenv('CERTIFICATE_CACHE_DIR', os.path.join(DATA_DIR, 'cache', 'certificates'))
+    CERTIFICATE_CACHE_MAX_FILES = int(os.getenv('CERTIFICATE_CACHE_MAX_FILES', 500))
+    CERTIFICATE_CACHE_MAX_BYTES = int(os.getenv('CERTIFICATE_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+    CERTIFICATE_HTTP_MAX_AGE = int(os.getenv('CERTIFICATE_HTTP_MAX_AGE', 365 * 24 * 3600))
+    # Encodage: 'png', 'png-palette' ou 'webp'
+    CERTIFICATE_FORMAT = os.getenv('CERTIFICATE_FORMAT', 'png')
+    CERTIFICATE_PNG_COMPRESS_LEVEL = int(os.getenv('CERTIFICATE_PNG_COMPRESS_LEVEL', 9))
+    CERTIFICATE_PALETTE_COLORS = int(os.getenv('CERTIFICATE_PALETTE_COLORS', 64))
+    CERTIFICATE_WEBP_QUALITY = int(os.getenv('CERTIFICATE_WEBP_QUALITY', 80))
+    # Largeur des miniatures pour la liste admin (0 = désactivé)
+    CERTIFICATE_THUMBNAIL_WIDTH = int(os.getenv('CERTIFICATE_THUMBNAIL_WIDTH', 0))
+    # Nombre de niveaux de sous-répertoires (2 caractères hexadécimaux par niveau)
+    CERTIFICATE_SHARD_DEPTH = int(os.getenv('CERTIFICATE_SHARD_DEPTH', 2))
+    # Rétention (0 = pas de limite)
+    CERTIFICATE_MAX_BYTES = int(os.getenv('CERTIFICATE_MAX_BYTES', 0))
+    CERTIFICATE_MAX_AGE_DAYS = int(os.getenv('CERTIFICATE_MAX_AGE_DAYS', 0))
+    # Nettoyage en arrière-plan toutes les N secondes (0 = désactivé)
+    CERTIFICATE_GC_INTERVAL = int(os.getenv('CERTIFICATE_GC_INTERVAL', 0))
+    CERTIFICATE_GC_BATCH_SIZE = int(os.getenv('CERTIFICATE_GC_BATCH_SIZE', 500))
+    # Un fichier non référencé plus récent que ce délai peut être en cours d'enregistrement
+    CERTIFICATE_GC_GRACE_SECONDS = int(os.getenv('CERTIFICATE_GC_GRACE_SECONDS', 3600))
     
     # Server
+    # Fichier pid du master gunicorn (gunicorn.conf.py, flask workers memory)
+    GUNICORN_PIDFILE = os.getenv('GUNICORN_PIDFILE', '/tmp/smartcheck-gunicorn.pid')
     HOST = os.getenv('FLASK_HOST', '0.0.0.0')
     PORT = int(os.getenv('FLASK_PORT', 5000))
 
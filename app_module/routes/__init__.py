@@ -2,7 +2,7 @@
 Routes pour la santé et info
 """
 from flask import Blueprint, jsonify
-from app_module.utils.models import ModelManager
+from app_module.utils.models import registry
 from app_module.utils import APIResponse, get_logger
 
 health_bp = Blueprint('health', __name__, url_prefix='/api')
@@ -13,11 +13,12 @@ logger = get_logger(__name__)
 def health_check():
     """Vérifier l'état de l'application"""
     try:
-        models = ModelManager.get_all_models()
+        # Ne charge aucun modèle: les modèles sont chargés à la première prédiction
         return jsonify(APIResponse.success({
             'status': 'healthy',
-            'models_loaded': len(models),
-            'available_models': list(models.keys())
+            'models_loaded': len(registry.loaded()),
+            'available_models': registry.available(),
+            'models': registry.public_info()
         })), 200
     except Exception as e:
         logger.error(f"Erreur health check: {e}")
@@ -33,6 +34,7 @@ def app_info():
         'endpoints': {
             'prediction': '/api/prediction',
             'health': '/api/health',
+            'models': '/api/models/<name>/importance',
             'dashboard': '/dashboard/'
         }
     })), 200
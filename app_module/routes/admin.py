@@ -1,19 +1,13 @@
 """
 Routes admin pour voir les tests enregistrés (protégé par mot de passe)
 """
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for, send_from_directory
-from app_module.utils.database import db
+from flask import Blueprint, Response, render_template, request, jsonify, session, redirect, url_for, send_from_directory
+from app_module.utils.database import get_db
 import os
+from datetime import datetime
 from app_module.config.settings import Config
-
-# S'assurer que la base de données est initialisée
-try:
-    # Vérifier que db est bien initialisé
-    if not hasattr(db, 'db_path'):
-        from app_module.utils.database import TestDatabase
-        db = TestDatabase()
-except Exception as e:
-    print(f"Erreur initialisation DB dans admin: {e}")
+from app_module.utils.certificate import certificate_abspath, thumbnail_path
+from app_module.utils.export import EXPORT_FORMATS, export_tests, parquet_available
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -48,6 +42,49 @@ def admin_logout():
     return redirect(url_for('admin.admin_login'))
 
 
+def _list_filters():
+    """Lire et valider les filtres de la liste depuis la query string"""
+    filters = {}
+    
+    model = request.args.get('model')
+    if model in Config.MODELS:
+        filters['model'] = model
+    
+    outcome = request.args.get('outcome')
+    if outcome in ('0', '1'):
+        filters['prediction'] = int(outcome)
+    
+    for key in ('date_from', 'date_to'):
+        value = request.args.get(key, '')
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+            filters[key] = value
+        except ValueError:
+            pass
+    
+    # Les archives mensuelles ne sont lues que sur demande
+    if request.args.get('archive') == '1':
+        filters['include_archive'] = True
+    
+    return filters
+
+
+# Nom du paramètre d'URL correspondant à chaque filtre
+_FILTER_ARGS = {'prediction': 'outcome', 'include_archive': 'archive'}
+
+
+def _fetch_page(per_page):
+    """Page de tests pour le curseur et les filtres de la requête"""
+    filters = _list_filters()
+    page = get_db().get_tests_page(
+        limit=per_page,
+        cursor=request.args.get('cursor'),
+        direction=request.args.get('direction', 'next'),
+        **filters
+    )
+    return page, filters
+
+
 @admin_bp.route('/')
 @admin_bp.route('/tests')
 def tests_list():
@@ -56,30 +93,34 @@ def tests_list():
         return redirect(url_for('admin.admin_login'))
     
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = 20
-        offset = (page - 1) * per_page
+        page, filters = _fetch_page(per_page=20)
+        tests = page['tests']
+        db = get_db()
+        total_count = db.get_test_count()
+        risk_count = db.get_risk_count()
         
-        # S'assurer que db est bien initialisé
-        if not hasattr(db, 'get_all_tests'):
-            from app_module.utils.database import TestDatabase
-            db_instance = TestDatabase()
-            tests = db_instance.get_all_tests(limit=per_page, offset=offset)
-            total_count = db_instance.get_test_count()
-        else:
-            tests = db.get_all_tests(limit=per_page, offset=offset)
-            total_count = db.get_test_count()
-            risk_count = db.get_risk_count()
+        # Miniatures des certificats (si activées et présentes sur disque)
+        if Config.CERTIFICATE_THUMBNAIL_WIDTH > 0:
+            for test in tests:
+                if test.get('certificate_path'):
+                    thumb = thumbnail_path(test['certificate_path'])
+                    if os.path.exists(certificate_abspath(thumb)):
+                        test['thumbnail'] = thumb.split('/', 1)[-1]
         
-        total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 1
+        # Filtres sous forme de paramètres d'URL (conservés dans les liens de pagination)
+        filter_args = {_FILTER_ARGS.get(key, key): value for key, value in filters.items()}
+        if filter_args.get('archive'):
+            filter_args['archive'] = 1
         
         return render_template(
             'admin_tests.html',
             tests=tests,
-            current_page=page,
-            total_pages=total_pages,
+            next_cursor=page['next_cursor'],
+            prev_cursor=page['prev_cursor'],
+            filter_args=filter_args,
+            models=list(Config.MODELS),
             total_count=total_count,
-            risk_count=risk_count if 'risk_count' in locals() else 0
+            risk_count=risk_count
         )
     except Exception as e:
         print(f"Erreur dans tests_list: {e}")
@@ -88,25 +129,70 @@ def tests_list():
         return render_template(
             'admin_tests.html',
             tests=[],
-            current_page=1,
-            total_pages=1,
+            next_cursor=None,
+            prev_cursor=None,
+            filter_args={},
+            models=list(Config.MODELS),
             total_count=0,
             risk_count=0
         )
 
 
+@admin_bp.route('/api/tests')
+def tests_api():
+    """Liste JSON des tests: pagination par curseur et filtres (model, outcome, date_from, date_to)"""
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'error': 'Non authentifié'}), 401
+    
+    per_page = min(request.args.get('limit', 50, type=int), 500)
+    page, filters = _fetch_page(per_page=per_page)
+    return jsonify({
+        'success': True,
+        'tests': page['tests'],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
+        'filters': filters
+    })
+
+
+@admin_bp.route('/export')
+def export_tests_file():
+    """Export en flux des tests filtrés (format=csv|parquet), sans charger la table en mémoire"""
+    if not session.get('admin_logged_in'):
+        return redirect(url_for('admin.admin_login'))
+    
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': f"Format inconnu: {fmt}"}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'success': False, 'error': "L'export Parquet nécessite pyarrow"}), 501
+    
+    extension, mimetype = EXPORT_FORMATS[fmt]
+    filename = f"tests_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    stream = export_tests(get_db(), fmt=fmt, **_list_filters())
+    return Response(
+        stream,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @admin_bp.route('/test/<int:test_id>')
 def test_detail(test_id):
     """Page de détail d'un test spécifique"""
     if not session.get('admin_logged_in'):
         return redirect(url_for('admin.admin_login'))
     
-    test = db.get_test_by_id(test_id)
+    test = get_db().get_test_by_id(test_id, include_archive=request.args.get('archive') == '1')
     
     if not test:
         return render_template('error.html', message='Test non trouvé'), 404
     
-    return render_template('admin_test_detail.html', test=test)
+    return render_template(
+        'admin_test_detail.html',
+        test=test,
+        lazy_certificates=Config.CERTIFICATE_MODE == 'lazy'
+    )
 
 
 @admin_bp.route('/certificates/<path:filename>')
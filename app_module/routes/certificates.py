@@ -0,0 +1,57 @@
+"""
+Routes pour servir les certificats (fichiers existants ou rendu à la demande)
+"""
+from flask import Blueprint, Response, request, session, send_file, send_from_directory, abort
+from app_module.config.settings import Config
+from app_module.utils.database import get_db
+from app_module.utils.certificate import certificate_extension, certificate_mimetype
+from app_module.utils.certificate_cache import get_certificate_cache, certificate_etag, verify_certificate_token
+
+certificates_bp = Blueprint('certificates', __name__, url_prefix='/certificates')
+
+
+@certificates_bp.route('/<int:test_id>')
+def serve_certificate_by_id(test_id):
+    """Rendre le certificat d'un test à la première demande (mode lazy)"""
+    # Les identifiants sont séquentiels: exiger un jeton signé hors session admin
+    if not session.get('admin_logged_in') and not verify_certificate_token(test_id, request.args.get('t')):
+        abort(403)
+
+    # Lien signé explicite: le test peut avoir été archivé depuis
+    test = get_db().get_test_by_id(test_id, include_archive=True)
+    if not test:
+        abort(404)
+
+    etag = certificate_etag(test)
+    if request.if_none_match.contains(etag):
+        # Revalidation: pas besoin de toucher au cache disque
+        response = Response(status=304)
+        response.set_etag(etag)
+        return certificate_response_headers(response)
+
+    path = get_certificate_cache().get_or_render(test)
+    response = send_file(
+        path,
+        mimetype=certificate_mimetype(),
+        download_name=f"certificate_{test_id}.{certificate_extension()}",
+        etag=etag,
+        conditional=True,
+        max_age=Config.CERTIFICATE_HTTP_MAX_AGE
+    )
+    return certificate_response_headers(response)
+
+
+@certificates_bp.route('/<path:filename>')
+def serve_certificate(filename):
+    """Servir les certificats (accessible publiquement pour téléchargement)"""
+    return send_from_directory(Config.CERTIFICATES_DIR, filename)
+
+
+def certificate_response_headers(response):
+    """En-têtes de cache forts: un certificat rendu ne change jamais"""
+    response.cache_control.max_age = Config.CERTIFICATE_HTTP_MAX_AGE
+    response.cache_control.immutable = True
+    # Contenu protégé par jeton: autoriser le cache navigateur, pas les caches partagés
+    response.cache_control.private = True
+    response.cache_control.public = False
+    return response
@@ -0,0 +1,87 @@
+"""
+Montage différé des dashboards Dash (/dashboard/ et /dashboard/live/).
+
+Les applications Dash (imports dash/plotly, chargement du dataset, cube, layout) sont construites
+sur un serveur Flask séparé, au premier accès à /dashboard ou par warm_up() dans un thread, et
+non à l'import d'app.py: le worker sert /api/predict dès son démarrage.
+Un middleware WSGI aiguille les chemins /dashboard vers ce serveur; le reste va à l'application
+principale (dont /static, utilisé par les pages Dash).
+"""
+import threading
+from typing import Optional
+from flask import Flask
+from werkzeug.wrappers import Response
+from app_module.utils import get_logger
+
+logger = get_logger(__name__)
+
+DASHBOARD_PREFIX = '/dashboard'
+
+
+def build_dash_server(config=None) -> Flask:
+    """Serveur Flask portant les deux applications Dash (imports lourds faits ici)"""
+    from app_module.routes.dashboard import dashboard_bp
+    from app_module.routes.live_dashboard import live_dashboard_bp
+
+    server = Flask(__name__, static_folder=None)
+    if config is not None:
+        server.config.from_mapping(config)
+    dashboard_bp(server)
+    live_dashboard_bp(server)
+    return server
+
+
+class LazyDashMount:
+    """Middleware WSGI: construit le serveur Dash une seule fois, à la première requête ou par warm_up()"""
+
+    def __init__(self, app: Flask, prefix: str = DASHBOARD_PREFIX):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.prefix = prefix.rstrip('/')
+        self._server: Optional[Flask] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._server is not None
+
+    def load(self) -> Flask:
+        """Serveur Dash, construit au premier appel (les appels concurrents attendent le même)"""
+        if self._server is None:
+            with self._lock:
+                if self._server is None:
+                    self._server = build_dash_server(self.app.config)
+                    logger.info("Dashboards Dash montés")
+        return self._server
+
+    def warm_up(self) -> threading.Thread:
+        """Construction en arrière-plan, hors du chemin critique du démarrage"""
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                # Nouvel essai au premier accès à /dashboard
+                logger.error(f"Préchargement des dashboards impossible: {e}")
+
+        thread = threading.Thread(target=run, name='dash-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path != self.prefix and not path.startswith(self.prefix + '/'):
+            return self.wsgi_app(environ, start_response)
+        try:
+            server = self.load()
+        except Exception as e:
+            logger.error(f"Construction des dashboards impossible: {e}")
+            return Response('Dashboard indisponible', status=503, mimetype='text/plain')(environ, start_response)
+        return server.wsgi_app(environ, start_response)
+
+
+def mount_dashboards(app: Flask) -> LazyDashMount:
+    """Installer le montage différé sur l'application (accessible via app.extensions['dash_mount'])"""
+    mount = LazyDashMount(app)
+    app.wsgi_app = mount
+    app.extensions['dash_mount'] = mount
+    return mount
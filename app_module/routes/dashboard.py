@@ -1,29 +1,111 @@
 """
 Routes pour le dashboard
 """
+import json
+from typing import Any, Callable, Dict, List, Optional
 from flask import Blueprint
 import dash
-from dash import html, dcc, Input, Output, callback
+from dash import html, dcc, Input, Output, Patch, callback
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import plotly.express as px
+import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 from app_module.config.settings import Config
-from app_module.utils.data import load_dataset, get_value_options
+from app_module.utils.data import YES_VALUES, load_dataset
+from app_module.utils.dataset_cache import cached_categories, ensure_dataset_cache, iter_cached_frames
+from app_module.utils.data_cube import DataCube
+from app_module.utils.charts import COMPACT_TEMPLATE, histogram_figure
+from app_module.utils.dashboard_cache import DashboardCache, filter_key
+from app_module.utils.importance import load_importance
+from app_module.utils.scoring import RISK_EDGES, RISK_LABELS, load_scores, risk_codes, risk_column
 from app_module.utils import get_logger
 
 logger = get_logger(__name__)
 
+# Colonnes des filtres du dashboard (ordre des dropdowns)
+FILTER_COLUMNS = ('AgeCategory', 'Smoking', 'Sex', 'PhysicalActivity')
+
+# Mesures du cube (graphiques et résumé)
+CUBE_MEASURES = {
+    'distributions': ('GenHealth',),
+    'crosstabs': [('HeartDisease', 'SkinCancer')],
+    'sums': ('BMI', 'SleepTime', 'MentalHealth', 'PhysicalHealth'),
+    'histograms': {'BMI': 30},
+}
+
+
+def load_data_cube() -> Optional[DataCube]:
+    """
+    Cube pré-agrégé du dataset. Jusqu'à DASHBOARD_OUT_OF_CORE_ROWS lignes, depuis le DataFrame
+    partagé; au-delà, bloc par bloc depuis la copie en colonnes, sans DataFrame complet.
+    Les probabilités calculées par `flask models score` y ajoutent, par modèle, le tableau
+    classe de risque prédit x SkinCancer (distribution et calibration).
+    """
+    try:
+        meta = ensure_dataset_cache(Config.DATASET_PATH, Config.DATASET_CACHE_DIR)
+    except Exception as e:
+        logger.warning(f"Copie en colonnes du dataset indisponible: {e}")
+        meta = None
+
+    scores = load_scores(meta) if meta is not None else {}
+    measures = dict(CUBE_MEASURES, crosstabs=CUBE_MEASURES['crosstabs'] + [
+        (risk_column(model), 'SkinCancer') for model in sorted(scores)])
+
+    if meta is not None and meta['rows'] > Config.DASHBOARD_OUT_OF_CORE_ROWS:
+        columns = {*FILTER_COLUMNS, *CUBE_MEASURES['distributions'], *CUBE_MEASURES['sums'],
+                   *CUBE_MEASURES['histograms'], *(c for pair in CUBE_MEASURES['crosstabs'] for c in pair)}
+        categories = cached_categories(meta)
+        categories.update({risk_column(model): pd.Index(RISK_LABELS) for model in scores})
+        data_cube = DataCube.from_chunks(
+            lambda: (_with_risk_columns(chunk, scores)
+                     for chunk in iter_cached_frames(Config.DATASET_CACHE_DIR, meta, columns)),
+            categories, FILTER_COLUMNS, **measures
+        )
+        logger.info(f"Dataset agrégé par blocs: {meta['rows']} lignes")
+        return data_cube
 
-def dashboard_bp(server):
-    """Créer et enregistrer le dashboard Dash"""
-    
-    # Charger le dataset
     try:
         df = load_dataset(Config.DATASET_PATH)
         logger.info(f"Dataset chargé: {len(df)} lignes")
     except Exception as e:
         logger.error(f"Erreur lors du chargement du dataset: {e}")
-        df = pd.DataFrame()
+        return None
+    if df.empty:
+        return None
+    if scores and len(df) == meta['rows']:
+        df = _with_risk_columns(df, scores)
+    else:
+        measures = CUBE_MEASURES
+    return DataCube(df, FILTER_COLUMNS, **measures)
+
+
+def _with_risk_columns(frame: pd.DataFrame, scores: Dict[str, Any]) -> pd.DataFrame:
+    """Bloc (ou dataset) + classe de probabilité de chaque modèle; le DataFrame reçu n'est pas modifié"""
+    start, stop = frame.index[0], frame.index[-1] + 1
+    dtype = pd.CategoricalDtype(RISK_LABELS)
+    risk = {risk_column(model): pd.Categorical.from_codes(risk_codes(values[start:stop]), dtype=dtype)
+            for model, values in scores.items()}
+    return pd.concat([frame, pd.DataFrame(risk, index=frame.index)], axis=1, copy=False)
+
+
+def dashboard_bp(server):
+    """Créer et enregistrer le dashboard Dash"""
+    
+    # Cube pré-agrégé, construit une fois au démarrage
+    data_cube = load_data_cube()
+    cube_version = data_cube.fingerprint if data_cube is not None else ''
+    cache = DashboardCache()
+    initial_figures = _initial_figures(data_cube)
+    scored_models = _scored_models(data_cube)
+    importance_models = list(Config.MODELS)
+
+    def _aggregate(name, filters):
+        # Données d'un graphique, calculées une fois par combinaison de filtres (LRU + cache partagé)
+        selection = dict(zip(FILTER_COLUMNS, filters))
+        return cache.get_or_compute(name, cube_version, filter_key(filters),
+                                    lambda: AGGREGATES[name](data_cube.select(selection)))
     
     # Créer l'application Dash
     dash_app = dash.Dash(
@@ -130,7 +212,7 @@ def dashboard_bp(server):
                                 dbc.Label("Catégories d'Âge", className="fw-bold"),
                                 dcc.Dropdown(
                                     id='age-filter',
-                                    options=get_value_options(df, 'AgeCategory') if not df.empty else [{'label': 'Aucune donnée', 'value': None}],
+                                    options=_filter_options(data_cube, 'AgeCategory'),
                                     value=[],
                                     multi=True,
                                     placeholder='Sélectionnez les catégories d\'âge'
@@ -140,7 +222,7 @@ def dashboard_bp(server):
                                 dbc.Label("Statut Fumeur", className="fw-bold"),
                                 dcc.Dropdown(
                                     id='smoking-filter',
-                                    options=get_value_options(df, 'Smoking') if not df.empty else [{'label': 'Aucune donnée', 'value': None}],
+                                    options=_filter_options(data_cube, 'Smoking'),
                                     value=[],
                                     multi=True,
                                     placeholder='Sélectionnez le statut fumeur'
@@ -152,7 +234,7 @@ def dashboard_bp(server):
                                 dbc.Label("Sexe", className="fw-bold"),
                                 dcc.Dropdown(
                                     id='sex-filter',
-                                    options=get_value_options(df, 'Sex') if not df.empty else [{'label': 'Aucune donnée', 'value': None}],
+                                    options=_filter_options(data_cube, 'Sex'),
                                     value=[],
                                     multi=True,
                                     placeholder='Sélectionnez le sexe'
@@ -162,7 +244,7 @@ def dashboard_bp(server):
                                 dbc.Label("Activité Physique", className="fw-bold"),
                                 dcc.Dropdown(
                                     id='activity-filter',
-                                    options=get_value_options(df, 'PhysicalActivity') if not df.empty else [{'label': 'Aucune donnée', 'value': None}],
+                                    options=_filter_options(data_cube, 'PhysicalActivity'),
                                     value=[],
                                     multi=True,
                                     placeholder='Sélectionnez activité physique'
@@ -179,14 +261,14 @@ def dashboard_bp(server):
             dbc.Col([
                 dbc.Card([
                     dbc.CardHeader("Distribution par Catégorie d'Âge", style={'fontWeight': '700'}),
-                    dbc.CardBody(dcc.Graph(id='age-distribution', style={'height': '350px'}))
+                    dbc.CardBody(dcc.Graph(id='age-distribution', figure=initial_figures['age'], style={'height': '350px'}))
                 ], className="card card-accent-primary")
             ], md=6, className="mb-4"),
             
             dbc.Col([
                 dbc.Card([
                     dbc.CardHeader("Distribution BMI", style={'fontWeight': '700'}),
-                    dbc.CardBody(dcc.Graph(id='bmi-distribution', style={'height': '350px'}))
+                    dbc.CardBody(dcc.Graph(id='bmi-distribution', figure=initial_figures['bmi'], style={'height': '350px'}))
                 ], className="card card-accent-primary")
             ], md=6, className="mb-4"),
         ]),
@@ -196,14 +278,14 @@ def dashboard_bp(server):
             dbc.Col([
                 dbc.Card([
                     dbc.CardHeader("Statut Fumeur", style={'fontWeight': '700'}),
-                    dbc.CardBody(dcc.Graph(id='smoking-distribution', style={'height': '350px'}))
+                    dbc.CardBody(dcc.Graph(id='smoking-distribution', figure=initial_figures['smoking'], style={'height': '350px'}))
                 ], className="card card-accent-primary")
             ], md=6, className="mb-4"),
             
             dbc.Col([
                 dbc.Card([
                     dbc.CardHeader("Cas Cancer Peau", style={'fontWeight': '700'}),
-                    dbc.CardBody(dcc.Graph(id='cancer-distribution', style={'height': '350px'}))
+                    dbc.CardBody(dcc.Graph(id='cancer-distribution', figure=initial_figures['cancer'], style={'height': '350px'}))
                 ], className="card card-accent-primary")
             ], md=6, className="mb-4"),
         ]),
@@ -213,18 +295,63 @@ def dashboard_bp(server):
             dbc.Col([
                 dbc.Card([
                     dbc.CardHeader("État de Santé Général", style={'fontWeight': '700'}),
-                    dbc.CardBody(dcc.Graph(id='health-distribution', style={'height': '350px'}))
+                    dbc.CardBody(dcc.Graph(id='health-distribution', figure=initial_figures['health'], style={'height': '350px'}))
                 ], className="card card-accent-primary")
             ], md=6, className="mb-4"),
             
             dbc.Col([
                 dbc.Card([
                     dbc.CardHeader("Maladie Cardiaque vs Cancer", style={'fontWeight': '700'}),
-                    dbc.CardBody(dcc.Graph(id='heart-cancer-chart', style={'height': '350px'}))
+                    dbc.CardBody(dcc.Graph(id='heart-cancer-chart', figure=initial_figures['heart'], style={'height': '350px'}))
                 ], className="card card-accent-primary")
             ], md=6, className="mb-4"),
         ]),
         
+        # Risque prédit par les modèles (probabilités précalculées par `flask models score`)
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.Span("Risque Prédit par les Modèles", style={'fontWeight': '700'}),
+                        dcc.Dropdown(
+                            id='risk-model',
+                            options=[{'label': model, 'value': model} for model in scored_models],
+                            value=scored_models[0] if scored_models else None,
+                            clearable=False,
+                            style={'minWidth': '220px'}
+                        ) if scored_models else None,
+                    ], style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center'}),
+                    dbc.CardBody(dbc.Row([
+                        dbc.Col(dcc.Graph(id='risk-distribution', figure=initial_figures['risk'], style={'height': '350px'}), md=6),
+                        dbc.Col(dcc.Graph(id='risk-calibration', figure=initial_figures['calibration'], style={'height': '350px'}), md=6),
+                    ]) if scored_models else dbc.Alert(
+                        "Aucune probabilité précalculée: lancer `flask models score`", color="info"))
+                ], className="card card-accent-primary")
+            ], width=12, className="mb-4")
+        ]),
+        
+        # Importance globale des variables (artefacts de `flask models importance`, indépendants des filtres)
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.Span("Importance Globale des Variables (moyenne |SHAP|)", style={'fontWeight': '700'}),
+                        dcc.Dropdown(
+                            id='importance-model',
+                            options=[{'label': model, 'value': model} for model in importance_models],
+                            value=importance_models[0] if importance_models else None,
+                            clearable=False,
+                            style={'minWidth': '220px'}
+                        ),
+                    ], style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center'}),
+                    dbc.CardBody(dcc.Graph(
+                        id='importance-chart',
+                        figure=_importance_figure(load_importance(importance_models[0]) if importance_models else None),
+                        style={'height': '450px'}))
+                ], className="card card-accent-primary")
+            ], width=12, className="mb-4")
+        ]),
+        
         # Résumé statistique
         dbc.Row([
             dbc.Col([
@@ -237,147 +364,309 @@ def dashboard_bp(server):
         
     ], fluid=True, style={'padding': '0', 'backgroundColor': 'transparent'})
     
-    # Callbacks
+    # Callbacks: un par graphique, mémoïsés par combinaison normalisée des filtres.
+    # Les figures complètes sont dans le layout initial; les callbacks n'envoient ensuite
+    # que les tableaux de données qui changent (Patch).
+    filter_inputs = [Input('age-filter', 'value'),
+                     Input('smoking-filter', 'value'),
+                     Input('sex-filter', 'value'),
+                     Input('activity-filter', 'value')]
+
     @dash_app.callback(
         [Output('stat-total', 'children'),
          Output('stat-cancer', 'children'),
          Output('stat-rate', 'children'),
          Output('stat-bmi', 'children'),
-         Output('age-distribution', 'figure'),
-         Output('bmi-distribution', 'figure'),
-         Output('smoking-distribution', 'figure'),
-         Output('cancer-distribution', 'figure'),
-         Output('health-distribution', 'figure'),
-         Output('heart-cancer-chart', 'figure'),
          Output('stats-summary', 'children')],
-        [Input('age-filter', 'value'),
-         Input('smoking-filter', 'value'),
-         Input('sex-filter', 'value'),
-         Input('activity-filter', 'value')]
+        filter_inputs
     )
-    def update_dashboard(age_val, smoking_val, sex_val, activity_val):
-        """Mettre à jour tous les graphiques selon les filtres"""
-        
-        if df.empty:
-            empty_fig = {'data': [], 'layout': {'title': 'Pas de données'}}
-            return '0', '0', '0%', '0', empty_fig, empty_fig, empty_fig, empty_fig, empty_fig, empty_fig, dbc.Alert("Pas de données", color="warning")
-        
-        # Filtrer les données (support multi-select)
-        filtered_df = df.copy()
-
-        def _apply_filter(df_in, column, val):
-            if val is None or val == []:
-                return df_in
-            # accept scalar or list
-            if isinstance(val, str):
-                if val == 'all':
-                    return df_in
-                return df_in[df_in[column] == val]
-            try:
-                if 'all' in val:
-                    return df_in
-            except Exception:
-                pass
-            return df_in[df_in[column].isin(val)]
-
-        filtered_df = _apply_filter(filtered_df, 'AgeCategory', age_val)
-        filtered_df = _apply_filter(filtered_df, 'Smoking', smoking_val)
-        filtered_df = _apply_filter(filtered_df, 'Sex', sex_val)
-        filtered_df = _apply_filter(filtered_df, 'PhysicalActivity', activity_val)
-        
-        # Statistiques
-        total = len(filtered_df)
-        # Compter les cas positifs en acceptant 'Yes'/'No' ou 1/0 ou True/False
-        if 'SkinCancer' in filtered_df.columns:
-            cancer_count = filtered_df['SkinCancer'].isin([1, 'Yes', 'yes', 'YES', True]).sum()
-        else:
-            cancer_count = 0
-        rate = f"{(cancer_count/total*100):.1f}%" if total > 0 else "0%"
-        bmi_avg = f"{filtered_df['BMI'].mean():.1f}"
-        
-        # Graphique Age
-        age_fig = px.bar(
-            filtered_df['AgeCategory'].value_counts().reset_index().rename(columns={'AgeCategory': 'Âge', 'count': 'Nombre'}),
-            x='Âge', y='Nombre',
-            color_discrete_sequence=['#0369a1'] # Primary
-        )
-        age_fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', hovermode='x unified')
-        
-        # Graphique BMI
-        bmi_fig = px.histogram(
-            filtered_df,
-            x='BMI',
-            nbins=30,
-            color_discrete_sequence=['#0d9488'] # Accent Teal
-        )
-        bmi_fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', hovermode='x unified')
-        
-        # Graphique Smoking
-        smoking_fig = px.pie(
-            values=filtered_df['Smoking'].value_counts().values,
-            names=filtered_df['Smoking'].value_counts().index,
-            color_discrete_sequence=['#059669', '#dc2626'] # Success, Danger
-        )
-        smoking_fig.update_layout(paper_bgcolor='rgba(0,0,0,0)')
-        
-        # Graphique Cancer
-        cancer_counts = [cancer_count, total - cancer_count]
-        cancer_fig = px.pie(
-            values=cancer_counts,
-            names=['Positif', 'Négatif'],
-            color_discrete_sequence=['#dc2626', '#059669'] # Danger, Success
+    def update_stats(*filters):
+        """Statistiques clés et résumé"""
+        if data_cube is None:
+            return '0', '0', '0%', '0', dbc.Alert("Pas de données", color="warning")
+        return _stats_children(_aggregate('stats', filters))
+
+    @dash_app.callback(Output('age-distribution', 'figure'), filter_inputs)
+    def update_age(*filters):
+        if data_cube is None:
+            raise PreventUpdate
+        data = _aggregate('age', filters)
+        patch = Patch()
+        patch['data'][0]['x'] = data['x']
+        patch['data'][0]['y'] = data['y']
+        return patch
+
+    @dash_app.callback(Output('bmi-distribution', 'figure'), filter_inputs)
+    def update_bmi(*filters):
+        if data_cube is None:
+            raise PreventUpdate
+        # Classes fixes: seuls les effectifs changent
+        patch = Patch()
+        patch['data'][0]['y'] = _aggregate('bmi', filters)['y']
+        return patch
+
+    @dash_app.callback(Output('smoking-distribution', 'figure'), filter_inputs)
+    def update_smoking(*filters):
+        if data_cube is None:
+            raise PreventUpdate
+        data = _aggregate('smoking', filters)
+        patch = Patch()
+        patch['data'][0]['labels'] = data['labels']
+        patch['data'][0]['values'] = data['values']
+        return patch
+
+    @dash_app.callback(Output('cancer-distribution', 'figure'), filter_inputs)
+    def update_cancer(*filters):
+        if data_cube is None:
+            raise PreventUpdate
+        patch = Patch()
+        patch['data'][0]['values'] = _aggregate('cancer', filters)['values']
+        return patch
+
+    @dash_app.callback(Output('health-distribution', 'figure'), filter_inputs)
+    def update_health(*filters):
+        if data_cube is None:
+            raise PreventUpdate
+        data = _aggregate('health', filters)
+        patch = Patch()
+        patch['data'][0]['x'] = data['x']
+        patch['data'][0]['y'] = data['y']
+        return patch
+
+    @dash_app.callback(Output('heart-cancer-chart', 'figure'), filter_inputs)
+    def update_heart(*filters):
+        if data_cube is None:
+            raise PreventUpdate
+        # Le nombre de séries dépend des valeurs présentes: figure complète (mémoïsée)
+        return _aggregate('heart', filters)
+
+    if scored_models:
+        @dash_app.callback(
+            [Output('risk-distribution', 'figure'), Output('risk-calibration', 'figure')],
+            filter_inputs + [Input('risk-model', 'value')]
         )
-        cancer_fig.update_layout(paper_bgcolor='rgba(0,0,0,0)')
-        
-        # Graphique Santé
-        health_cols = [col for col in filtered_df.columns if col.startswith('GenHealth_')]
-        if health_cols:
-            health_data = filtered_df[health_cols].sum()
-            health_fig = px.bar(
-                x=health_data.index.str.replace('GenHealth_', ''),
-                y=health_data.values,
-                color_discrete_sequence=['#0369a1']
-            )
-        else:
-                # Utiliser la colonne brute si pas de colonnes OneHotEncoded
-                health_fig = px.bar(
-                    filtered_df['GenHealth'].value_counts().reset_index().rename(columns={'GenHealth': 'Santé', 'count': 'Nombre'}),
-                    x='Santé', y='Nombre',
-                    color_discrete_sequence=['#0369a1']
-                )
-        health_fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', xaxis_title='État', yaxis_title='Nombre')
-        
-        # Graphique Heart Disease vs Cancer
-        if 'SkinCancer' in filtered_df.columns:
-            heart_cancer_data = filtered_df.groupby(['HeartDisease', 'SkinCancer']).size().unstack(fill_value=0)
-            heart_fig = px.bar(
-                heart_cancer_data,
-                barmode='group',
-                color_discrete_sequence=['#059669', '#dc2626']
-            )
-        else:
-            heart_fig = {'data': [], 'layout': {'title': 'Pas de données'}}
-        heart_fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', xaxis_title='Maladie Cardiaque', yaxis_title='Nombre')
-        
-        # Résumé statistique
-        summary = dbc.Row([
-            dbc.Col([
-                html.P([html.Strong("👥 Population: "), f"{total:,} patients"]),
-                html.P([html.Strong("🏥 Cancer Peau: "), f"{cancer_count:,} cas ({rate})"]),
-                html.P([html.Strong("⚖️ BMI Moyen: "), f"{bmi_avg}"]),
-            ], md=4),
-            dbc.Col([
-                html.P([html.Strong("❤️ Maladie Cardiaque: "), f"{filtered_df['HeartDisease'].isin([1, 'Yes', True]).sum():,}" ]),
-                html.P([html.Strong("🚬 Fumeurs: "), f"{filtered_df['Smoking'].isin([1, 'Yes', True]).sum():,}" ]),
-                html.P([html.Strong("🏃 Activité Physique: "), f"{filtered_df['PhysicalActivity'].isin([1, 'Yes', True]).sum():,}" ]),
-            ], md=4),
-            dbc.Col([
-                html.P([html.Strong("😴 Sommeil Moyen: "), f"{filtered_df['SleepTime'].mean():.1f}h"]),
-                html.P([html.Strong("🧠 Santé Mentale: "), f"{filtered_df['MentalHealth'].mean():.1f} jours"]),
-                html.P([html.Strong("💪 Santé Physique: "), f"{filtered_df['PhysicalHealth'].mean():.1f} jours"]),
-            ], md=4),
-        ])
-        
-        return f"{total:,}", f"{cancer_count:,}", rate, bmi_avg, age_fig, bmi_fig, smoking_fig, cancer_fig, health_fig, heart_fig, summary
+        def update_risk(*values):
+            *filters, model = values
+            if model not in scored_models:
+                raise PreventUpdate
+            selection = dict(zip(FILTER_COLUMNS, filters))
+            data = cache.get_or_compute('risk', cube_version, [model, *filter_key(filters)],
+                                        lambda: _risk_payload(data_cube.select(selection), model))
+            distribution, calibration = Patch(), Patch()
+            distribution['data'][0]['y'] = data['counts']
+            calibration['data'][0]['y'] = data['observed']
+            return distribution, calibration
+
+    @dash_app.callback(Output('importance-chart', 'figure'), Input('importance-model', 'value'))
+    def update_importance(model):
+        # Artefact déjà lu en mémoire: aucun calcul SHAP à l'affichage
+        if model not in importance_models:
+            raise PreventUpdate
+        data = _importance_payload(load_importance(model))
+        figure = Patch()
+        figure['data'][0]['x'] = data['x']
+        figure['data'][0]['y'] = data['y']
+        figure['layout']['title']['text'] = data['title']
+        return figure
     
     return dash_app
+
+
+def _filter_options(data_cube: Optional[DataCube], column: str) -> List[Dict[str, Any]]:
+    """Options d'un dropdown: modalités de la dimension du cube"""
+    if data_cube is None or column not in data_cube.categories:
+        return [{'label': 'Aucune donnée', 'value': None}]
+    return [{'label': str(value), 'value': value} for value in sorted(data_cube.categories[column])]
+
+
+def _scored_models(data_cube: Optional[DataCube]) -> List[str]:
+    """Modèles dont les probabilités sont agrégées dans le cube"""
+    if data_cube is None:
+        return []
+    prefix = risk_column('')
+    return [rows[len(prefix):] for rows, _ in data_cube.crosstabs if rows.startswith(prefix)]
+
+
+def _risk_payload(stats, model: str) -> Dict[str, list]:
+    """Effectifs par classe de probabilité prédite et taux de SkinCancer observé dans chaque classe"""
+    table = stats.crosstab(risk_column(model), 'SkinCancer', full=True)
+    counts = table.sum(axis=1)
+    positives = table[[value for value in table.columns if value in YES_VALUES]].sum(axis=1)
+    return {
+        'counts': [int(count) for count in counts],
+        'observed': [round(float(p) / c, 4) if c else None for p, c in zip(positives, counts)],
+    }
+
+
+def _risk_figures(data: Dict[str, list]) -> Dict[str, Any]:
+    """Distribution du risque prédit et courbe de calibration (classe -> taux observé)"""
+    distribution = go.Figure(go.Bar(x=RISK_LABELS, y=data['counts'], marker_color='#0369a1',
+                                    hovertemplate='probabilité %{x}<br>%{y} patients<extra></extra>'))
+    distribution.update_layout(template=COMPACT_TEMPLATE, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                               xaxis_title='Probabilité prédite', yaxis_title='Nombre', bargap=0.05)
+
+    centers = np.round((RISK_EDGES[:-1] + RISK_EDGES[1:]) / 2, 2).tolist()
+    calibration = go.Figure([
+        go.Scatter(x=centers, y=data['observed'], mode='lines+markers', name='Taux observé',
+                   line={'color': '#dc2626'}),
+        go.Scatter(x=[0, 1], y=[0, 1], mode='lines', name='Calibration parfaite',
+                   line={'color': '#94a3b8', 'dash': 'dash'}, hoverinfo='skip'),
+    ])
+    calibration.update_layout(template=COMPACT_TEMPLATE, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                              xaxis={'title': 'Probabilité prédite', 'range': [0, 1]},
+                              yaxis={'title': 'Taux de cancer observé', 'range': [0, 1]},
+                              legend={'orientation': 'h', 'y': 1.1})
+    return {'risk': distribution, 'calibration': calibration}
+
+
+def _importance_payload(artifact: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Barres horizontales (variable la plus importante en haut) et légende de l'échantillon"""
+    if artifact is None:
+        return {'x': [], 'y': [], 'title': "Non calculée: lancer `flask models importance`"}
+    features = artifact['features'][::-1]
+    return {
+        'x': [item['importance'] for item in features],
+        'y': [item['feature'] for item in features],
+        'title': f"{artifact['sample_size']} patients (échantillon stratifié), calculé le {artifact['created_at'][:10]}",
+    }
+
+
+def _importance_figure(artifact: Optional[Dict[str, Any]]) -> go.Figure:
+    data = _importance_payload(artifact)
+    figure = go.Figure(go.Bar(x=data['x'], y=data['y'], orientation='h', marker_color='#0d9488',
+                              hovertemplate='%{y}: %{x:.4f}<extra></extra>'))
+    figure.update_layout(template=COMPACT_TEMPLATE, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                         title={'text': data['title'], 'font': {'size': 13}},
+                         xaxis_title='Moyenne |SHAP| (probabilité)', yaxis={'automargin': True})
+    return figure
+
+
+def _count_payload(counts: pd.Series) -> Dict[str, list]:
+    return {'x': [str(value) for value in counts.index], 'y': [int(count) for count in counts.values]}
+
+
+def _stats_payload(stats) -> Dict[str, Any]:
+    return {
+        'total': len(stats),
+        'cancer': stats.count_where('SkinCancer', YES_VALUES),
+        'heart': stats.count_where('HeartDisease', YES_VALUES),
+        'smoking': stats.count_where('Smoking', YES_VALUES),
+        'activity': stats.count_where('PhysicalActivity', YES_VALUES),
+        'bmi': stats.mean('BMI'),
+        'sleep': stats.mean('SleepTime'),
+        'mental': stats.mean('MentalHealth'),
+        'physical': stats.mean('PhysicalHealth'),
+    }
+
+
+def _heart_figure(stats) -> Dict[str, Any]:
+    heart_fig = px.bar(
+        stats.crosstab('HeartDisease', 'SkinCancer'),
+        barmode='group',
+        template=COMPACT_TEMPLATE,
+        color_discrete_sequence=['#059669', '#dc2626']
+    )
+    heart_fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', xaxis_title='Maladie Cardiaque', yaxis_title='Nombre')
+    # Structure JSON (valeur du cache partagé)
+    return json.loads(heart_fig.to_json())
+
+
+# Données de chaque graphique à partir d'une sélection du cube (valeurs JSON)
+AGGREGATES: Dict[str, Callable[[Any], Any]] = {
+    'stats': _stats_payload,
+    'age': lambda stats: _count_payload(stats.value_counts('AgeCategory')),
+    'bmi': lambda stats: {'y': [int(count) for count in stats.histogram('BMI')[0]]},
+    'smoking': lambda stats: {
+        'labels': [str(value) for value in stats.value_counts('Smoking').index],
+        'values': [int(count) for count in stats.value_counts('Smoking').values],
+    },
+    'cancer': lambda stats: {'values': [stats.count_where('SkinCancer', YES_VALUES),
+                                        len(stats) - stats.count_where('SkinCancer', YES_VALUES)]},
+    'health': lambda stats: _count_payload(stats.value_counts('GenHealth')),
+    'heart': _heart_figure,
+}
+
+
+def _stats_children(data: Dict[str, Any]):
+    total, cancer_count = data['total'], data['cancer']
+    rate = f"{(cancer_count/total*100):.1f}%" if total > 0 else "0%"
+    bmi_avg = f"{data['bmi']:.1f}"
+    summary = dbc.Row([
+        dbc.Col([
+            html.P([html.Strong("👥 Population: "), f"{total:,} patients"]),
+            html.P([html.Strong("🏥 Cancer Peau: "), f"{cancer_count:,} cas ({rate})"]),
+            html.P([html.Strong("⚖️ BMI Moyen: "), f"{bmi_avg}"]),
+        ], md=4),
+        dbc.Col([
+            html.P([html.Strong("❤️ Maladie Cardiaque: "), f"{data['heart']:,}" ]),
+            html.P([html.Strong("🚬 Fumeurs: "), f"{data['smoking']:,}" ]),
+            html.P([html.Strong("🏃 Activité Physique: "), f"{data['activity']:,}" ]),
+        ], md=4),
+        dbc.Col([
+            html.P([html.Strong("😴 Sommeil Moyen: "), f"{data['sleep']:.1f}h"]),
+            html.P([html.Strong("🧠 Santé Mentale: "), f"{data['mental']:.1f} jours"]),
+            html.P([html.Strong("💪 Santé Physique: "), f"{data['physical']:.1f} jours"]),
+        ], md=4),
+    ])
+    return f"{total:,}", f"{cancer_count:,}", rate, bmi_avg, summary
+
+
+def _initial_figures(data_cube: Optional[DataCube]) -> Dict[str, Any]:
+    """Figures complètes pour la sélection sans filtre (les callbacks les modifient ensuite par Patch)"""
+    if data_cube is None:
+        empty_fig = {'data': [], 'layout': {'title': 'Pas de données'}}
+        return {name: empty_fig for name in ('age', 'bmi', 'smoking', 'cancer', 'health', 'heart',
+                                             'risk', 'calibration')}
+
+    stats = data_cube.select({})
+    
+    # Graphique Age
+    age = AGGREGATES['age'](stats)
+    age_fig = px.bar(
+        pd.DataFrame({'Âge': age['x'], 'Nombre': age['y']}),
+        x='Âge', y='Nombre',
+        template=COMPACT_TEMPLATE,
+        color_discrete_sequence=['#0369a1'] # Primary
+    )
+    age_fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', hovermode='x unified')
+    
+    # Graphique BMI: classes précalculées dans le cube, envoyées comme 30 barres
+    bmi_counts, bmi_edges = stats.histogram('BMI')
+    bmi_fig = histogram_figure(bmi_counts, bmi_edges, 'BMI', color='#0d9488') # Accent Teal
+    bmi_fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', hovermode='x unified')
+    
+    # Graphique Smoking
+    smoking = AGGREGATES['smoking'](stats)
+    smoking_fig = px.pie(
+        values=smoking['values'],
+        names=smoking['labels'],
+        template=COMPACT_TEMPLATE,
+        color_discrete_sequence=['#059669', '#dc2626'] # Success, Danger
+    )
+    smoking_fig.update_layout(paper_bgcolor='rgba(0,0,0,0)')
+    
+    # Graphique Cancer
+    cancer_fig = px.pie(
+        values=AGGREGATES['cancer'](stats)['values'],
+        names=['Positif', 'Négatif'],
+        template=COMPACT_TEMPLATE,
+        color_discrete_sequence=['#dc2626', '#059669'] # Danger, Success
+    )
+    cancer_fig.update_layout(paper_bgcolor='rgba(0,0,0,0)')
+    
+    # Graphique Santé
+    health = AGGREGATES['health'](stats)
+    health_fig = px.bar(
+        pd.DataFrame({'Santé': health['x'], 'Nombre': health['y']}),
+        x='Santé', y='Nombre',
+        template=COMPACT_TEMPLATE,
+        color_discrete_sequence=['#0369a1']
+    )
+    health_fig.update_layout(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', xaxis_title='État', yaxis_title='Nombre')
+    
+    # Risque prédit: premier modèle agrégé (les autres par le callback)
+    scored_models = _scored_models(data_cube)
+    risk = _risk_payload(stats, scored_models[0]) if scored_models else {'counts': [], 'observed': []}
+    
+    return {'age': age_fig, 'bmi': bmi_fig, 'smoking': smoking_fig, 'cancer': cancer_fig,
+            'health': health_fig, 'heart': _heart_figure(stats), **_risk_figures(risk)}
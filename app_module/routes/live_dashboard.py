@@ -0,0 +1,186 @@
+"""
+Tableau de suivi en direct des tests enregistrés (/dashboard/live/)
+"""
+from typing import Any, Dict
+import dash
+from dash import html, dcc, Input, Output, State, Patch
+from dash.exceptions import PreventUpdate
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+from app_module.config.settings import Config
+from app_module.utils.charts import COMPACT_TEMPLATE
+from app_module.utils.live_stats import LiveAggregates
+from app_module.utils import get_logger
+
+logger = get_logger(__name__)
+
+CARD_STYLE = {'textAlign': 'center', 'display': 'flex', 'flexDirection': 'column', 'alignItems': 'center'}
+LABEL_STYLE = {'color': 'var(--neutral-500)', 'fontWeight': '600', 'textTransform': 'uppercase', 'fontSize': '0.9rem'}
+VALUE_STYLE = {'fontSize': '2rem', 'fontWeight': '700', 'color': 'var(--neutral-900)'}
+
+
+def live_dashboard_bp(server, database=None):
+    """Créer et enregistrer le tableau de suivi Dash (rafraîchi par dcc.Interval)"""
+    # Agrégats du worker: initialisés au premier affichage, puis complétés par deltas
+    aggregates = LiveAggregates(database)
+
+    dash_app = dash.Dash(
+        __name__,
+        server=server,
+        url_base_pathname="/dashboard/live/",
+        external_stylesheets=[dbc.themes.BOOTSTRAP],
+        title="Suivi en direct | DermoIA Pro"
+    )
+
+    dash_app.index_string = '''
+    <!DOCTYPE html>
+    <html>
+        <head>
+            {%metas%}
+            <title>Suivi en direct | DermoIA Pro</title>
+            {%favicon%}
+            {%css%}
+            <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+            <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css">
+            <link rel="stylesheet" href="/static/style.css">
+        </head>
+        <body>
+            <div class="app-container">
+                <header class="main-header">
+                    <div class="brand">
+                        <a href="/" class="brand-text" style="display: flex; align-items: center; gap: 0.75rem; text-decoration: none;">
+                            <i class="fa-solid fa-wave-square brand-icon"></i>
+                            <div>
+                                <h1>Suivi en Direct</h1>
+                                <p>Tests enregistrés, actualisés automatiquement</p>
+                            </div>
+                        </a>
+                    </div>
+                    <div class="header-actions">
+                        <a href="/dashboard/" class="btn btn-secondary"><i class="fa-solid fa-chart-pie"></i> Dashboard</a>
+                    </div>
+                </header>
+                
+                {%app_entry%}
+            </div>
+            
+            <footer>
+                {%config%}
+                {%scripts%}
+                {%renderer%}
+            </footer>
+        </body>
+    </html>
+    '''
+
+    dash_app.layout = dbc.Container([
+        dbc.Row([
+            _stat_card("Tests Enregistrés", "live-total", "fa-solid fa-vial"),
+            _stat_card("Taux de Risque", "live-rate", "fa-solid fa-triangle-exclamation"),
+            _stat_card("Tests Aujourd'hui", "live-today", "fa-solid fa-calendar-day"),
+            _stat_card("Dernier Test (id)", "live-last-id", "fa-solid fa-hashtag"),
+        ], className="mb-4"),
+
+        dbc.Row([
+            dbc.Col(_graph_card(f"Prédictions par Jour ({Config.LIVE_DASHBOARD_DAYS} jours)", 'live-per-day'),
+                    md=6, className="mb-4"),
+            dbc.Col(_graph_card("Évolution du Taux de Risque", 'live-risk-rate'), md=6, className="mb-4"),
+        ]),
+        dbc.Row([
+            dbc.Col(_graph_card("Utilisation des Modèles", 'live-models'), width=12, className="mb-4"),
+        ]),
+
+        # Version des agrégats déjà affichée par ce navigateur
+        dcc.Store(id='live-version'),
+        dcc.Interval(id='live-interval', interval=Config.LIVE_DASHBOARD_INTERVAL_MS, n_intervals=0),
+    ], fluid=True, style={'padding': '0', 'backgroundColor': 'transparent'})
+
+    @dash_app.callback(
+        [Output('live-total', 'children'),
+         Output('live-rate', 'children'),
+         Output('live-today', 'children'),
+         Output('live-last-id', 'children'),
+         Output('live-per-day', 'figure'),
+         Output('live-risk-rate', 'figure'),
+         Output('live-models', 'figure'),
+         Output('live-version', 'data')],
+        Input('live-interval', 'n_intervals'),
+        State('live-version', 'data')
+    )
+    def update_live(_, shown_version):
+        """Lit les nouveaux tests (id > dernier vu) et ne renvoie que les séries modifiées"""
+        try:
+            aggregates.refresh()
+        except Exception as e:
+            logger.error(f"Rafraîchissement du suivi en direct impossible: {e}")
+            raise PreventUpdate
+        data = aggregates.snapshot(days=Config.LIVE_DASHBOARD_DAYS)
+        # Rien de nouveau depuis le dernier affichage (le changement de jour décale les séries)
+        version = f"{data['version']}/{data['days'][-1]}"
+        if version == shown_version:
+            raise PreventUpdate
+        return (*_stat_values(data), *_figure_patches(data), version)
+
+    return dash_app
+
+
+def _stat_card(label: str, value_id: str, icon: str):
+    return dbc.Col([
+        html.Div([
+            html.Div(html.I(className=icon), className="stat-icon",
+                     style={'background': 'var(--primary-light)', 'color': 'var(--primary-color)', 'marginBottom': '10px'}),
+            html.Div(label, style=LABEL_STYLE),
+            html.Div('-', id=value_id, className="stat-value", style=VALUE_STYLE),
+        ], className="card card-accent-primary", style=CARD_STYLE)
+    ], md=3, className="mb-3")
+
+
+def _graph_card(title: str, graph_id: str):
+    return dbc.Card([
+        dbc.CardHeader(title, style={'fontWeight': '700'}),
+        dbc.CardBody(dcc.Graph(id=graph_id, figure=INITIAL_FIGURES[graph_id], style={'height': '350px'}))
+    ], className="card card-accent-primary")
+
+
+def _stat_values(data: Dict[str, Any]):
+    return (f"{data['total']:,}", f"{data['riskRate'] * 100:.1f}%", f"{data['today']:,}", str(data['lastId']))
+
+
+def _figure_patches(data: Dict[str, Any]):
+    """Patch des tableaux de données des trois graphiques (mise en page inchangée)"""
+    per_day = Patch()
+    per_day['data'][0]['x'] = data['days']
+    per_day['data'][0]['y'] = [total - risk for total, risk in zip(data['perDay'], data['riskPerDay'])]
+    per_day['data'][1]['x'] = data['days']
+    per_day['data'][1]['y'] = data['riskPerDay']
+
+    risk_rate = Patch()
+    risk_rate['data'][0]['x'] = data['days']
+    risk_rate['data'][0]['y'] = data['riskRatePerDay']
+
+    models = Patch()
+    models['data'][0]['x'] = list(data['byModel'])
+    models['data'][0]['y'] = list(data['byModel'].values())
+    return per_day, risk_rate, models
+
+
+def _empty_figures() -> Dict[str, Any]:
+    """Figures vides (traces et mise en page), complétées par le premier rafraîchissement"""
+    per_day = go.Figure([
+        go.Bar(x=[], y=[], name='Sans risque', marker_color='#10b981'),
+        go.Bar(x=[], y=[], name='Risque', marker_color='#ef4444'),
+    ])
+    per_day.update_layout(template=COMPACT_TEMPLATE, barmode='stack', xaxis_title='jour', yaxis_title='tests',
+                          legend={'orientation': 'h', 'y': 1.1})
+
+    risk_rate = go.Figure(go.Scatter(x=[], y=[], mode='lines+markers', connectgaps=False,
+                                     line={'color': '#f59e0b'}, name='taux de risque'))
+    risk_rate.update_layout(template=COMPACT_TEMPLATE, xaxis_title='jour',
+                            yaxis={'title': 'taux de risque', 'tickformat': '.0%', 'rangemode': 'tozero'})
+
+    models = go.Figure(go.Bar(x=[], y=[], marker_color='#3b82f6'))
+    models.update_layout(template=COMPACT_TEMPLATE, xaxis_title='modèle', yaxis_title='tests')
+    return {'live-per-day': per_day, 'live-risk-rate': risk_rate, 'live-models': models}
+
+
+INITIAL_FIGURES = _empty_figures()
@@ -0,0 +1,24 @@
+"""
+API des modèles: importance globale des variables, précalculée par `flask models importance`
+"""
+from flask import Blueprint, jsonify, request
+from app_module.config.settings import Config
+from app_module.utils import APIResponse
+from app_module.utils.importance import load_importance
+
+models_bp = Blueprint('models', __name__, url_prefix='/api/models')
+
+
+@models_bp.route('/<name>/importance', methods=['GET'])
+def model_importance(name):
+    """Moyenne des |SHAP| par variable sur l'échantillon stratifié du dataset (artefact versionné)"""
+    if name not in Config.MODELS:
+        return jsonify(APIResponse.error(f"Modèle inconnu: {name}")), 404
+    artifact = load_importance(name)
+    if artifact is None:
+        return jsonify(APIResponse.error(f"Importance non calculée pour {name}: lancer `flask models importance`")), 404
+    response = jsonify(APIResponse.success(artifact))
+    # La version de l'artefact (sommes du modèle et du dataset) sert d'ETag
+    response.set_etag(artifact['version'])
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
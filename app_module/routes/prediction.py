@@ -3,7 +3,7 @@ Routes pour les prédictions
 """
 from flask import Blueprint, render_template, request, jsonify
 import pandas as pd
-from app_module.utils.models import ModelManager
+from app_module.utils.models import ModelManager, registry
 from app_module.utils.data import prepare_prediction_input
 from app_module.utils import APIResponse, get_logger
 
@@ -103,6 +103,5 @@ def predict_api():
 @prediction_bp.route('/models', methods=['GET'])
 def get_models():
     """Retourner la liste des modèles disponibles"""
-    models = ModelManager.get_all_models()
-    model_list = list(models.keys())
+    model_list = registry.available()
     return jsonify(APIResponse.success({'models': model_list})), 200
@@ -0,0 +1,20 @@
+"""
+API des statistiques du dashboard (chiffres clés du dataset et compteurs des tests)
+"""
+from datetime import datetime, timezone
+from flask import Blueprint, jsonify, request
+from app_module.utils.dashboard_stats import stats_cache
+
+stats_bp = Blueprint('stats', __name__, url_prefix='/api/dashboard')
+
+
+@stats_bp.route('/stats')
+def dashboard_stats():
+    """Statistiques précalculées (TTL DASHBOARD_STATS_TTL), avec revalidation par ETag"""
+    payload, etag, computed_at = stats_cache.get()
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(computed_at, tz=timezone.utc)
+    # Le navigateur revalide à chaque chargement: 304 sans corps tant que les chiffres ne changent pas
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -0,0 +1,51 @@
+"""
+Fichiers d'archive mensuels des tests (SQLite): data/archive/tests-YYYY-MM.db.
+
+Chaque fichier contient une table tests de même schéma que la base courante, avec ses index.
+Les tests archivés ne sont lus que sur demande (include_archive=True).
+"""
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from typing import List, Tuple
+from app_module.utils.migrations import MIGRATIONS
+
+_ARCHIVE_FILE = re.compile(r'^tests-(\d{4}-\d{2})\.db$')
+
+# Migrations reprises dans les archives: table et index, sans compteurs ni triggers
+_ARCHIVE_MIGRATIONS = 2
+
+
+def archive_path(archive_dir: str, month: str) -> str:
+    """Chemin du fichier d'archive d'un mois 'YYYY-MM'"""
+    return os.path.join(archive_dir, f'tests-{month}.db')
+
+
+def list_archives(archive_dir: str) -> List[Tuple[str, str]]:
+    """(mois, chemin) des archives existantes, du plus ancien au plus récent"""
+    if not os.path.isdir(archive_dir):
+        return []
+    archives = []
+    for name in os.listdir(archive_dir):
+        match = _ARCHIVE_FILE.match(name)
+        if match:
+            archives.append((match.group(1), os.path.join(archive_dir, name)))
+    return sorted(archives)
+
+
+@contextmanager
+def open_archive(path: str, create: bool = False):
+    """Connexion à un fichier d'archive, fermée en sortie (créée avec son schéma si demandé)"""
+    if create:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if create:
+            with conn:
+                for _, apply in MIGRATIONS[:_ARCHIVE_MIGRATIONS]:
+                    apply(conn)
+        yield conn
+    finally:
+        conn.close()
@@ -2,30 +2,120 @@
 Génération de certificat/image pour les tests médicaux
 """
 from PIL import Image, ImageDraw, ImageFont
+import hashlib
 import os
+import tempfile
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, Optional
 from app_module.config.settings import Config
 
 
-def generate_certificate_image(
+# Incrémenter quand le rendu change pour invalider les caches (disque et HTTP)
+CERTIFICATE_RENDER_VERSION = 1
+
+# Format configuré -> (extension, type MIME)
+CERTIFICATE_FORMATS = {
+    'png': ('png', 'image/png'),
+    'png-palette': ('png', 'image/png'),
+    'webp': ('webp', 'image/webp'),
+}
+
+THUMBNAIL_SUFFIX = '.thumb'
+
+
+def certificate_extension(fmt: Optional[str] = None) -> str:
+    """Extension de fichier du format de certificat"""
+    return CERTIFICATE_FORMATS[fmt or Config.CERTIFICATE_FORMAT][0]
+
+
+def certificate_mimetype(fmt: Optional[str] = None) -> str:
+    """Type MIME du format de certificat"""
+    return CERTIFICATE_FORMATS[fmt or Config.CERTIFICATE_FORMAT][1]
+
+
+def encode_certificate(img: Image.Image, fp: BinaryIO, fmt: Optional[str] = None) -> None:
+    """Encoder une image de certificat dans le format configuré"""
+    fmt = fmt or Config.CERTIFICATE_FORMAT
+    if fmt == 'png':
+        img.save(fp, 'PNG', compress_level=Config.CERTIFICATE_PNG_COMPRESS_LEVEL)
+    elif fmt == 'png-palette':
+        # Le certificat n'utilise que quelques couleurs: une palette réduit fortement la taille
+        img.quantize(colors=Config.CERTIFICATE_PALETTE_COLORS).save(fp, 'PNG', optimize=True)
+    elif fmt == 'webp':
+        img.save(fp, 'WEBP', quality=Config.CERTIFICATE_WEBP_QUALITY, method=6)
+    else:
+        raise ValueError(f"Format de certificat inconnu: {fmt}")
+
+
+def certificate_shard(filename: str) -> str:
+    """Sous-répertoire dérivé du hash du nom de fichier (ex: 'a3/f0')"""
+    digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()
+    return '/'.join(digest[2 * i:2 * i + 2] for i in range(Config.CERTIFICATE_SHARD_DEPTH))
+
+
+def certificate_abspath(certificate_path: str) -> str:
+    """Chemin absolu d'un certificat à partir de son chemin relatif ('certificates/...')"""
+    return os.path.join(Config.DATA_DIR, certificate_path)
+
+
+def thumbnail_path(certificate_path: str) -> str:
+    """Chemin relatif de la miniature associée à un certificat"""
+    stem, ext = os.path.splitext(certificate_path)
+    return f"{stem}{THUMBNAIL_SUFFIX}{ext}"
+
+
+def write_certificate(img: Image.Image, filepath: str, fmt: Optional[str] = None) -> None:
+    """Écrire une image via un fichier temporaire pour ne jamais exposer un fichier partiel"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            encode_certificate(img, f, fmt)
+        os.replace(tmp_path, filepath)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_certificate(img: Image.Image, stem: str, fmt: Optional[str] = None) -> str:
+    """
+    Sauvegarder un certificat dans l'arborescence partitionnée
+    
+    Returns:
+        str: Chemin relatif ('certificates/ab/cd/<stem>.<ext>')
+    """
+    fmt = fmt or Config.CERTIFICATE_FORMAT
+    filename = f"{stem}.{certificate_extension(fmt)}"
+    shard = certificate_shard(filename)
+    relative = '/'.join(part for part in ('certificates', shard, filename) if part)
+    
+    filepath = certificate_abspath(relative)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    write_certificate(img, filepath, fmt)
+    
+    if Config.CERTIFICATE_THUMBNAIL_WIDTH > 0:
+        width = Config.CERTIFICATE_THUMBNAIL_WIDTH
+        thumb = img.copy()
+        thumb.thumbnail((width, width * img.height // img.width))
+        write_certificate(thumb, certificate_abspath(thumbnail_path(relative)), fmt)
+    
+    return relative
+
+
+def render_certificate(
     test_id: int,
     prediction: int,
     probability: float,
     model_used: str,
     timestamp: str,
     input_features: Dict[str, Any]
-) -> str:
+) -> Image.Image:
     """
-    Génère une image de certificat pour le test médical
+    Dessine le certificat du test médical en mémoire
     
     Returns:
-        str: Chemin relatif vers l'image générée
+        Image.Image: Image PIL du certificat (non sauvegardée)
     """
-    # Créer le répertoire pour les certificats
-    cert_dir = os.path.join(Config.BASE_DIR, 'data', 'certificates')
-    os.makedirs(cert_dir, exist_ok=True)
-    
     # Dimensions de l'image
     width, height = 800, 1000
     img = Image.new('RGB', (width, height), color='white')
@@ -198,13 +288,28 @@ def generate_certificate_image(
     else:
         draw.text((width // 2 - 100, footer_y), footer_text, fill=light_text)
     
-    # Sauvegarder l'image
-    filename = f"certificate_{test_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-    filepath = os.path.join(cert_dir, filename)
-    img.save(filepath, 'PNG', quality=95)
+    return img
+
+
+def generate_certificate_image(
+    test_id: int,
+    prediction: int,
+    probability: float,
+    model_used: str,
+    timestamp: str,
+    input_features: Dict[str, Any]
+) -> str:
+    """
+    Génère une image de certificat pour le test médical
+    
+    Returns:
+        str: Chemin relatif vers l'image générée
+    """
+    img = render_certificate(test_id, prediction, probability, model_used, timestamp, input_features)
     
-    # Retourner le chemin relatif
-    return f"certificates/{filename}"
+    # Sauvegarder l'image et retourner le chemin relatif
+    stem = f"certificate_{test_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    return save_certificate(img, stem)
 
 
 def generate_certificate_from_result(test_data: Dict[str, Any]) -> str:
@@ -218,3 +323,14 @@ def generate_certificate_from_result(test_data: Dict[str, Any]) -> str:
         input_features=test_data.get('input_features', {})
     )
 
+
+def render_certificate_from_test(test: Dict[str, Any]) -> Image.Image:
+    """Dessine le certificat à partir d'une ligne de la table tests"""
+    return render_certificate(
+        test_id=test['id'],
+        prediction=test['prediction'],
+        probability=test['probability'],
+        model_used=test['model_used'],
+        timestamp=str(test.get('timestamp') or ''),
+        input_features=test.get('input_features') or {}
+    )
@@ -0,0 +1,120 @@
+"""
+Cache disque LRU borné pour les certificats rendus à la demande
+"""
+import hashlib
+import hmac
+import os
+from typing import Any, Dict, Optional
+from app_module.config.settings import Config
+from app_module.utils.certificate import (
+    CERTIFICATE_FORMATS, CERTIFICATE_RENDER_VERSION, certificate_extension, render_certificate_from_test,
+    write_certificate
+)
+
+_CACHE_EXTENSIONS = tuple(f".{ext}" for ext, _ in CERTIFICATE_FORMATS.values())
+
+
+def certificate_etag(test: Dict[str, Any]) -> str:
+    """ETag fort: dépend uniquement du test et de la version du rendu"""
+    raw = f"{CERTIFICATE_RENDER_VERSION}:{Config.CERTIFICATE_FORMAT}:{test['id']}:{test.get('timestamp')}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def certificate_token(test_id: int) -> str:
+    """Jeton signé autorisant l'accès public à un certificat"""
+    digest = hmac.new(Config.SECRET_KEY.encode('utf-8'), f"certificate:{test_id}".encode('utf-8'), hashlib.sha256)
+    return digest.hexdigest()[:16]
+
+
+def verify_certificate_token(test_id: int, token: Optional[str]) -> bool:
+    """Vérifier le jeton d'accès d'un certificat"""
+    if not token:
+        return False
+    return hmac.compare_digest(certificate_token(test_id), token)
+
+
+def certificate_url(test_id: int) -> str:
+    """Chemin relatif public du certificat rendu à la demande"""
+    return f"certificates/{test_id}?t={certificate_token(test_id)}"
+
+
+class CertificateCache:
+    """
+    Cache disque des certificats avec éviction LRU.
+
+    L'état LRU est porté par le mtime des fichiers (rafraîchi à chaque accès), ce qui
+    permet à plusieurs workers gunicorn de partager le même répertoire sans index commun.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_files: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or Config.CERTIFICATE_CACHE_DIR
+        self.max_files = max_files if max_files is not None else Config.CERTIFICATE_CACHE_MAX_FILES
+        self.max_bytes = max_bytes if max_bytes is not None else Config.CERTIFICATE_CACHE_MAX_BYTES
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, test: Dict[str, Any]) -> str:
+        """Chemin du fichier en cache pour un test"""
+        filename = f"certificate_{test['id']}_{certificate_etag(test)}.{certificate_extension()}"
+        return os.path.join(self.cache_dir, filename)
+
+    def get_or_render(self, test: Dict[str, Any]) -> str:
+        """Retourner le chemin du certificat, en le rendant s'il est absent du cache"""
+        path = self.path_for(test)
+        try:
+            # Accès: rafraîchir la position LRU
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        img = render_certificate_from_test(test)
+
+        # Écriture atomique pour ne jamais servir un fichier partiel
+        write_certificate(img, path)
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Supprimer les entrées les moins récemment utilisées au-delà des limites"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_file() or not entry.name.endswith(_CACHE_EXTENSIONS):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort()
+        total_files = len(entries)
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for _, size, path in entries:
+            if total_files <= self.max_files and total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_files -= 1
+            total_bytes -= size
+            removed += 1
+
+        return removed
+
+
+_cache = None
+
+
+def get_certificate_cache() -> CertificateCache:
+    """Instance partagée du cache (créée à la première utilisation)"""
+    global _cache
+    if _cache is None:
+        _cache = CertificateCache()
+    return _cache
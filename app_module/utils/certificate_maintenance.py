@@ -0,0 +1,285 @@
+"""
+Tâches de maintenance des certificats (migration, rétention et nettoyage)
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from PIL import Image
+from app_module.config.settings import Config
+from app_module.utils.certificate import (
+    THUMBNAIL_SUFFIX, certificate_abspath, certificate_extension, certificate_shard, save_certificate,
+    thumbnail_path
+)
+from app_module.utils import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: pas de verrou inter-processus
+    fcntl = None
+
+logger = get_logger(__name__)
+
+
+def target_certificate_path(certificate_path: str, fmt: Optional[str] = None) -> str:
+    """Chemin relatif qu'aurait le certificat dans le format et l'arborescence configurés"""
+    stem = os.path.splitext(os.path.basename(certificate_path))[0]
+    filename = f"{stem}.{certificate_extension(fmt)}"
+    shard = certificate_shard(filename)
+    return '/'.join(part for part in ('certificates', shard, filename) if part)
+
+
+def certificate_encoding(path: str) -> Optional[str]:
+    """Format de certificat d'un fichier existant, lu dans son en-tête (None si non reconnu)"""
+    try:
+        with Image.open(path) as im:
+            if im.format == 'PNG':
+                return 'png-palette' if im.mode == 'P' else 'png'
+            if im.format == 'WEBP':
+                return 'webp'
+    except OSError:
+        pass
+    return None
+
+
+def migrate_certificates(
+    database,
+    fmt: Optional[str] = None,
+    batch_size: int = 200,
+    dry_run: bool = False,
+    force: bool = False,
+    progress: Optional[Callable[[Dict[str, int]], None]] = None
+) -> Dict[str, int]:
+    """
+    Réencoder les certificats existants et les déplacer dans l'arborescence partitionnée.
+    Le chemin en base est mis à jour après l'écriture du nouveau fichier, puis l'ancien est supprimé.
+    Un fichier déjà au bon chemin est réécrit sur place si son encodage diffère du format cible
+    (ex. png -> png-palette); force réencode tout (réglages non lisibles dans le fichier, comme
+    CERTIFICATE_PNG_COMPRESS_LEVEL).
+    """
+    fmt = fmt or Config.CERTIFICATE_FORMAT
+    stats = {'scanned': 0, 'migrated': 0, 'skipped': 0, 'missing': 0, 'bytes_before': 0, 'bytes_after': 0}
+    thumbnails = Config.CERTIFICATE_THUMBNAIL_WIDTH > 0
+    last_id = 0
+
+    while True:
+        rows = database.get_certificate_paths(after_id=last_id, limit=batch_size)
+        if not rows:
+            break
+
+        for row in rows:
+            last_id = row['id']
+            stats['scanned'] += 1
+            current = row['certificate_path']
+            target = target_certificate_path(current, fmt)
+            source = certificate_abspath(current)
+
+            if not os.path.exists(source):
+                stats['missing'] += 1
+                continue
+
+            if (not force and current == target and certificate_encoding(source) == fmt
+                    and (not thumbnails or os.path.exists(certificate_abspath(thumbnail_path(current))))):
+                stats['skipped'] += 1
+                continue
+
+            stats['bytes_before'] += os.path.getsize(source)
+            if dry_run:
+                stats['migrated'] += 1
+                continue
+
+            with Image.open(source) as im:
+                img = im.convert('RGB')
+            stem = os.path.splitext(os.path.basename(current))[0]
+            new_path = save_certificate(img, stem, fmt)
+            stats['bytes_after'] += os.path.getsize(certificate_abspath(new_path))
+
+            if new_path != current:
+                database.update_certificate_path(row['id'], new_path)
+                for old in (current, thumbnail_path(current)):
+                    try:
+                        os.remove(certificate_abspath(old))
+                    except FileNotFoundError:
+                        pass
+            stats['migrated'] += 1
+
+        if progress:
+            progress(dict(stats))
+
+    return stats
+
+
+def _parent_certificate(relative: str) -> str:
+    """Chemin du certificat auquel appartient une miniature (ou le chemin lui-même)"""
+    stem, ext = os.path.splitext(relative)
+    if stem.endswith(THUMBNAIL_SUFFIX):
+        return stem[:-len(THUMBNAIL_SUFFIX)] + ext
+    return relative
+
+
+def _scan_certificates() -> List[Tuple[float, int, str]]:
+    """Lister (mtime, taille, chemin relatif) de tous les fichiers du répertoire des certificats"""
+    entries = []
+    for root, _, files in os.walk(Config.CERTIFICATES_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            relative = os.path.relpath(path, Config.DATA_DIR).replace(os.sep, '/')
+            entries.append((stat.st_mtime, stat.st_size, relative))
+    return entries
+
+
+def _remove(relative: str) -> None:
+    try:
+        os.remove(certificate_abspath(relative))
+    except FileNotFoundError:
+        pass
+
+
+def sweep_certificates(
+    database,
+    max_bytes: Optional[int] = None,
+    max_age_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    grace_seconds: Optional[int] = None,
+    dry_run: bool = False,
+    progress: Optional[Callable[[str, Dict[str, int]], None]] = None
+) -> Dict[str, int]:
+    """
+    Nettoyer le répertoire des certificats en quatre passes, par lots:
+    1. chemins en base pointant vers un fichier absent -> mis à NULL
+    2. fichiers sans test correspondant (orphelins) -> supprimés
+    3. fichiers plus anciens que max_age_days -> supprimés et déréférencés
+    4. tant que le volume dépasse max_bytes, les plus anciens -> supprimés et déréférencés
+    """
+    max_bytes = Config.CERTIFICATE_MAX_BYTES if max_bytes is None else max_bytes
+    max_age_days = Config.CERTIFICATE_MAX_AGE_DAYS if max_age_days is None else max_age_days
+    batch_size = batch_size or Config.CERTIFICATE_GC_BATCH_SIZE
+    grace_seconds = Config.CERTIFICATE_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+
+    stats = {'dangling_cleared': 0, 'orphans_removed': 0, 'expired_removed': 0,
+             'budget_removed': 0, 'bytes_freed': 0, 'bytes_remaining': 0}
+
+    def report(phase):
+        if progress:
+            progress(phase, dict(stats))
+
+    # 1. Chemins pendants
+    last_id = 0
+    while True:
+        rows = database.get_certificate_paths(after_id=last_id, limit=batch_size)
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        missing = [row['certificate_path'] for row in rows
+                   if not os.path.exists(certificate_abspath(row['certificate_path']))]
+        if missing and not dry_run:
+            database.clear_certificate_paths(missing)
+        stats['dangling_cleared'] += len(missing)
+        report('dangling')
+
+    now = time.time()
+    entries = _scan_certificates()
+
+    # 2. Orphelins (les fichiers récents peuvent appartenir à un test en cours d'enregistrement)
+    kept = []
+    candidates = [entry for entry in entries if now - entry[0] >= grace_seconds]
+    recent = [entry for entry in entries if now - entry[0] < grace_seconds]
+    for start in range(0, len(candidates), batch_size):
+        batch = candidates[start:start + batch_size]
+        parents = sorted({_parent_certificate(relative) for _, _, relative in batch})
+        referenced = database.get_referenced_certificate_paths(parents)
+        for entry in batch:
+            if _parent_certificate(entry[2]) in referenced:
+                kept.append(entry)
+                continue
+            if not dry_run:
+                _remove(entry[2])
+            stats['orphans_removed'] += 1
+            stats['bytes_freed'] += entry[1]
+        report('orphans')
+    entries = kept + recent
+
+    def expire(selected, key):
+        """Supprimer des fichiers et déréférencer leurs certificats, par lots"""
+        for start in range(0, len(selected), batch_size):
+            batch = selected[start:start + batch_size]
+            if not dry_run:
+                for _, _, relative in batch:
+                    _remove(relative)
+                database.clear_certificate_paths(sorted({_parent_certificate(r) for _, _, r in batch}))
+            stats[key] += len(batch)
+            stats['bytes_freed'] += sum(size for _, size, _ in batch)
+            report(key)
+
+    # 3. Âge maximal
+    if max_age_days > 0:
+        cutoff = now - max_age_days * 86400
+        expired = [entry for entry in entries if entry[0] < cutoff]
+        entries = [entry for entry in entries if entry[0] >= cutoff]
+        expire(expired, 'expired_removed')
+
+    # 4. Budget disque: supprimer les plus anciens (certificat et miniature ensemble)
+    total = sum(size for _, size, _ in entries)
+    if max_bytes > 0 and total > max_bytes:
+        groups = {}
+        for entry in entries:
+            groups.setdefault(_parent_certificate(entry[2]), []).append(entry)
+        over_budget = []
+        for group in sorted(groups.values(), key=lambda g: min(e[0] for e in g)):
+            if total <= max_bytes:
+                break
+            over_budget.extend(group)
+            total -= sum(size for _, size, _ in group)
+        expire(over_budget, 'budget_removed')
+
+    stats['bytes_remaining'] = total
+    return stats
+
+
+class CertificateSweeper(threading.Thread):
+    """
+    Nettoyage périodique en arrière-plan. Un verrou fichier garantit qu'un seul
+    worker gunicorn exécute le nettoyage à un instant donné.
+    """
+
+    def __init__(self, database=None, interval: int = 3600):
+        super().__init__(name='certificate-sweeper', daemon=True)
+        self.database = database
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        from app_module.utils.database import get_db
+
+        lock_path = os.path.join(Config.DATA_DIR, '.certificates-gc.lock')
+        while not self._stop_event.wait(self.interval):
+            try:
+                with open(lock_path, 'w') as lock_file:
+                    if fcntl is not None:
+                        try:
+                            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        except BlockingIOError:
+                            continue
+                    stats = sweep_certificates(self.database or get_db())
+                    logger.info(f"Nettoyage des certificats: {stats}")
+            except Exception as e:
+                logger.error(f"Erreur lors du nettoyage des certificats: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_certificate_sweeper(database=None) -> Optional[CertificateSweeper]:
+    """
+    Démarrer le nettoyage en arrière-plan si CERTIFICATE_GC_INTERVAL est défini.
+    Sans base explicite, l'instance partagée n'est ouverte qu'au premier passage.
+    """
+    if Config.CERTIFICATE_GC_INTERVAL <= 0:
+        return None
+    sweeper = CertificateSweeper(database, Config.CERTIFICATE_GC_INTERVAL)
+    sweeper.start()
+    return sweeper
@@ -0,0 +1,65 @@
+"""
+Graphiques compacts pour les callbacks Dash: les distributions sont découpées en classes côté
+serveur (NumPy) et envoyées sous forme de barres, jamais comme valeurs brutes à regrouper
+dans le navigateur. Le thème COMPACT_TEMPLATE ne reprend du thème plotly que les réglages
+utilisés par les graphiques 2D (le thème complet pèse ~7 Ko par figure).
+"""
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+from typing import Optional, Sequence, Tuple
+
+# Thème 'plotly' réduit aux graphiques cartésiens et camemberts
+_AXIS = {'gridcolor': 'white', 'linecolor': 'white', 'ticks': '', 'zerolinecolor': 'white',
+         'zerolinewidth': 2, 'automargin': True, 'title': {'standoff': 15}}
+COMPACT_TEMPLATE = go.layout.Template(layout={
+    'colorway': pio.templates['plotly'].layout.colorway,
+    'font': {'color': '#2a3f5f'},
+    'hovermode': 'closest',
+    'hoverlabel': {'align': 'left'},
+    'paper_bgcolor': 'white',
+    'plot_bgcolor': '#E5ECF6',
+    'title': {'x': 0.05},
+    'xaxis': _AXIS,
+    'yaxis': _AXIS,
+})
+
+
+def bin_edges(values: np.ndarray, bins: int = 30, value_range: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """Bornes de classes (valeurs manquantes ignorées)"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.histogram_bin_edges(values[~np.isnan(values)], bins=bins, range=value_range)
+
+
+def bin_codes(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Classe de chaque valeur selon les bornes (-1 si manquante), comme np.histogram"""
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.full(len(values), -1, dtype=np.intp)
+    present = ~np.isnan(values)
+    codes[present] = np.clip(np.searchsorted(edges, values[present], side='right') - 1, 0, len(edges) - 2)
+    return codes
+
+
+def histogram_bins(values: np.ndarray, bins: int = 30,
+                   value_range: Optional[Tuple[float, float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """(effectifs, bornes) d'une distribution de valeurs brutes"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.histogram(values[~np.isnan(values)], bins=bins, range=value_range)
+
+
+def histogram_figure(counts: Sequence[int], edges: np.ndarray, x_title: str,
+                     color: str, y_title: str = 'count', decimals: int = 2) -> go.Figure:
+    """Histogramme déjà calculé: une barre par classe (centre arrondi, largeur de la classe)"""
+    edges = np.asarray(edges, dtype=np.float64)
+    centers = np.round((edges[:-1] + edges[1:]) / 2, decimals)
+    widths = np.diff(edges)
+    figure = go.Figure(go.Bar(
+        x=centers,
+        y=np.asarray(counts).tolist(),
+        # Une seule largeur si les classes sont régulières (cas de np.histogram_bin_edges)
+        width=float(widths[0]) if np.allclose(widths, widths[0]) else np.round(widths, decimals),
+        marker_color=color,
+        hovertemplate=f'{x_title}=%{{x}}<br>{y_title}=%{{y}}<extra></extra>'
+    ))
+    figure.update_layout(template=COMPACT_TEMPLATE, bargap=0, xaxis_title=x_title, yaxis_title=y_title)
+    return figure
@@ -0,0 +1,152 @@
+"""
+Encodage compact des colonnes input_features et explanation de la table tests.
+
+- input_features: enregistrement à schéma fixe (un octet par variable catégorielle,
+  un float64 par variable numérique), ~40 octets au lieu de ~400 en JSON
+- explanation: valeurs SHAP quantifiées sur int16 avec un facteur d'échelle commun
+
+Les valeurs hors schéma retombent sur du JSON; la lecture accepte les deux formats.
+"""
+import json
+import math
+import struct
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+YES_NO = ('No', 'Yes')
+
+# Ordre des colonnes du pipeline: (nom, modalités) ou (nom, None) pour une variable numérique
+FEATURE_SCHEMA: List[Tuple[str, Optional[Tuple[str, ...]]]] = [
+    ('HeartDisease', YES_NO),
+    ('BMI', None),
+    ('Smoking', YES_NO),
+    ('AlcoholDrinking', YES_NO),
+    ('Stroke', YES_NO),
+    ('PhysicalHealth', None),
+    ('MentalHealth', None),
+    ('DiffWalking', YES_NO),
+    ('Sex', ('Female', 'Male')),
+    ('AgeCategory', ('18-24', '25-29', '30-34', '35-39', '40-44', '45-49', '50-54', '55-59', '60-64',
+                     '65-69', '70-74', '75-79', '80 or older')),
+    ('Race', ('American Indian/Alaskan Native', 'Asian', 'Black', 'Hispanic', 'Other', 'White')),
+    ('Diabetic', ('No', 'No, borderline diabetes', 'Yes', 'Yes (during pregnancy)')),
+    ('PhysicalActivity', YES_NO),
+    ('GenHealth', ('Excellent', 'Fair', 'Good', 'Poor', 'Very good')),
+    ('SleepTime', None),
+    ('Asthma', YES_NO),
+    ('KidneyDisease', YES_NO),
+]
+
+FEATURE_NAMES = [name for name, _ in FEATURE_SCHEMA]
+
+_FEATURES_MAGIC = b'F\x01'
+_FEATURES_STRUCT = struct.Struct('<' + ''.join('d' if values is None else 'B' for _, values in FEATURE_SCHEMA))
+
+_SHAP_MAGIC = b'S\x01'
+_SHAP_HEADER = struct.Struct('<dfB')
+_SHAP_ITEM = struct.Struct('<Bh')
+_SHAP_TOP = 10
+
+Stored = Union[str, bytes, None]
+
+
+def pack_features(features: Dict[str, Any]) -> Optional[bytes]:
+    """Encoder les 17 variables; None si le dict ne respecte pas le schéma"""
+    if set(features) != set(FEATURE_NAMES):
+        return None
+    values = []
+    for name, categories in FEATURE_SCHEMA:
+        value = features[name]
+        if categories is None:
+            try:
+                values.append(float(value))
+            except (TypeError, ValueError):
+                return None
+        elif value in categories:
+            values.append(categories.index(value))
+        else:
+            return None
+    return _FEATURES_MAGIC + _FEATURES_STRUCT.pack(*values)
+
+
+def unpack_features(data: bytes) -> Dict[str, Any]:
+    """Décoder un enregistrement produit par pack_features"""
+    values = _FEATURES_STRUCT.unpack(data[len(_FEATURES_MAGIC):])
+    return {
+        name: value if categories is None else categories[value]
+        for (name, categories), value in zip(FEATURE_SCHEMA, values)
+    }
+
+
+def pack_explanation(explanation: Dict[str, Any]) -> Optional[bytes]:
+    """Encoder une explication SHAP (base_value + all_features); None si la forme est inattendue"""
+    if set(explanation) != {'base_value', 'top_features', 'all_features'}:
+        return None
+    items = explanation['all_features']
+    if len(items) > 255 or explanation['top_features'] != items[:_SHAP_TOP]:
+        return None
+    try:
+        indices = [FEATURE_NAMES.index(item['feature']) for item in items]
+    except ValueError:
+        return None
+
+    values = [float(item['shap_value']) for item in items]
+    peak = max((abs(v) for v in values), default=0.0)
+    scale = peak / 32767 if peak > 0 else 1.0
+    base_value = explanation['base_value']
+
+    parts = [_SHAP_MAGIC, _SHAP_HEADER.pack(math.nan if base_value is None else float(base_value), scale, len(items))]
+    parts.extend(_SHAP_ITEM.pack(index, round(value / scale)) for index, value in zip(indices, values))
+    return b''.join(parts)
+
+
+def unpack_explanation(data: bytes) -> Dict[str, Any]:
+    """Décoder une explication produite par pack_explanation"""
+    offset = len(_SHAP_MAGIC)
+    base_value, scale, count = _SHAP_HEADER.unpack_from(data, offset)
+    offset += _SHAP_HEADER.size
+    all_features = []
+    for _ in range(count):
+        index, quantized = _SHAP_ITEM.unpack_from(data, offset)
+        offset += _SHAP_ITEM.size
+        all_features.append({'feature': FEATURE_NAMES[index], 'shap_value': quantized * scale})
+    return {
+        'base_value': None if math.isnan(base_value) else base_value,
+        'top_features': all_features[:_SHAP_TOP],
+        'all_features': all_features,
+    }
+
+
+def encode_features(features: Dict[str, Any], compact: bool) -> Stored:
+    """Valeur à stocker pour input_features"""
+    if compact:
+        packed = pack_features(features)
+        if packed is not None:
+            return packed
+    return json.dumps(features)
+
+
+def encode_explanation(explanation: Optional[Dict[str, Any]], compact: bool) -> Stored:
+    """Valeur à stocker pour explanation"""
+    if not explanation:
+        return None
+    if compact:
+        packed = pack_explanation(explanation)
+        if packed is not None:
+            return packed
+    return json.dumps(explanation)
+
+
+def decode_features(value: Stored) -> Dict[str, Any]:
+    """Lire input_features quel que soit le format stocké"""
+    if isinstance(value, bytes):
+        return unpack_features(value)
+    return json.loads(value) if value else {}
+
+
+def decode_explanation(value: Stored) -> Optional[Dict[str, Any]]:
+    """Lire explanation quel que soit le format stocké"""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        return unpack_explanation(value)
+    return json.loads(value)
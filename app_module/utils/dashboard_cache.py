@@ -0,0 +1,129 @@
+"""
+Mémoïsation des callbacks du dashboard: LRU en mémoire devant une table SQLite partagée
+par les workers gunicorn (data/cache/dashboard.db).
+
+Les valeurs sont des structures JSON (compteurs, tableaux des graphiques), indexées par
+espace de noms, version des données et tuple normalisé des filtres.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Sequence, Tuple
+from app_module.config.settings import Config
+from app_module.utils import get_logger
+from app_module.utils.data_cube import normalize_selection
+
+logger = get_logger(__name__)
+
+_MISSING = object()
+
+
+def filter_key(values: Sequence[Any]) -> Tuple:
+    """Tuple canonique des filtres: ['Yes', 'No'], ['No', 'Yes', 'No'] -> ('No', 'Yes'); sans filtre -> None"""
+    key = []
+    for value in values:
+        selection = normalize_selection(value)
+        key.append(None if selection is None else tuple(sorted(set(map(str, selection)))))
+    return tuple(key)
+
+
+class DashboardCache:
+    """
+    LRU par processus (max_size entrées) + table partagée bornée à max_entries lignes
+    (les plus anciennes sont supprimées). Sans chemin, seul le LRU est utilisé.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: Optional[int] = None,
+                 max_entries: Optional[int] = None):
+        self.path = Config.DASHBOARD_CACHE_PATH if path is None else path
+        self.max_size = Config.DASHBOARD_CACHE_SIZE if max_size is None else max_size
+        self.max_entries = Config.DASHBOARD_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._lru: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = self.shared_hits = self.misses = 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_created ON entries(created)")
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _remember(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    def _read_shared(self, key: str) -> Any:
+        try:
+            conn = self._connection()
+            if conn is None:
+                return _MISSING
+            row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache du dashboard illisible: {e}")
+            return _MISSING
+        return _MISSING if row is None else json.loads(row[0])
+
+    def _write_shared(self, key: str, value: Any) -> None:
+        try:
+            conn = self._connection()
+            if conn is None:
+                return
+            conn.execute("INSERT OR REPLACE INTO entries (key, value, created) VALUES (?, ?, ?)",
+                         (key, json.dumps(value, separators=(',', ':')), time.time()))
+            self._writes += 1
+            if self._writes % 100 == 0:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Écriture impossible dans le cache du dashboard: {e}")
+
+    def get_or_compute(self, namespace: str, version: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Valeur en cache pour (namespace, version, key), sinon compute() mémorisé (doit être sérialisable en JSON)"""
+        full_key = f"{namespace}|{version}|{json.dumps(key)}"
+        with self._lock:
+            value = self._lru.get(full_key, _MISSING)
+            if value is not _MISSING:
+                self._lru.move_to_end(full_key)
+                self.hits += 1
+                return value
+
+        value = self._read_shared(full_key)
+        if value is not _MISSING:
+            self.shared_hits += 1
+        else:
+            self.misses += 1
+            value = compute()
+            self._write_shared(full_key, value)
+        self._remember(full_key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+        try:
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM entries")
+        except sqlite3.Error as e:
+            logger.warning(f"Cache du dashboard non vidé: {e}")
@@ -0,0 +1,157 @@
+"""
+Statistiques de /api/dashboard/stats: chiffres clés du dataset et compteurs des tests
+(table tests_summary), précalculés et conservés DASHBOARD_STATS_TTL secondes.
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import pandas as pd
+from app_module.config.settings import Config
+from app_module.utils.data import YES_VALUES, load_dataset
+from app_module.utils.dataset_cache import ensure_dataset_cache, iter_cached_frames
+from app_module.utils.storage import utc_today
+
+RECENT_DAYS = 30
+
+
+COUNTED_COLUMNS = (('SkinCancer', 'skinCancerCases'), ('HeartDisease', 'heartDiseaseCases'), ('Smoking', 'smokers'))
+MEAN_COLUMNS = (('BMI', 'bmiMean'), ('SleepTime', 'sleepMean'))
+
+
+def dataset_statistics(frames) -> Dict[str, Any]:
+    """
+    Chiffres clés du dataset (mêmes définitions que les cartes du dashboard Dash), à partir
+    d'un DataFrame ou d'une suite de blocs (sommes partielles additionnées bloc par bloc)
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    rows = 0
+    counts: Dict[str, int] = {}
+    sums: Dict[str, List[float]] = {}
+    for df in frames:
+        rows += len(df)
+        for column, key in COUNTED_COLUMNS:
+            if column in df.columns:
+                counts[key] = counts.get(key, 0) + int(df[column].isin(YES_VALUES).sum())
+        for column, key in MEAN_COLUMNS:
+            if column in df.columns:
+                partial = sums.setdefault(key, [0.0, 0])
+                partial[0] += float(df[column].sum())
+                partial[1] += int(df[column].count())
+    if not rows:
+        return {'rows': 0}
+
+    stats = {'rows': rows, **counts}
+    if 'skinCancerCases' in stats:
+        stats['skinCancerRate'] = round(stats['skinCancerCases'] / rows, 4)
+    for key, (total, count) in sums.items():
+        stats[key] = round(total / count, 2) if count else None
+    return stats
+
+
+def prediction_statistics(database, today: Optional[date] = None) -> Dict[str, Any]:
+    """Compteurs des tests enregistrés, lus dans les agrégats (jamais dans la table tests)"""
+    summary = database.get_summary()
+    today = today or utc_today()
+    since = (today - timedelta(days=RECENT_DAYS)).strftime('%Y-%m-%d')
+
+    daily: Dict[str, Dict[str, int]] = {}
+    for row in database.get_daily_counts(since=since):
+        day = daily.setdefault(row['day'], {'total': 0, 'risk': 0})
+        day['total'] += row['count']
+        if row['prediction'] == 1:
+            day['risk'] += row['count']
+
+    week_start = (today - timedelta(days=6)).strftime('%Y-%m-%d')
+    return {
+        'total': summary['total'],
+        'risk': summary['risk'],
+        'riskRate': round(summary['risk'] / summary['total'], 4) if summary['total'] else 0.0,
+        'byModel': summary['by_model'],
+        'today': daily.get(today.strftime('%Y-%m-%d'), {}).get('total', 0),
+        'last7Days': sum(day['total'] for key, day in daily.items() if key >= week_start),
+        'daily': [{'day': key, **value} for key, value in sorted(daily.items())],
+    }
+
+
+class StatsCache:
+    """
+    Dernier résultat calculé, avec son ETag. Passé le TTL, un seul thread recalcule;
+    les autres continuent de servir la valeur précédente pendant ce temps.
+    """
+
+    def __init__(self, compute: Callable[[], Dict[str, Any]], ttl: Optional[float] = None):
+        self.compute = compute
+        self.ttl = Config.DASHBOARD_STATS_TTL if ttl is None else ttl
+        self._value: Optional[Tuple[Dict[str, Any], str, float]] = None
+        self._refresh_lock = threading.Lock()
+
+    def _refresh(self) -> Tuple[Dict[str, Any], str, float]:
+        payload = self.compute()
+        body = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        self._value = (payload, etag, time.time())
+        return self._value
+
+    def get(self) -> Tuple[Dict[str, Any], str, float]:
+        """(données, etag, instant du calcul)"""
+        value = self._value
+        if value is not None and time.time() - value[2] < self.ttl:
+            return value
+        if value is not None and not self._refresh_lock.acquire(blocking=False):
+            return value
+        if value is None:
+            self._refresh_lock.acquire()
+        try:
+            current = self._value
+            if current is not None and time.time() - current[2] < self.ttl:
+                return current
+            return self._refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def invalidate(self) -> None:
+        self._value = None
+
+
+def compute_dashboard_stats() -> Dict[str, Any]:
+    """Contenu de /api/dashboard/stats (clés attendues par static/dashboard.js au premier niveau)"""
+    from app_module.utils.database import get_db
+
+    tests = prediction_statistics(get_db())
+    return {
+        'totalPredictions': tests['total'],
+        'positiveCases': tests['risk'],
+        'riskRate': tests['riskRate'],
+        'tests': tests,
+        'dataset': _dataset_statistics(),
+    }
+
+
+_dataset_stats: Optional[Tuple[Any, Dict[str, Any]]] = None
+
+
+def _dataset_statistics() -> Dict[str, Any]:
+    # Le dataset partagé ne change qu'avec le CSV: calcul une fois par DataFrame (ou par version de la copie)
+    global _dataset_stats
+    try:
+        meta = ensure_dataset_cache(Config.DATASET_PATH, Config.DATASET_CACHE_DIR)
+    except Exception:
+        meta = None
+    if meta is not None and meta['rows'] > Config.DASHBOARD_OUT_OF_CORE_ROWS:
+        if _dataset_stats is None or _dataset_stats[0] != meta['sha256']:
+            columns = [column for column, _ in COUNTED_COLUMNS + MEAN_COLUMNS]
+            _dataset_stats = (meta['sha256'],
+                              dataset_statistics(iter_cached_frames(Config.DATASET_CACHE_DIR, meta, columns)))
+        return _dataset_stats[1]
+
+    df = load_dataset(Config.DATASET_PATH)
+    if _dataset_stats is None or _dataset_stats[0] is not df:
+        _dataset_stats = (df, dataset_statistics(df))
+    return _dataset_stats[1]
+
+
+stats_cache = StatsCache(compute_dashboard_stats)
@@ -3,6 +3,10 @@ Utilitaires pour traitement des données
 """
 import pandas as pd
 from typing import Dict, List
+from app_module.utils.dataset_cache import get_dataset_frame
+
+# Valeurs comptées comme positives ('Yes'/'No' ou 1/0 ou True/False)
+YES_VALUES = [1, 'Yes', 'yes', 'YES', True]
 
 
 def binary_transform(df: pd.DataFrame) -> pd.DataFrame:
@@ -43,7 +47,14 @@ def prepare_prediction_input(form_data: Dict) -> pd.DataFrame:
 
 
 def load_dataset(dataset_path: str) -> pd.DataFrame:
-    """Charger le dataset"""
+    """
+    Charger le dataset depuis sa copie binaire en colonnes (colonnes textuelles en dtype category).
+    Le DataFrame est partagé dans le processus: ne pas le modifier en place.
+    """
+    try:
+        return get_dataset_frame(dataset_path)
+    except Exception as e:
+        print(f"Cache binaire du dataset indisponible, lecture du CSV: {e}")
     try:
         return pd.read_csv(dataset_path)
     except Exception as e:
@@ -51,6 +62,12 @@ def load_dataset(dataset_path: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
+def as_object_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes category -> chaînes Python, la forme attendue par les pipelines entraînés sur le CSV"""
+    categorical = df.select_dtypes('category').columns
+    return df.astype({col: object for col in categorical}) if len(categorical) else df
+
+
 def get_value_options(df: pd.DataFrame, column: str) -> List[Dict]:
     """Obtenir les options pour un dropdown"""
     try:
@@ -0,0 +1,255 @@
+"""
+Cube pré-agrégé du dashboard: pour chaque combinaison des valeurs des filtres (AgeCategory x
+Smoking x Sex x PhysicalActivity, 104 cellules), effectifs, distributions, tableau croisé
+HeartDisease x SkinCancer, histogramme du BMI et sommes des colonnes numériques.
+
+Construit une fois au chargement du dataset, en une fois depuis le DataFrame ou bloc par bloc
+(DataCube.from_chunks) pour les datasets qui ne tiennent pas en mémoire. Une sélection de filtres
+additionne les cellules retenues: le coût d'un callback dépend du nombre de cellules, pas du
+nombre de lignes.
+"""
+import hashlib
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from app_module.utils.charts import bin_codes, bin_edges
+
+
+def normalize_selection(value: Any) -> Optional[List[Any]]:
+    """Valeur d'un dropdown (scalaire, liste, 'all') -> liste de valeurs, ou None = pas de filtre"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return None if value == 'all' else [value]
+    values = list(value)
+    if not values or 'all' in values:
+        return None
+    return values
+
+
+class DataCube:
+    """
+    Tableaux NumPy de forme (n_valeurs de chaque dimension) + (axe de la mesure):
+    counts, distributions par colonne, tableaux croisés, histogrammes et sommes
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        dimensions: Sequence[str],
+        distributions: Iterable[str] = (),
+        crosstabs: Iterable[Tuple[str, str]] = (),
+        sums: Iterable[str] = (),
+        histograms: Optional[Dict[str, int]] = None
+    ):
+        # Dimensions absentes du dataset ignorées (aucun filtre sur ces colonnes)
+        dimensions = [column for column in dimensions if column in df.columns]
+        distributions, crosstabs = list(distributions), list(crosstabs)
+        categories, codes = {}, {}
+        for column in [*dimensions, *distributions, *(c for pair in crosstabs for c in pair)]:
+            categorical = df[column].astype('category')
+            categories[column] = categorical.cat.categories
+            codes[column] = categorical.cat.codes.to_numpy()
+        valid = self._valid_rows(codes, dimensions, len(df))
+        # Bornes communes à toutes les cellules (calculées sur le dataset complet)
+        edges = {column: bin_edges(df[column].to_numpy(dtype=np.float64)[valid], bins)
+                 for column, bins in (histograms or {}).items()}
+
+        self._allocate(dimensions, categories, distributions, crosstabs, sums, edges)
+        self._add_chunk(codes, df, valid)
+        self._finish()
+
+    @classmethod
+    def from_chunks(
+        cls,
+        chunks: Callable[[], Iterable[pd.DataFrame]],
+        categories: Dict[str, pd.Index],
+        dimensions: Sequence[str],
+        distributions: Iterable[str] = (),
+        crosstabs: Iterable[Tuple[str, str]] = (),
+        sums: Iterable[str] = (),
+        histograms: Optional[Dict[str, int]] = None
+    ) -> 'DataCube':
+        """
+        Cube d'un dataset lu bloc par bloc (chunks() renvoie un nouvel itérateur de DataFrame à
+        chaque appel), les colonnes catégorielles ayant les modalités `categories` dans tous les
+        blocs. Les effectifs s'additionnent: seul le bloc courant est en mémoire. Avec des
+        histogrammes, un premier passage calcule le min/max pour fixer les bornes.
+        """
+        cube = cls.__new__(cls)
+        dimensions, distributions, crosstabs = list(dimensions), list(distributions), list(crosstabs)
+        columns = [*dimensions, *distributions, *(c for pair in crosstabs for c in pair)]
+        cube_categories = {column: categories[column] for column in columns}
+
+        def chunk_codes(chunk):
+            return {column: chunk[column].cat.codes.to_numpy() for column in columns}
+
+        edges = {}
+        if histograms:
+            bounds = {column: [np.inf, -np.inf] for column in histograms}
+            for chunk in chunks():
+                valid = cls._valid_rows(chunk_codes(chunk), dimensions, len(chunk))
+                for column, bound in bounds.items():
+                    values = chunk[column].to_numpy(dtype=np.float64)[valid]
+                    values = values[~np.isnan(values)]
+                    if len(values):
+                        bound[0], bound[1] = min(bound[0], values.min()), max(bound[1], values.max())
+            # Bornes de [min, max]: identiques à celles calculées sur toutes les valeurs
+            edges = {column: bin_edges(np.array(bounds[column]) if np.isfinite(bounds[column][0]) else np.zeros(0),
+                                       bins)
+                     for column, bins in histograms.items()}
+
+        cube._allocate(dimensions, cube_categories, distributions, crosstabs, sums, edges)
+        for chunk in chunks():
+            codes = chunk_codes(chunk)
+            cube._add_chunk(codes, chunk, cls._valid_rows(codes, dimensions, len(chunk)))
+        cube._finish()
+        return cube
+
+    @staticmethod
+    def _valid_rows(codes: Dict[str, np.ndarray], dimensions: Sequence[str], size: int) -> np.ndarray:
+        # Lignes sans valeur pour une dimension: hors cube
+        if not dimensions:
+            return np.ones(size, dtype=bool)
+        return np.logical_and.reduce([codes[column] >= 0 for column in dimensions])
+
+    def _allocate(self, dimensions, categories, distributions, crosstabs, sums, edges) -> None:
+        self.dimensions = list(dimensions)
+        self.categories = dict(categories)
+        self.shape = tuple(len(self.categories[column]) for column in self.dimensions)
+        self.counts = np.zeros(self.shape, dtype=np.int64)
+        self.distributions: Dict[str, np.ndarray] = {
+            column: np.zeros(self.shape + (len(self.categories[column]),), dtype=np.int64)
+            for column in distributions
+        }
+        self.crosstabs: Dict[Tuple[str, str], np.ndarray] = {
+            (rows, cols): np.zeros(self.shape + (len(self.categories[rows]), len(self.categories[cols])),
+                                   dtype=np.int64)
+            for rows, cols in crosstabs
+        }
+        # Sommes et effectifs non manquants, pour des moyennes identiques à Series.mean()
+        self.sums: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            column: (np.zeros(self.shape), np.zeros(self.shape, dtype=np.int64)) for column in sums
+        }
+        self.histograms: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            column: (np.zeros(self.shape + (len(column_edges) - 1,), dtype=np.int64), column_edges)
+            for column, column_edges in edges.items()
+        }
+
+    def _add_chunk(self, codes: Dict[str, np.ndarray], df: pd.DataFrame, valid: np.ndarray) -> None:
+        """Ajoute aux tableaux les lignes d'un bloc (codes des colonnes catégorielles fournis)"""
+        n_cells = int(np.prod(self.shape))
+        dim_codes = [codes[column][valid].astype(np.intp) for column in self.dimensions]
+        cells = np.ravel_multi_index(dim_codes, self.shape) if dim_codes else np.zeros(0, np.intp)
+
+        self.counts += np.bincount(cells, minlength=n_cells).reshape(self.shape)
+
+        for column, table in self.distributions.items():
+            table += self._count_by_cell(cells, codes[column][valid], len(self.categories[column]))
+
+        for (rows, cols), table in self.crosstabs.items():
+            n_rows, n_cols = len(self.categories[rows]), len(self.categories[cols])
+            row_codes = codes[rows][valid].astype(np.intp)
+            col_codes = codes[cols][valid].astype(np.intp)
+            pair = np.where((row_codes >= 0) & (col_codes >= 0), row_codes * n_cols + col_codes, -1)
+            table += self._count_by_cell(cells, pair, n_rows * n_cols).reshape(self.shape + (n_rows, n_cols))
+
+        for column, (total, count) in self.sums.items():
+            values = df[column].to_numpy(dtype=np.float64)[valid]
+            present = ~np.isnan(values)
+            total += np.bincount(cells[present], weights=values[present], minlength=n_cells).reshape(self.shape)
+            count += np.bincount(cells[present], minlength=n_cells).reshape(self.shape)
+
+        for column, (table, edges) in self.histograms.items():
+            values = df[column].to_numpy(dtype=np.float64)[valid]
+            table += self._count_by_cell(cells, bin_codes(values, edges), len(edges) - 1)
+
+    def _finish(self) -> None:
+        # Empreinte du contenu: version des résultats mémoïsés (change avec le dataset)
+        digest = hashlib.sha256(repr(self.shape).encode('ascii'))
+        for array in [self.counts, *self.distributions.values(), *self.crosstabs.values(),
+                      *(a for pair in self.sums.values() for a in pair),
+                      *(a for pair in self.histograms.values() for a in pair)]:
+            digest.update(np.ascontiguousarray(array).tobytes())
+        self.fingerprint = digest.hexdigest()[:16]
+
+    def _count_by_cell(self, cells: np.ndarray, codes: np.ndarray, size: int) -> np.ndarray:
+        """Effectifs par (cellule, code); les codes négatifs (valeur manquante) sont ignorés"""
+        keep = codes >= 0
+        flat = cells[keep] * size + codes[keep].astype(np.intp)
+        return np.bincount(flat, minlength=int(np.prod(self.shape)) * size).reshape(self.shape + (size,))
+
+    def select(self, selections: Dict[str, Any]) -> 'CubeSelection':
+        """Cellules retenues par les filtres (mêmes valeurs que les dropdowns)"""
+        positions = []
+        for column in self.dimensions:
+            values = normalize_selection(selections.get(column))
+            if values is None:
+                positions.append(np.arange(len(self.categories[column])))
+            else:
+                indexer = self.categories[column].get_indexer(pd.Index(values))
+                positions.append(np.unique(indexer[indexer >= 0]))
+        return CubeSelection(self, np.ix_(*positions))
+
+
+class CubeSelection:
+    """Agrégats d'une sélection de cellules, calculés à la demande"""
+
+    def __init__(self, cube: DataCube, cells: Sequence[np.ndarray]):
+        self.cube = cube
+        self.cells = cells
+        self.dim_axes = tuple(range(len(cube.dimensions)))
+
+    def _merge(self, array: np.ndarray, keep_axis: Optional[int] = None) -> np.ndarray:
+        selected = array[self.cells]
+        axes = tuple(axis for axis in self.dim_axes if axis != keep_axis)
+        return selected.sum(axis=axes)
+
+    def __len__(self) -> int:
+        return int(self._merge(self.cube.counts))
+
+    def value_counts(self, column: str) -> pd.Series:
+        """Effectifs non nuls par valeur, décroissants (comme Series.value_counts)"""
+        cube = self.cube
+        if column in cube.dimensions:
+            axis = cube.dimensions.index(column)
+            merged = self._merge(cube.counts, keep_axis=axis)
+            categories = cube.categories[column][self.cells[axis].ravel()]
+        elif column in cube.distributions:
+            merged = self._merge(cube.distributions[column])
+            categories = cube.categories[column]
+        else:
+            for (rows, cols), table in cube.crosstabs.items():
+                if column in (rows, cols):
+                    merged = self._merge(table).sum(axis=1 if column == rows else 0)
+                    categories = cube.categories[column]
+                    break
+            else:
+                raise KeyError(column)
+        series = pd.Series(merged, index=pd.Index(categories, name=column), name='count')
+        return series[series > 0].sort_values(ascending=False, kind='stable')
+
+    def count_where(self, column: str, values: Iterable[Any]) -> int:
+        """Nombre de lignes dont la colonne prend une des valeurs données"""
+        counts = self.value_counts(column)
+        return int(counts[counts.index.isin(list(values))].sum())
+
+    def crosstab(self, rows: str, cols: str, full: bool = False) -> pd.DataFrame:
+        """Tableau croisé; full=True garde toutes les modalités, même sans effectif"""
+        merged = self._merge(self.cube.crosstabs[(rows, cols)])
+        table = pd.DataFrame(merged, index=pd.Index(self.cube.categories[rows], name=rows),
+                             columns=pd.Index(self.cube.categories[cols], name=cols))
+        if full:
+            return table
+        # Comme groupby(observed=True).unstack(): lignes et colonnes vides retirées
+        return table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+
+    def mean(self, column: str) -> float:
+        total, count = self.cube.sums[column]
+        n = self._merge(count)
+        return float(self._merge(total) / n) if n else float('nan')
+
+    def histogram(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(effectifs, bornes) de l'histogramme précalculé"""
+        counts, edges = self.cube.histograms[column]
+        return self._merge(counts), edges
@@ -1,25 +1,30 @@
 """
 Gestionnaire de base de données pour enregistrer les tests utilisateurs
 """
+import atexit
 import sqlite3
-import json
 import os
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Any, Sequence, Tuple
 from app_module.config.settings import Config
+from app_module.utils.db_writer import BatchWriter, INSERT_COLUMNS
+from app_module.utils.storage import TestStorage, decode_cursor, filter_clause, page_result
+from app_module.utils.codec import decode_explanation, decode_features, encode_explanation, encode_features
+from app_module.utils.migrations import column_exists, migrate, rebuild_summary
+from app_module.utils.archive import archive_path, list_archives, open_archive
 
+# Colonnes des vues liste: tout sauf l'explication SHAP, décodée seulement sur la page détail
+LIST_COLUMNS = 'id, timestamp, model_used, prediction, probability, input_features, certificate_path, user_ip'
 
-def column_exists(cursor, table_name, column_name):
-    """Vérifier si une colonne existe dans une table"""
-    cursor.execute(f"PRAGMA table_info({table_name})")
-    columns = [column[1] for column in cursor.fetchall()]
-    return column_name in columns
 
-
-class TestDatabase:
-    """Gestionnaire de base de données pour les tests"""
+class TestDatabase(TestStorage):
+    """Stockage des tests dans un fichier SQLite (backend par défaut)"""
+    
+    supports_compact_encoding = True
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, write_behind: Optional[bool] = None,
+                 compact: Optional[bool] = None, archive_dir: Optional[str] = None):
         """Initialiser la connexion à la base de données"""
         if db_path is None:
             db_path = os.path.join(Config.BASE_DIR, 'data', 'tests.db')
@@ -28,77 +33,190 @@ class TestDatabase:
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
         self.db_path = db_path
+        # Archives mensuelles, à côté de la base par défaut
+        self.archive_dir = archive_dir or Config.DB_ARCHIVE_DIR or os.path.join(os.path.dirname(db_path), 'archive')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
         self.init_database()
-        self.migrate_database()
+        
+        # Mode write-behind: les INSERT passent par un thread écrivain groupant les commits
+        if write_behind is None:
+            write_behind = Config.DB_WRITE_BEHIND
+        self.writer = BatchWriter(self) if write_behind else None
+        
+        # Encodage binaire compact des colonnes input_features / explanation
+        self.compact = Config.DB_COMPACT_ENCODING if compact is None else compact
     
     def get_connection(self):
-        """Obtenir une connexion à la base de données"""
-        conn = sqlite3.connect(self.db_path)
+        """
+        Obtenir la connexion persistante du thread courant.
+        Elle est ouverte à la première utilisation et réutilisée ensuite: ne pas la fermer.
+        """
+        if self._pid != os.getpid():
+            # Processus forké (worker gunicorn): ne jamais réutiliser les connexions du parent
+            self._local = threading.local()
+            self._connections = []
+            self._pid = os.getpid()
+        
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def _connect(self):
+        """Ouvrir une connexion et appliquer les pragmas de performance"""
+        # check_same_thread=False uniquement pour permettre close() depuis le thread d'arrêt;
+        # chaque connexion reste utilisée par un seul thread
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=Config.DB_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False
+        )
         conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        # WAL: les lecteurs ne bloquent plus l'écrivain (et inversement)
+        cursor.execute(f"PRAGMA journal_mode = {Config.DB_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {Config.DB_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(Config.DB_BUSY_TIMEOUT_MS)}")
+        # Valeur négative: taille en KiB plutôt qu'en pages
+        cursor.execute(f"PRAGMA cache_size = -{int(Config.DB_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(Config.DB_MMAP_SIZE)}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+        cursor.close()
         return conn
     
-    def init_database(self):
-        """Initialiser les tables de la base de données"""
+    def close(self):
+        """Vider la file d'écriture et fermer toutes les connexions ouvertes (arrêt du worker)"""
+        if self.writer is not None:
+            self.writer.close()
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                if self._pid == os.getpid():
+                    # Mettre à jour les statistiques du planificateur avant fermeture
+                    conn.execute("PRAGMA optimize")
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
+    def init_database(self) -> int:
+        """Mettre le schéma à jour (sans effet si PRAGMA user_version est déjà à jour)"""
+        return migrate(self.get_connection())
+    
+    def rebuild_summary(self) -> int:
+        """Recalculer entièrement les compteurs agrégés (réparation en cas de dérive), archives comprises"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tests (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                model_used TEXT NOT NULL,
-                prediction INTEGER NOT NULL,
-                probability REAL NOT NULL,
-                input_features TEXT NOT NULL,
-                explanation TEXT,
-                certificate_path TEXT,
-                user_ip TEXT
-            )
-        ''')
         
-        # Migration: Ajouter les colonnes manquantes si elles n'existent pas
-        if not column_exists(cursor, 'tests', 'certificate_path'):
-            try:
-                cursor.execute('ALTER TABLE tests ADD COLUMN certificate_path TEXT')
-                conn.commit()
-                print("[DB] Colonne certificate_path ajoutée")
-            except sqlite3.OperationalError as e:
-                print(f"[DB] Erreur ajout colonne certificate_path: {e}")
+        archived = []
+        for _, path in list_archives(self.archive_dir):
+            with open_archive(path) as archive:
+                archived.extend(tuple(row) for row in archive.execute('''
+                    SELECT date(timestamp), model_used, prediction, COUNT(*)
+                    FROM tests GROUP BY date(timestamp), model_used, prediction
+                ''').fetchall())
         
-        if not column_exists(cursor, 'tests', 'user_ip'):
-            try:
-                cursor.execute('ALTER TABLE tests ADD COLUMN user_ip TEXT')
-                conn.commit()
-                print("[DB] Colonne user_ip ajoutée")
-            except sqlite3.OperationalError as e:
-                print(f"[DB] Erreur ajout colonne user_ip: {e}")
+        with conn:
+            rebuild_summary(conn)
+            # Les compteurs couvrent tout l'historique: réintégrer les tests archivés
+            conn.executemany('''
+                INSERT INTO tests_summary (day, model_used, prediction, count) VALUES (?, ?, ?, ?)
+                ON CONFLICT(day, model_used, prediction) DO UPDATE SET count = count + excluded.count
+            ''', archived + [('', model, prediction, count) for _, model, prediction, count in archived])
         
-        conn.commit()
-        conn.close()
+        return self.get_test_count()
     
-    def migrate_database(self):
-        """Migrer la base de données pour ajouter les colonnes manquantes"""
+    def _sources(self, include_archive: bool = False, newest_first: bool = True):
+        """
+        Connexions à interroger dans l'ordre chronologique demandé: la base courante puis
+        les archives mensuelles (de la plus récente à la plus ancienne), ou l'inverse.
+        Chaque source couvre une plage de timestamps disjointe des autres.
+        """
+        archives = list_archives(self.archive_dir) if include_archive else []
+        if newest_first:
+            archives.reverse()
+        order = [None] + archives if newest_first else archives + [None]
+        for entry in order:
+            if entry is None:
+                yield self.get_connection()
+            else:
+                with open_archive(entry[1]) as conn:
+                    yield conn
+    
+    def archive_tests(
+        self,
+        older_than_days: Optional[int] = None,
+        batch_size: int = 1000,
+        vacuum: bool = True,
+        dry_run: bool = False,
+        progress=None
+    ) -> Dict[str, Any]:
+        """
+        Déplacer les tests plus anciens que older_than_days vers les archives mensuelles.
+        Chaque lot est d'abord validé dans l'archive puis supprimé de la base courante:
+        une interruption peut laisser un doublon (écrasé au passage suivant), jamais une perte.
+        Les compteurs agrégés sont cumulés et ne changent pas.
+        """
+        older_than_days = Config.DB_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M:%S')
         conn = self.get_connection()
-        cursor = conn.cursor()
+        stats = {'archived': 0, 'months': [], 'cutoff': cutoff}
         
-        # Migration: Ajouter les colonnes manquantes si elles n'existent pas
-        if not column_exists(cursor, 'tests', 'certificate_path'):
-            try:
-                cursor.execute('ALTER TABLE tests ADD COLUMN certificate_path TEXT')
-                conn.commit()
-                print("[DB] Colonne certificate_path ajoutée")
-            except sqlite3.OperationalError as e:
-                print(f"[DB] Erreur ajout colonne certificate_path: {e}")
+        if dry_run:
+            rows = conn.execute(
+                "SELECT strftime('%Y-%m', timestamp) AS month, COUNT(*) AS count FROM tests "
+                "WHERE timestamp < ? GROUP BY month ORDER BY month", (cutoff,)
+            ).fetchall()
+            stats['archived'] = sum(row['count'] for row in rows)
+            stats['months'] = [row['month'] for row in rows]
+            return stats
         
-        if not column_exists(cursor, 'tests', 'user_ip'):
-            try:
-                cursor.execute('ALTER TABLE tests ADD COLUMN user_ip TEXT')
-                conn.commit()
-                print("[DB] Colonne user_ip ajoutée")
-            except sqlite3.OperationalError as e:
-                print(f"[DB] Erreur ajout colonne user_ip: {e}")
+        while True:
+            rows = conn.execute(
+                'SELECT * FROM tests WHERE timestamp < ? ORDER BY timestamp, id LIMIT ?', (cutoff, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            
+            columns = rows[0].keys()
+            by_month = {}
+            for row in rows:
+                by_month.setdefault(row['timestamp'][:7], []).append(tuple(row))
+            
+            for month, month_rows in by_month.items():
+                with open_archive(archive_path(self.archive_dir, month), create=True) as archive:
+                    with archive:
+                        archive.executemany(
+                            f"INSERT OR REPLACE INTO tests ({', '.join(columns)}) "
+                            f"VALUES ({', '.join('?' * len(columns))})",
+                            month_rows
+                        )
+                if month not in stats['months']:
+                    stats['months'].append(month)
+            
+            ids = [row['id'] for row in rows]
+            with conn:
+                conn.execute(f"DELETE FROM tests WHERE id IN ({', '.join('?' * len(ids))})", ids)
+            stats['archived'] += len(ids)
+            if progress:
+                progress(dict(stats))
         
-        conn.close()
+        if stats['archived']:
+            for month in stats['months']:
+                with open_archive(archive_path(self.archive_dir, month)) as archive:
+                    archive.execute('ANALYZE')
+            if vacuum:
+                # Rendre l'espace libéré et reconstruire les index de la base courante
+                conn.execute('VACUUM')
+                conn.execute('ANALYZE')
+        
+        return stats
     
     def save_test(
         self,
@@ -111,79 +229,255 @@ class TestDatabase:
         user_ip: Optional[str] = None
     ) -> int:
         """Sauvegarder un test dans la base de données"""
+        row = self._test_row(model_used, prediction, probability, input_features,
+                             explanation, certificate_path, user_ip)
+        
+        if self.writer is not None:
+            # Attendre la validation du lot qui contient ce test
+            return self.writer.submit(row).result(timeout=Config.DB_WRITE_RESULT_TIMEOUT)
+        
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO tests 
-            (model_used, prediction, probability, input_features, explanation, certificate_path, user_ip)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        with conn:
+            cursor = conn.execute(f'''
+                INSERT INTO tests ({', '.join(INSERT_COLUMNS)})
+                VALUES ({', '.join('?' * len(INSERT_COLUMNS))})
+            ''', row)
+        
+        return cursor.lastrowid
+    
+    def insert_batch(self, rows: Sequence[Tuple]) -> List[int]:
+        """Insérer un lot dans une seule transaction (écriture groupée)"""
+        conn = self.get_connection()
+        with conn:
+            # BEGIN IMMEDIATE: verrou d'écriture pris avant de lire le dernier id,
+            # ce qui rend l'allocation de la plage sûre entre processus
+            conn.execute('BEGIN IMMEDIATE')
+            last_id = conn.execute('''
+                SELECT MAX(
+                    COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'tests'), 0),
+                    COALESCE((SELECT MAX(id) FROM tests), 0)
+                )
+            ''').fetchone()[0]
+            ids = list(range(last_id + 1, last_id + 1 + len(rows)))
+            placeholders = ', '.join('?' * (len(INSERT_COLUMNS) + 1))
+            conn.executemany(
+                f"INSERT INTO tests (id, {', '.join(INSERT_COLUMNS)}) VALUES ({placeholders})",
+                [(test_id,) + tuple(row) for test_id, row in zip(ids, rows)]
+            )
+        return ids
+    
+    def _test_row(self, model_used, prediction, probability, input_features, explanation, certificate_path, user_ip):
+        """Valeurs d'INSERT dans l'ordre de INSERT_COLUMNS"""
+        return (
             model_used,
             prediction,
             probability,
-            json.dumps(input_features),
-            json.dumps(explanation) if explanation else None,
+            encode_features(input_features, self.compact),
+            encode_explanation(explanation, self.compact),
             certificate_path,
             user_ip
-        ))
-        
-        test_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return test_id
+        )
     
     def get_all_tests(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """Récupérer tous les tests avec pagination"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT * FROM tests
+        cursor.execute(f'''
+            SELECT {LIST_COLUMNS} FROM tests
             ORDER BY timestamp DESC
             LIMIT ? OFFSET ?
         ''', (limit, offset))
         
         rows = cursor.fetchall()
-        conn.close()
         
-        tests = []
-        for row in rows:
-            test = dict(row)
-            test['input_features'] = json.loads(test['input_features'])
-            if test['explanation']:
-                test['explanation'] = json.loads(test['explanation'])
-            tests.append(test)
+        return [self._decode_row(row) for row in rows]
+    
+    def get_tests_page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        direction: str = 'next',
+        model: Optional[str] = None,
+        prediction: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        include_archive: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Récupérer une page de tests par pagination keyset (du plus récent au plus ancien).
+        Le coût ne dépend pas de la profondeur de la page, contrairement à OFFSET.
+        Avec include_archive, la page se poursuit dans les archives mensuelles.
+        
+        Returns:
+            dict: {'tests': [...], 'next_cursor': str|None, 'prev_cursor': str|None}
+        """
+        where, params = filter_clause(model, prediction, date_from, date_to)
+        
+        position = decode_cursor(cursor) if cursor else None
+        backwards = direction == 'prev' and position is not None
+        if position is not None:
+            where.append('(timestamp, id) > (?, ?)' if backwards else '(timestamp, id) < (?, ?)')
+            params.extend(position)
+        
+        order = 'ASC' if backwards else 'DESC'
+        sql = f'SELECT {LIST_COLUMNS} FROM tests'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY timestamp {order}, id {order} LIMIT ?'
+        
+        rows = []
+        for conn in self._sources(include_archive, newest_first=not backwards):
+            rows.extend(conn.execute(sql, params + [limit + 1 - len(rows)]).fetchall())
+            if len(rows) > limit:
+                break
+        
+        return page_result([self._decode_row(row) for row in rows], limit, backwards, position is not None)
+    
+    def iter_tests(
+        self,
+        chunk_size: int = 1000,
+        model: Optional[str] = None,
+        prediction: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        include_archive: bool = False
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Parcourir les tests filtrés par id croissant, par lots de chunk_size (export).
+        Chaque lot est une requête courte sur la clé primaire: mémoire constante et
+        aucune transaction de lecture maintenue ouverte pendant un long téléchargement.
+        Avec include_archive, les archives sont parcourues d'abord, de la plus ancienne à la plus récente.
+        """
+        where, params = filter_clause(model, prediction, date_from, date_to)
+        where.append('id > ?')
+        sql = f"SELECT {LIST_COLUMNS} FROM tests WHERE {' AND '.join(where)} ORDER BY id LIMIT ?"
         
-        return tests
+        for conn in self._sources(include_archive, newest_first=False):
+            last_id = 0
+            while True:
+                rows = conn.execute(sql, params + [last_id, chunk_size]).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]['id']
+                yield [self._decode_row(row) for row in rows]
+                if len(rows) < chunk_size:
+                    break
     
-    def get_test_by_id(self, test_id: int) -> Optional[Dict[str, Any]]:
-        """Récupérer un test par son ID"""
+    @staticmethod
+    def _decode_row(row) -> Dict[str, Any]:
+        """Convertir une ligne SQLite en dict en décodant les colonnes sélectionnées (JSON ou binaire)"""
+        test = dict(row)
+        if 'input_features' in test:
+            test['input_features'] = decode_features(test['input_features'])
+        if 'explanation' in test:
+            test['explanation'] = decode_explanation(test['explanation'])
+        return test
+    
+    def recode_storage(self, compact: bool = True, batch_size: int = 500, progress=None) -> int:
+        """
+        Réécrire input_features / explanation dans l'encodage demandé (binaire compact ou JSON),
+        par lots d'id croissants. Les lignes déjà au bon format sont ignorées.
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        last_id = 0
+        converted = 0
         
-        cursor.execute('SELECT * FROM tests WHERE id = ?', (test_id,))
-        row = cursor.fetchone()
-        conn.close()
+        while True:
+            rows = conn.execute(
+                'SELECT id, input_features, explanation FROM tests WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            
+            updates = []
+            for row in rows:
+                features = encode_features(decode_features(row['input_features']), compact)
+                explanation = encode_explanation(decode_explanation(row['explanation']), compact)
+                if features != row['input_features'] or explanation != row['explanation']:
+                    updates.append((features, explanation, row['id']))
+            
+            if updates:
+                with conn:
+                    conn.executemany('UPDATE tests SET input_features = ?, explanation = ? WHERE id = ?', updates)
+                converted += len(updates)
+            if progress:
+                progress(last_id, converted)
         
-        if row:
-            test = dict(row)
-            test['input_features'] = json.loads(test['input_features'])
-            if test['explanation']:
-                test['explanation'] = json.loads(test['explanation'])
-            return test
+        return converted
+    
+    def get_test_by_id(self, test_id: int, include_archive: bool = False) -> Optional[Dict[str, Any]]:
+        """Récupérer un test par son ID (dans les archives seulement si demandé)"""
+        for conn in self._sources(include_archive):
+            row = conn.execute('SELECT * FROM tests WHERE id = ?', (test_id,)).fetchone()
+            if row:
+                return self._decode_row(row)
         
         return None
     
+    def update_certificate_path(self, test_id: int, certificate_path: Optional[str]) -> None:
+        """Mettre à jour le chemin du certificat d'un test"""
+        conn = self.get_connection()
+        
+        with conn:
+            conn.execute('UPDATE tests SET certificate_path = ? WHERE id = ?', (certificate_path, test_id))
+    
+    def get_certificate_paths(self, after_id: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Récupérer par lots (ordre d'id croissant) les tests ayant un certificat"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT id, certificate_path FROM tests
+            WHERE id > ? AND certificate_path IS NOT NULL
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, limit))
+        
+        rows = [dict(row) for row in cursor.fetchall()]
+        
+        return rows
+    
+    def get_referenced_certificate_paths(self, paths: List[str]) -> set:
+        """Parmi les chemins donnés, retourner ceux qui sont référencés par un test (archivé ou non)"""
+        if not paths:
+            return set()
+        
+        placeholders = ','.join('?' * len(paths))
+        referenced = set()
+        # Les certificats des tests archivés ne sont pas des orphelins
+        for conn in self._sources(include_archive=True):
+            rows = conn.execute(
+                f'SELECT certificate_path FROM tests WHERE certificate_path IN ({placeholders})', paths
+            ).fetchall()
+            referenced.update(row['certificate_path'] for row in rows)
+        
+        return referenced
+    
+    def clear_certificate_paths(self, paths: List[str]) -> int:
+        """Retirer les chemins de certificats donnés des tests qui les référencent"""
+        if not paths:
+            return 0
+        conn = self.get_connection()
+        
+        placeholders = ','.join('?' * len(paths))
+        with conn:
+            cursor = conn.execute(
+                f'UPDATE tests SET certificate_path = NULL WHERE certificate_path IN ({placeholders})', paths
+            )
+        
+        return cursor.rowcount
+    
     def get_test_count(self) -> int:
-        """Obtenir le nombre total de tests"""
+        """Obtenir le nombre total de tests (compteurs agrégés, sans parcourir la table)"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT COUNT(*) as count FROM tests')
+        cursor.execute("SELECT COALESCE(SUM(count), 0) as count FROM tests_summary WHERE day = ''")
         result = cursor.fetchone()
-        conn.close()
         
         return result['count'] if result else 0
     
@@ -192,13 +486,95 @@ class TestDatabase:
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('SELECT COUNT(*) as count FROM tests WHERE prediction = 1')
+        cursor.execute("SELECT COALESCE(SUM(count), 0) as count FROM tests_summary WHERE day = '' AND prediction = 1")
         result = cursor.fetchone()
-        conn.close()
         
         return result['count'] if result else 0
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """Totaux par modèle et par prédiction"""
+        conn = self.get_connection()
+        rows = conn.execute(
+            "SELECT model_used, prediction, count FROM tests_summary WHERE day = ''"
+        ).fetchall()
+        
+        return self.summarize(rows)
+    
+    def get_daily_counts(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Compteurs par jour, modèle et prédiction (depuis la date 'YYYY-MM-DD' donnée)"""
+        conn = self.get_connection()
+        rows = conn.execute(
+            "SELECT day, model_used, prediction, count FROM tests_summary WHERE day > ? ORDER BY day",
+            (since or '',)
+        ).fetchall()
+        
+        return [dict(row) for row in rows]
+    
+    def get_live_snapshot(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Compteurs par jour et dernier id dans un même instantané (transaction de lecture WAL):
+        un test inséré entre les deux lectures ne peut être ni compté deux fois ni oublié
+        """
+        conn = self.get_connection()
+        with conn:
+            conn.execute('BEGIN')
+            last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM tests').fetchone()[0]
+            rows = conn.execute(
+                "SELECT day, model_used, prediction, count FROM tests_summary WHERE day > ? ORDER BY day",
+                (since or '',)
+            ).fetchall()
+        
+        return {'last_id': last_id, 'daily': [dict(row) for row in rows]}
+    
+    def get_tests_since(self, last_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Nouveaux tests depuis last_id (parcours de la clé primaire, sans relire la table)"""
+        conn = self.get_connection()
+        rows = conn.execute(
+            "SELECT id, timestamp, model_used, prediction, probability FROM tests WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)
+        ).fetchall()
+        
+        return [dict(row) for row in rows]
+
+
+_db: Optional[TestStorage] = None
+_db_lock = threading.Lock()
+
+
+def create_storage() -> TestStorage:
+    """Instancier le backend configuré (DB_BACKEND: 'sqlite' ou 'postgresql')"""
+    if Config.DB_BACKEND == 'postgresql':
+        from app_module.utils.postgres import PostgresTestDatabase
+        return PostgresTestDatabase()
+    if Config.DB_BACKEND != 'sqlite':
+        raise ValueError(f"DB_BACKEND inconnu: {Config.DB_BACKEND}")
+    return TestDatabase()
+
+
+def get_db() -> TestStorage:
+    """Instance partagée, créée (et le schéma vérifié) au premier accès"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                instance = create_storage()
+                atexit.register(instance.close)
+                _db = instance
+    return _db
+
+
+def _reset_lock_after_fork():
+    # gunicorn --preload: un thread du master (nettoyage des certificats) pouvait détenir le verrou au fork
+    global _db_lock
+    _db_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_lock_after_fork)
 
 
-# Instance globale
-db = TestDatabase()
+def __getattr__(name):
+    # Compatibilité: `from app_module.utils.database import db` crée l'instance à la demande
+    if name == 'db':
+        return get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
@@ -0,0 +1,311 @@
+"""
+Copie binaire en colonnes de data/dataset.csv.
+
+Chaque colonne est un fichier .npy (float64 pour les numériques, codes int8/int16 pour les
+catégorielles) chargé en mémoire mappée; meta.json décrit les colonnes, leurs modalités et
+la somme SHA-256 du CSV source. La copie est reconstruite dès que le CSV change.
+
+Le CSV est converti par blocs de DATASET_CHUNK_ROWS lignes et la copie peut être relue de
+même (iter_cached_frames): la mémoire utilisée ne dépend pas de la taille du dataset.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from app_module.config.settings import Config
+from app_module.utils import get_logger
+
+logger = get_logger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+META_FILE = 'meta.json'
+# Répertoire d'une version: 16 premiers caractères de la somme SHA-256 du CSV
+VERSION_DIR_PATTERN = re.compile(r'[0-9a-f]{16}')
+
+_frames: Dict[str, Any] = {}
+_frames_lock = threading.Lock()
+
+
+def _tmp_suffix() -> str:
+    """Suffixe des fichiers temporaires: propre au processus et au thread, plusieurs constructions
+    du même répertoire pouvant avoir lieu en même temps (workers, préchargement, commandes CLI)"""
+    return f'{os.getpid()}-{threading.get_ident()}'
+
+
+def file_checksum(path: str) -> str:
+    """SHA-256 d'un fichier, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_stat(csv_path: str) -> Dict[str, int]:
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_meta(cache_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(cache_dir, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == CACHE_FORMAT_VERSION else None
+
+
+def _write_meta(cache_dir: str, meta: Dict[str, Any]) -> None:
+    """Écriture atomique: un lecteur voit l'ancienne ou la nouvelle description, jamais un mélange"""
+    tmp_path = os.path.join(cache_dir, f'.{META_FILE}.{_tmp_suffix()}')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, META_FILE))
+
+
+def _save_array(path: str, values: np.ndarray) -> None:
+    """np.save via un fichier temporaire: un autre processus peut avoir mappé l'ancien fichier"""
+    tmp_path = f'{path}.{_tmp_suffix()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
+
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    """Même choix que pandas: int8 jusqu'à 127 modalités, puis int16, int32"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _publish_column(raw_path: str, path: str, rows: int, dtype: np.dtype,
+                    remap: Optional[np.ndarray] = None, chunk_rows: int = 0) -> None:
+    """Fichier brut des blocs -> .npy définitif (codes provisoires renumérotés par remap)"""
+    if not rows:
+        _save_array(path, np.zeros(0, dtype=dtype))
+        os.remove(raw_path)
+        return
+    source = np.memmap(raw_path, dtype=np.float64 if remap is None else np.int32, mode='r', shape=(rows,))
+    tmp_path = f'{path}.{_tmp_suffix()}.tmp'
+    target = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(rows,))
+    step = chunk_rows or rows
+    for start in range(0, rows, step):
+        block = np.asarray(source[start:start + step])
+        if remap is not None:
+            # -1 (valeur manquante) reste -1: remap[-1] vaut -1
+            block = remap[block]
+        target[start:start + step] = block
+    target.flush()
+    del target, source
+    os.replace(tmp_path, path)
+    os.remove(raw_path)
+
+
+def build_dataset_cache(csv_path: str, cache_dir: str, checksum: Optional[str] = None,
+                        chunk_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Convertir le CSV en colonnes .npy dans un sous-répertoire nommé d'après sa somme de contrôle,
+    puis publier meta.json. Les versions précédentes sont supprimées ensuite.
+
+    Lecture par blocs de chunk_rows lignes: les valeurs sont ajoutées à un fichier brut par
+    colonne (codes provisoires dans l'ordre d'apparition pour les colonnes textuelles), puis
+    chaque colonne est renumérotée selon ses modalités triées et écrite en .npy.
+    Fichiers bruts et temporaires sont propres au constructeur; os.replace publie chaque colonne:
+    des constructions concurrentes du même CSV écrivent le même contenu sans se gêner.
+    """
+    checksum = checksum or file_checksum(csv_path)
+    stat = _source_stat(csv_path)
+    chunk_rows = chunk_rows or Config.DATASET_CHUNK_ROWS
+
+    version_dir = checksum[:16]
+    target = os.path.join(cache_dir, version_dir)
+    os.makedirs(target, exist_ok=True)
+
+    names: List[str] = []
+    kinds: Dict[str, str] = {}
+    seen: Dict[str, Dict[str, int]] = {}
+    raw_files: Dict[str, Any] = {}
+    raw_paths: Dict[str, str] = {}
+    rows = 0
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+            if not names:
+                names = list(chunk.columns)
+                for index, name in enumerate(names):
+                    # Type fixé par le premier bloc; numériques toujours en float64 (NaN possibles plus loin)
+                    kinds[name] = 'numeric' if pd.api.types.is_numeric_dtype(chunk[name]) else 'category'
+                    seen[name] = {}
+                    raw_paths[name] = os.path.join(target, f'.{index:02d}.{_tmp_suffix()}.raw')
+                    raw_files[name] = open(raw_paths[name], 'wb')
+            for name in names:
+                series = chunk[name]
+                if kinds[name] == 'numeric':
+                    values = pd.to_numeric(series, errors='raise').to_numpy(dtype=np.float64)
+                else:
+                    mapping = seen[name]
+                    present = series.notna()
+                    labels = series[present].astype(str)
+                    for value in labels.unique():
+                        mapping.setdefault(value, len(mapping))
+                    # Codes provisoires = ordre d'apparition (ordre d'insertion de mapping)
+                    values = np.full(len(series), -1, dtype=np.int32)
+                    values[present.to_numpy()] = pd.Categorical(labels, categories=list(mapping)).codes
+                raw_files[name].write(values.tobytes())
+            rows += len(chunk)
+    except BaseException:
+        for name, handle in raw_files.items():
+            handle.close()
+            os.remove(raw_paths[name])
+        raise
+    for handle in raw_files.values():
+        handle.close()
+
+    columns = []
+    for index, name in enumerate(names):
+        filename = f'{index:02d}.npy'
+        raw_path = raw_paths[name]
+        if kinds[name] == 'numeric':
+            _publish_column(raw_path, os.path.join(target, filename), rows, np.dtype(np.float64),
+                            chunk_rows=chunk_rows)
+            columns.append({'name': name, 'kind': 'numeric', 'file': filename})
+        else:
+            # Modalités triées comme astype('category'); la dernière case de remap sert aux -1
+            categories = sorted(seen[name])
+            remap = np.full(len(categories) + 1, -1, dtype=np.int64)
+            for position, value in enumerate(categories):
+                remap[seen[name][value]] = position
+            _publish_column(raw_path, os.path.join(target, filename), rows, _codes_dtype(len(categories)),
+                            remap=remap, chunk_rows=chunk_rows)
+            columns.append({
+                'name': name,
+                'kind': 'category',
+                'file': filename,
+                'categories': categories
+            })
+
+    meta = {
+        'version': CACHE_FORMAT_VERSION,
+        'source': os.path.basename(csv_path),
+        'sha256': checksum,
+        'size': stat['size'],
+        'mtime_ns': stat['mtime_ns'],
+        'rows': rows,
+        'directory': version_dir,
+        'columns': columns,
+    }
+    _write_meta(cache_dir, meta)
+
+    # Anciennes versions: les processus qui les ont déjà mappées gardent leurs pages.
+    # Les autres répertoires (scores/ des probabilités précalculées) ne sont pas touchés.
+    for entry in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, entry)
+        if entry != version_dir and VERSION_DIR_PATTERN.fullmatch(entry) and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+    logger.info(f"Cache binaire du dataset construit: {rows} lignes, {len(columns)} colonnes ({version_dir})")
+    return meta
+
+
+def ensure_dataset_cache(csv_path: str, cache_dir: str) -> Dict[str, Any]:
+    """
+    Description du cache à jour pour ce CSV, reconstruit si nécessaire.
+    Taille et date identiques: aucun calcul; sinon la somme SHA-256 tranche.
+    """
+    meta = read_meta(cache_dir)
+    stat = _source_stat(csv_path)
+    if meta and meta['size'] == stat['size'] and meta['mtime_ns'] == stat['mtime_ns']:
+        return meta
+
+    os.makedirs(cache_dir, exist_ok=True)
+    checksum = file_checksum(csv_path)
+    if meta and meta['sha256'] == checksum:
+        # Fichier touché sans changement de contenu
+        meta.update(stat)
+        _write_meta(cache_dir, meta)
+        return meta
+
+    return build_dataset_cache(csv_path, cache_dir, checksum)
+
+
+def load_cached_frame(cache_dir: str, meta: Dict[str, Any], mmap: bool = True) -> pd.DataFrame:
+    """
+    DataFrame à partir du cache: colonnes numériques en mémoire mappée (partagées entre
+    processus via le cache de pages), colonnes textuelles en dtype category
+    """
+    directory = os.path.join(cache_dir, meta['directory'])
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(directory, column['file']), mmap_mode=mmap_mode)
+        if column['kind'] == 'category':
+            data[column['name']] = pd.Categorical.from_codes(np.asarray(values), categories=column['categories'])
+        else:
+            data[column['name']] = values
+    # copy=False: pas de consolidation en blocs 2D, les colonnes restent des vues sur les fichiers
+    return pd.DataFrame(data, copy=False)
+
+
+def cached_categories(meta: Dict[str, Any]) -> Dict[str, pd.Index]:
+    """Modalités des colonnes catégorielles du cache"""
+    return {column['name']: pd.Index(column['categories'])
+            for column in meta['columns'] if column['kind'] == 'category'}
+
+
+def iter_cached_frames(cache_dir: str, meta: Dict[str, Any], columns: Optional[Sequence[str]] = None,
+                       chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Le dataset par blocs de chunk_rows lignes, lus dans les fichiers mappés: seuls les blocs
+    en cours de traitement sont chargés (mêmes dtypes que load_cached_frame)
+    """
+    chunk_rows = chunk_rows or Config.DATASET_CHUNK_ROWS
+    arrays = _mapped_columns(cache_dir, meta, columns)
+    for start in range(0, meta['rows'], chunk_rows):
+        yield _rows_frame(arrays, start, min(start + chunk_rows, meta['rows']))
+
+
+def read_cached_rows(cache_dir: str, meta: Dict[str, Any], start: int, stop: int,
+                     columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Lignes [start, stop) de la copie (un bloc lu par un processus de calcul)"""
+    return _rows_frame(_mapped_columns(cache_dir, meta, columns), start, min(stop, meta['rows']))
+
+
+def _mapped_columns(cache_dir: str, meta: Dict[str, Any], columns: Optional[Sequence[str]]) -> List[tuple]:
+    directory = os.path.join(cache_dir, meta['directory'])
+    return [
+        (column['name'],
+         pd.CategoricalDtype(column['categories']) if column['kind'] == 'category' else None,
+         np.load(os.path.join(directory, column['file']), mmap_mode='r'))
+        for column in meta['columns'] if columns is None or column['name'] in columns
+    ]
+
+
+def _rows_frame(arrays: List[tuple], start: int, stop: int) -> pd.DataFrame:
+    data = {}
+    for name, dtype, values in arrays:
+        block = np.asarray(values[start:stop])
+        data[name] = block if dtype is None else pd.Categorical.from_codes(block, dtype=dtype)
+    return pd.DataFrame(data, index=pd.RangeIndex(start, stop), copy=False)
+
+
+def get_dataset_frame(csv_path: Optional[str] = None, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Dataset partagé du processus: chargé depuis le cache binaire (reconstruit si le CSV a changé)
+    et conservé en mémoire tant que le CSV ne change pas. Les appelants ne doivent pas le modifier.
+    """
+    csv_path = csv_path or Config.DATASET_PATH
+    cache_dir = cache_dir or Config.DATASET_CACHE_DIR
+
+    with _frames_lock:
+        meta = ensure_dataset_cache(csv_path, cache_dir)
+        cached = _frames.get(csv_path)
+        if cached is not None and cached[0] == meta['sha256']:
+            return cached[1]
+        frame = load_cached_frame(cache_dir, meta)
+        _frames[csv_path] = (meta['sha256'], frame)
+        return frame
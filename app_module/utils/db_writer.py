@@ -0,0 +1,112 @@
+"""
+Écriture groupée (group commit) des tests: un thread dédié vide une file bornée
+et insère les lignes par lots, une transaction (donc un fsync) par lot.
+L'insertion elle-même est déléguée au backend (TestStorage.insert_batch).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional, Tuple
+from app_module.config.settings import Config
+from app_module.utils import get_logger
+
+logger = get_logger(__name__)
+
+INSERT_COLUMNS = ('model_used', 'prediction', 'probability', 'input_features', 'explanation',
+                  'certificate_path', 'user_ip')
+
+_STOP = object()
+
+
+class WriterOverloaded(RuntimeError):
+    """La file d'écriture est pleine: l'appelant doit ralentir"""
+
+
+class BatchWriter:
+    """Thread écrivain regroupant les INSERT de la table tests"""
+
+    def __init__(self, database, batch_size: Optional[int] = None, queue_size: Optional[int] = None,
+                 max_delay_ms: Optional[int] = None, put_timeout: Optional[float] = None):
+        self.database = database
+        self.batch_size = batch_size or Config.DB_WRITE_BATCH_SIZE
+        self.queue_size = queue_size or Config.DB_WRITE_QUEUE_SIZE
+        self.max_delay = (Config.DB_WRITE_MAX_DELAY_MS if max_delay_ms is None else max_delay_ms) / 1000
+        self.put_timeout = Config.DB_WRITE_QUEUE_TIMEOUT if put_timeout is None else put_timeout
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        """Démarrer le thread à la première écriture (et à nouveau après un fork)"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='tests-batch-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, row: Tuple) -> Future:
+        """
+        Mettre une ligne en file. Le Future renvoie l'id du test une fois le lot validé.
+        Lève WriterOverloaded si la file reste pleine plus de put_timeout secondes.
+        """
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put((row, future), timeout=self.put_timeout)
+        except queue.Full:
+            raise WriterOverloaded("File d'écriture des tests saturée")
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            # Fenêtre de regroupement: attendre brièvement d'autres écritures
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch):
+        """Insérer un lot dans une seule transaction et résoudre les Futures"""
+        futures = [future for _, future in batch]
+        try:
+            ids = self.database.insert_batch([row for row, _ in batch])
+        except Exception as e:
+            logger.error(f"Erreur lors de l'écriture groupée de {len(batch)} tests: {e}")
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        for test_id, future in zip(ids, futures):
+            future.set_result(test_id)
+
+    def close(self, timeout: Optional[float] = None):
+        """Vider la file puis arrêter le thread (appelé à l'arrêt du worker)"""
+        with self._lock:
+            thread = self._thread
+            if thread is None or self._pid != os.getpid():
+                return
+            self._queue.put(_STOP)
+            self._thread = None
+        thread.join(timeout)
@@ -0,0 +1,153 @@
+"""
+Export en flux de la table tests (CSV ou Parquet), input_features aplaties en colonnes.
+
+Les tests sont lus par lots (TestDatabase.iter_tests) et chaque lot est écrit puis
+libéré: la mémoire reste constante quelle que soit la taille de la table.
+Parquet nécessite pyarrow (optionnel).
+"""
+import csv
+import io
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from app_module.utils.codec import FEATURE_NAMES, FEATURE_SCHEMA
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet indisponible, CSV uniquement
+    pa = None
+    pq = None
+
+BASE_COLUMNS = ['id', 'timestamp', 'model_used', 'prediction', 'probability', 'certificate_path']
+EXPORT_COLUMNS = BASE_COLUMNS + FEATURE_NAMES
+
+EXPORT_FORMATS = {
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+def flatten_test(test: Dict[str, Any]) -> Dict[str, Any]:
+    """Ligne d'export: colonnes de base puis une colonne par variable d'entrée"""
+    row = {column: test.get(column) for column in BASE_COLUMNS}
+    features = test.get('input_features') or {}
+    for name in FEATURE_NAMES:
+        row[name] = features.get(name)
+    return row
+
+
+def iter_csv(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[str]:
+    """Texte CSV: l'en-tête puis un bloc par lot de tests"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(flatten_test(test) for test in chunk)
+        yield buffer.getvalue()
+
+
+def _parquet_schema():
+    fields = [
+        pa.field('id', pa.int64()),
+        pa.field('timestamp', pa.string()),
+        pa.field('model_used', pa.string()),
+        pa.field('prediction', pa.int8()),
+        pa.field('probability', pa.float64()),
+        pa.field('certificate_path', pa.string()),
+    ]
+    fields.extend(pa.field(name, pa.string() if categories else pa.float64()) for name, categories in FEATURE_SCHEMA)
+    return pa.schema(fields)
+
+
+def _coerce_features(rows: List[Dict[str, Any]]) -> None:
+    """Aligner les valeurs sur le type Parquet (les anciennes lignes JSON peuvent varier)"""
+    for row in rows:
+        for name, categories in FEATURE_SCHEMA:
+            value = row[name]
+            if value is None:
+                continue
+            if categories:
+                row[name] = str(value)
+            else:
+                try:
+                    row[name] = float(value)
+                except (TypeError, ValueError):
+                    row[name] = None
+
+
+class _ChunkSink(io.RawIOBase):
+    """Fichier en écriture seule dont on récupère le contenu au fil de l'eau"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """Octets Parquet: un row group par lot, émis dès qu'il est écrit"""
+    if pq is None:
+        raise RuntimeError("L'export Parquet nécessite pyarrow (pip install pyarrow)")
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for chunk in chunks:
+            rows = [flatten_test(test) for test in chunk]
+            _coerce_features(rows)
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_tests(
+    database,
+    fmt: str = 'csv',
+    chunk_size: int = 5000,
+    progress: Optional[Callable[[int], None]] = None,
+    **filters
+) -> Iterator:
+    """
+    Flux d'export (str pour CSV, bytes pour Parquet) des tests correspondant aux filtres
+    (model, prediction, date_from, date_to)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu: {fmt}")
+
+    def chunks():
+        exported = 0
+        for chunk in database.iter_tests(chunk_size=chunk_size, **filters):
+            exported += len(chunk)
+            yield chunk
+            if progress:
+                progress(exported)
+
+    return iter_parquet(chunks()) if fmt == 'parquet' else iter_csv(chunks())
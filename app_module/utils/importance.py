@@ -0,0 +1,226 @@
+"""
+Importance globale des variables: moyenne des |SHAP| par feature originale, pour chaque modèle.
+
+compute_importance() tire un échantillon du dataset stratifié sur SkinCancer (graine fixe), le
+découpe en lots répartis entre les processus d'un pool (un lot = un modèle et une part de
+l'échantillon), puis fusionne les sommes des lots en moyennes. Chaque modèle donne un artefact
+JSON versionné dans IMPORTANCE_DIR ({modèle}-{sha modèle}-{sha dataset}.json), référencé par
+importance.json: seuls les modèles dont le fichier ou le dataset a changé sont recalculés.
+
+load_importance() relit un artefact une seule fois par version: l'API et le dashboard servent
+le résultat sans aucun calcul.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from app_module.config.settings import Config
+from app_module.utils import get_logger
+from app_module.utils.codec import FEATURE_NAMES
+from app_module.utils.data import as_object_columns
+from app_module.utils.dataset_cache import ensure_dataset_cache, file_checksum, load_cached_frame
+
+logger = get_logger(__name__)
+
+IMPORTANCE_INDEX = 'importance.json'
+STRATA = ('SkinCancer',)
+SAMPLE_SEED = 42
+
+
+def stratified_sample(df: pd.DataFrame, size: int, strata: Sequence[str] = STRATA,
+                      seed: int = SAMPLE_SEED) -> pd.DataFrame:
+    """Échantillon de `size` lignes respectant la part de chaque strate (au moins une ligne par strate)"""
+    if size >= len(df):
+        return df
+    columns = [column for column in strata if column in df.columns]
+    rng = np.random.default_rng(seed)
+    if not columns:
+        return df.iloc[np.sort(rng.choice(len(df), size=size, replace=False))]
+    picked = []
+    for positions in df.groupby(columns, observed=True, sort=True).indices.values():
+        n = min(len(positions), max(1, round(size * len(positions) / len(df))))
+        picked.append(rng.choice(positions, size=n, replace=False))
+    return df.iloc[np.sort(np.concatenate(picked))]
+
+
+def read_importance_index(directory: Optional[str] = None) -> Dict[str, Any]:
+    """{modèle: {'file', 'model_sha256', 'dataset_sha256', 'sample_size'}}"""
+    try:
+        with open(os.path.join(directory or Config.IMPORTANCE_DIR, IMPORTANCE_INDEX), encoding='utf-8') as f:
+            return json.load(f).get('models', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(directory: str, filename: str, payload: Dict[str, Any]) -> None:
+    tmp_path = os.path.join(directory, f'.{filename}.{os.getpid()}')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+# Artefacts déjà lus: (répertoire, version de l'index) -> {modèle: artefact}
+_loaded: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_importance(name: str, directory: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Artefact du modèle (None s'il n'a pas été calculé); relu seulement quand l'index change"""
+    directory = directory or Config.IMPORTANCE_DIR
+    try:
+        stat = os.stat(os.path.join(directory, IMPORTANCE_INDEX))
+    except OSError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _loaded_lock:
+        cached = _loaded.get(directory)
+        if cached is None or cached[0] != version:
+            cached = _loaded[directory] = (version, {})
+        artifacts = cached[1]
+        if name not in artifacts:
+            entry = read_importance_index(directory).get(name)
+            artifacts[name] = _read_artifact(directory, entry) if entry else None
+        return artifacts[name]
+
+
+def _read_artifact(directory: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, entry['file']), encoding='utf-8') as f:
+            artifact = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Artefact d'importance {entry.get('file')} illisible: {e}")
+        return None
+    artifact['version'] = os.path.splitext(entry['file'])[0]
+    return artifact
+
+
+# État des processus du pool: pipelines chargés à la première tâche de chaque modèle
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(paths: Dict[str, str], background: pd.DataFrame) -> None:
+    _worker.update(paths=paths, background=background, models={})
+
+
+def _shap_values(model: Any, rows: pd.DataFrame, background: pd.DataFrame) -> Tuple[np.ndarray, Dict[int, str]]:
+    # shap importé dans les processus du pool seulement
+    from app_module.utils.xai import batch_shap_values
+
+    return batch_shap_values(model, rows, background)
+
+
+def mean_abs_shap_by_feature(values: np.ndarray, mapping: Dict[int, str]) -> Tuple[Dict[str, float], int]:
+    """
+    Somme sur les lignes de |SHAP| par feature originale (modalités one-hot additionnées en valeur
+    absolue, comme xai._aggregate_shap_by_original_features) et nombre de lignes, pour une moyenne
+    calculée après fusion des lots
+    """
+    totals: Dict[str, float] = {}
+    abs_values = np.abs(values)
+    for feature in dict.fromkeys(mapping.values()):
+        indices = [idx for idx, name in mapping.items() if name == feature and idx < abs_values.shape[1]]
+        totals[feature] = float(abs_values[:, indices].sum()) if indices else 0.0
+    return totals, abs_values.shape[0]
+
+
+def _explain_rows(task) -> Tuple[str, Dict[str, float], int]:
+    """Sommes des |SHAP| par feature originale d'une part de l'échantillon, pour un modèle"""
+    from app_module.utils.models import load_model
+
+    name, rows = task
+    model = _worker['models'].get(name)
+    if model is None:
+        model = _worker['models'][name] = load_model(_worker['paths'][name])
+    values, mapping = _shap_values(model, rows, _worker['background'])
+    totals, n_rows = mean_abs_shap_by_feature(values, mapping)
+    return name, totals, n_rows
+
+
+def compute_importance(
+    paths: Optional[Dict[str, str]] = None,
+    csv_path: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    directory: Optional[str] = None,
+    sample_size: Optional[int] = None,
+    background_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    force: bool = False
+) -> Dict[str, Any]:
+    """
+    Calculer l'importance globale des modèles dont l'artefact manque ou est périmé.
+    Renvoie {'sample_size', 'computed': [...], 'skipped': [...]}.
+    """
+    csv_path = csv_path or Config.DATASET_PATH
+    cache_dir = cache_dir or Config.DATASET_CACHE_DIR
+    directory = directory or Config.IMPORTANCE_DIR
+    paths = {name: path for name, path in (Config.MODELS if paths is None else paths).items() if os.path.exists(path)}
+    sample_size = sample_size or Config.IMPORTANCE_SAMPLE_SIZE
+    background_size = background_size or Config.IMPORTANCE_BACKGROUND_SIZE
+    workers = workers or Config.SCORING_WORKERS or os.cpu_count() or 1
+
+    meta = ensure_dataset_cache(csv_path, cache_dir)
+    entries = read_importance_index(directory)
+    checksums = {name: file_checksum(path) for name, path in paths.items()}
+
+    def up_to_date(name: str) -> bool:
+        entry = entries.get(name)
+        return (not force and entry is not None and entry.get('model_sha256') == checksums[name]
+                and entry.get('dataset_sha256') == meta['sha256'] and entry.get('sample_size') == sample_size
+                and os.path.exists(os.path.join(directory, entry['file'])))
+
+    todo = [name for name in paths if not up_to_date(name)]
+    skipped = [name for name in paths if name not in todo]
+    if not todo:
+        return {'sample_size': sample_size, 'computed': [], 'skipped': skipped}
+
+    # Colonnes mappées: seules les lignes tirées sont lues
+    frame = load_cached_frame(cache_dir, meta)
+    sample = stratified_sample(frame, sample_size)
+    background = stratified_sample(frame, background_size, seed=SAMPLE_SEED + 1)
+    rows = as_object_columns(sample[FEATURE_NAMES].reset_index(drop=True))
+    background = as_object_columns(background[FEATURE_NAMES].reset_index(drop=True))
+
+    # Assez de lots pour occuper tous les processus, quel que soit le nombre de modèles
+    pieces = max(1, min(len(rows), -(-workers // len(todo))))
+    parts = [part for part in np.array_split(np.arange(len(rows)), pieces) if len(part)]
+    tasks = [(name, rows.iloc[part]) for name in todo for part in parts]
+    sums: Dict[str, Dict[str, float]] = {name: {} for name in todo}
+    counts = dict.fromkeys(todo, 0)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                             initargs=({name: paths[name] for name in todo}, background)) as pool:
+        for name, totals, n_rows in pool.map(_explain_rows, tasks):
+            for feature, total in totals.items():
+                sums[name][feature] = sums[name].get(feature, 0.0) + total
+            counts[name] += n_rows
+
+    os.makedirs(directory, exist_ok=True)
+    for name in todo:
+        features: List[Dict[str, Any]] = sorted(
+            ({'feature': feature, 'importance': round(total / counts[name], 6) if counts[name] else 0.0}
+             for feature, total in sums[name].items()),
+            key=lambda item: -item['importance'])
+        filename = f'{name}-{checksums[name][:12]}-{meta["sha256"][:12]}.json'
+        _write_json(directory, filename, {
+            'model': name,
+            'model_sha256': checksums[name],
+            'dataset_sha256': meta['sha256'],
+            'sample_size': counts[name],
+            'background_size': len(background),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'features': features,
+        })
+        entries[name] = {'file': filename, 'model_sha256': checksums[name], 'dataset_sha256': meta['sha256'],
+                         'sample_size': sample_size}
+    _write_json(directory, IMPORTANCE_INDEX, {'models': entries})
+
+    referenced = {entry['file'] for entry in entries.values()} | {IMPORTANCE_INDEX}
+    for filename in os.listdir(directory):
+        if filename.endswith('.json') and filename not in referenced and not filename.startswith('.'):
+            os.remove(os.path.join(directory, filename))
+
+    logger.info(f"Importance globale calculée sur {len(rows)} lignes: {', '.join(todo)}")
+    return {'sample_size': len(rows), 'computed': todo, 'skipped': skipped}
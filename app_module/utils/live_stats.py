@@ -0,0 +1,115 @@
+"""
+Agrégats en mémoire du tableau de suivi (/dashboard/live/): initialisés depuis tests_summary,
+puis complétés à chaque rafraîchissement par les seuls tests d'id > dernier id vu.
+La table tests n'est jamais relue en entier.
+
+Les suppressions (purge, archivage) ne sont prises en compte qu'à la prochaine initialisation.
+"""
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+from app_module.utils.storage import utc_today
+
+BATCH_SIZE = 1000
+
+
+class LiveAggregates:
+    """
+    Compteurs (jour, modèle, prédiction) -> nombre de tests, avec le dernier id intégré.
+    Sans base fournie, get_db() est appelé au premier rafraîchissement.
+    """
+
+    def __init__(self, database=None, batch_size: int = BATCH_SIZE):
+        self._database = database
+        self.batch_size = batch_size
+        self.counts: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.last_id = 0
+        # Incrémentée à chaque nouveau lot: un client à jour n'a rien à redessiner
+        self.version = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._ready = False
+
+    @property
+    def database(self):
+        if self._database is None:
+            from app_module.utils.database import get_db
+            self._database = get_db()
+        return self._database
+
+    def bootstrap(self) -> None:
+        """Compteurs par jour et dernier id lus dans la même transaction (aucun test compté deux fois)"""
+        snapshot = self.database.get_live_snapshot(since='')
+        counts: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        for row in snapshot['daily']:
+            counts[(row['day'], row['model_used'], int(row['prediction']))] += row['count']
+        with self._lock:
+            self.counts = counts
+            self.last_id = snapshot['last_id']
+            self.version += 1
+            self._ready = True
+
+    def refresh(self) -> int:
+        """Intègre les tests d'id > last_id; renvoie le nombre de nouveaux tests"""
+        if not self._ready:
+            self.bootstrap()
+            return 0
+        # Un seul rafraîchissement à la fois: les autres threads lisent l'état courant
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0
+        try:
+            added = 0
+            while True:
+                rows = self.database.get_tests_since(self.last_id, limit=self.batch_size)
+                if not rows:
+                    break
+                with self._lock:
+                    for row in rows:
+                        key = (str(row['timestamp'])[:10], row['model_used'], int(row['prediction']))
+                        self.counts[key] += 1
+                    self.last_id = rows[-1]['id']
+                    self.version += 1
+                added += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+            return added
+        finally:
+            self._refresh_lock.release()
+
+    def snapshot(self, days: int = 30, today: Optional[date] = None) -> Dict[str, Any]:
+        """Séries des graphiques: tests et taux de risque par jour (sur `days` jours), usage des modèles"""
+        today = today or utc_today()
+        first = today - timedelta(days=days - 1)
+        day_keys = [(first + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+        per_day = {day: [0, 0] for day in day_keys}
+        by_model: Dict[str, int] = defaultdict(int)
+        total = risk = 0
+
+        with self._lock:
+            items = list(self.counts.items())
+            version, last_id = self.version, self.last_id
+
+        for (day, model, prediction), count in items:
+            total += count
+            by_model[model] += count
+            if prediction == 1:
+                risk += count
+            if day in per_day:
+                per_day[day][0] += count
+                if prediction == 1:
+                    per_day[day][1] += count
+
+        return {
+            'version': version,
+            'lastId': last_id,
+            'total': total,
+            'risk': risk,
+            'riskRate': round(risk / total, 4) if total else 0.0,
+            'today': per_day[day_keys[-1]][0],
+            'days': day_keys,
+            'perDay': [per_day[day][0] for day in day_keys],
+            'riskPerDay': [per_day[day][1] for day in day_keys],
+            'riskRatePerDay': [round(r / t, 4) if t else None for t, r in (per_day[day] for day in day_keys)],
+            'byModel': dict(sorted(by_model.items(), key=lambda item: -item[1])),
+        }
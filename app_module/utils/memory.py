@@ -0,0 +1,83 @@
+"""
+Mémoire des processus gunicorn (Linux): RSS, PSS et pages partagées lues dans /proc.
+
+Avec preload_app, les modèles et le dataset sont chargés par le master avant le fork: les
+workers partagent ces pages (copy-on-write). Le RSS de chaque worker les compte en entier,
+le PSS les répartit entre les processus qui les partagent; l'écart mesure la mémoire économisée.
+"""
+import gc
+import os
+from typing import Any, Dict, List, Optional
+
+# Champs de smaps_rollup (en kB)
+MEMORY_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def read_memory(pid='self') -> Optional[Dict[str, int]]:
+    """Compteurs mémoire d'un processus en kB (None si /proc n'est pas lisible)"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', encoding='ascii') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in MEMORY_FIELDS:
+                    values[name] = int(rest.split()[0])
+    except (OSError, ValueError):
+        return None
+    if 'Rss' not in values:
+        return None
+    values['Shared'] = values.get('Shared_Clean', 0) + values.get('Shared_Dirty', 0)
+    values['Private'] = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values
+
+
+def child_pids(pid: int) -> List[int]:
+    """Processus fils directs (workers d'un master gunicorn)"""
+    children = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children', encoding='ascii') as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return sorted(set(children))
+
+
+def memory_report(master_pid: int) -> Dict[str, Any]:
+    """
+    Mémoire du master et de ses workers. 'saved' = somme des RSS - somme des PSS:
+    pages comptées dans plusieurs RSS mais présentes une seule fois en mémoire.
+    """
+    processes = []
+    for role, pid in [('master', master_pid)] + [('worker', child) for child in child_pids(master_pid)]:
+        values = read_memory(pid)
+        if values is not None:
+            processes.append({'pid': pid, 'role': role, **values})
+
+    workers = [p for p in processes if p['role'] == 'worker']
+    total_rss = sum(p['Rss'] for p in processes)
+    total_pss = sum(p['Pss'] for p in processes)
+    return {
+        'processes': processes,
+        'total_rss_kb': total_rss,
+        'total_pss_kb': total_pss,
+        'saved_kb': total_rss - total_pss,
+        'saved_per_worker_kb': (total_rss - total_pss) // len(workers) if workers else 0,
+    }
+
+
+def format_memory(values: Dict[str, int]) -> str:
+    """Résumé d'une ligne en Mo"""
+    return ', '.join(f"{name.lower()}={values[name] / 1024:.1f}Mo"
+                     for name in ('Rss', 'Pss', 'Shared', 'Private') if name in values)
+
+
+def freeze_heap() -> int:
+    """
+    À appeler dans le master juste avant le fork: collecter puis geler les objets existants.
+    Le ramasse-miettes des workers ne les parcourt plus, et n'écrit donc plus dans leurs pages
+    (qui restent partagées). Renvoie le nombre d'objets gelés.
+    """
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
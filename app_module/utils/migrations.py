@@ -0,0 +1,145 @@
+"""
+Migrations versionnées du schéma SQLite des tests.
+
+La version courante est stockée dans PRAGMA user_version: au démarrage d'un worker,
+une base à jour ne coûte qu'une lecture de ce pragma. Pour faire évoluer le schéma,
+ajouter une fonction à la fin de MIGRATIONS (ne jamais modifier une migration publiée).
+"""
+from typing import Callable, List, Tuple
+from app_module.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def column_exists(cursor, table_name, column_name):
+    """Vérifier si une colonne existe dans une table"""
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = [column[1] for column in cursor.fetchall()]
+    return column_name in columns
+
+
+def _create_tests_table(conn):
+    """Table des tests (et colonnes ajoutées avant le versionnement du schéma)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            model_used TEXT NOT NULL,
+            prediction INTEGER NOT NULL,
+            probability REAL NOT NULL,
+            input_features TEXT NOT NULL,
+            explanation TEXT,
+            certificate_path TEXT,
+            user_ip TEXT
+        )
+    ''')
+
+    # Bases créées avant l'ajout de ces colonnes
+    cursor = conn.cursor()
+    for column in ('certificate_path', 'user_ip'):
+        if not column_exists(cursor, 'tests', column):
+            cursor.execute(f'ALTER TABLE tests ADD COLUMN {column} TEXT')
+
+
+def _create_indexes(conn):
+    """Index du nettoyage des certificats et de la liste admin"""
+    # Retrouver un test à partir de son certificat (nettoyage)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tests_certificate_path ON tests(certificate_path)')
+    # Liste admin: tri (timestamp, id) seul ou précédé d'un filtre d'égalité
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tests_timestamp ON tests(timestamp, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tests_model_timestamp ON tests(model_used, timestamp, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tests_prediction_timestamp ON tests(prediction, timestamp, id)')
+
+
+def _create_summary(conn):
+    """
+    Table de compteurs agrégés et ses triggers.
+    Une ligne par (jour, modèle, prédiction); day = '' porte le total toutes dates.
+    Les compteurs sont cumulés: une suppression ne les décrémente pas (rebuild_summary recalcule).
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS tests_summary (
+            day TEXT NOT NULL,
+            model_used TEXT NOT NULL,
+            prediction INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, model_used, prediction)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_tests_summary_insert AFTER INSERT ON tests
+        BEGIN
+            INSERT INTO tests_summary (day, model_used, prediction, count)
+            VALUES (date(NEW.timestamp), NEW.model_used, NEW.prediction, 1),
+                   ('', NEW.model_used, NEW.prediction, 1)
+            ON CONFLICT(day, model_used, prediction) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_tests_summary_update
+        AFTER UPDATE OF timestamp, model_used, prediction ON tests
+        BEGIN
+            UPDATE tests_summary SET count = count - 1
+            WHERE model_used = OLD.model_used AND prediction = OLD.prediction
+              AND day IN (date(OLD.timestamp), '');
+            INSERT INTO tests_summary (day, model_used, prediction, count)
+            VALUES (date(NEW.timestamp), NEW.model_used, NEW.prediction, 1),
+                   ('', NEW.model_used, NEW.prediction, 1)
+            ON CONFLICT(day, model_used, prediction) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    # Base existante: remplir les compteurs à partir de l'historique
+    rebuild_summary(conn)
+
+
+def rebuild_summary(conn):
+    """Recalculer les compteurs agrégés à partir de la table tests (dans la transaction courante)"""
+    conn.execute('DELETE FROM tests_summary')
+    conn.execute('''
+        INSERT INTO tests_summary (day, model_used, prediction, count)
+        SELECT date(timestamp), model_used, prediction, COUNT(*)
+        FROM tests GROUP BY date(timestamp), model_used, prediction
+    ''')
+    conn.execute('''
+        INSERT INTO tests_summary (day, model_used, prediction, count)
+        SELECT '', model_used, prediction, COUNT(*)
+        FROM tests GROUP BY model_used, prediction
+    ''')
+
+
+# Migrations ordonnées: la migration d'indice i fait passer le schéma de la version i à i + 1.
+# Chacune reste idempotente pour les bases créées avant le versionnement (user_version = 0).
+MIGRATIONS: List[Tuple[str, Callable]] = [
+    ('table tests', _create_tests_table),
+    ('index de la liste admin et des certificats', _create_indexes),
+    ('compteurs agrégés tests_summary', _create_summary),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn) -> int:
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """
+    Appliquer les migrations en attente et renvoyer la version finale.
+    Retourne immédiatement si le schéma est à jour; sinon les migrations s'exécutent
+    dans une seule transaction sous verrou d'écriture, un seul worker les applique.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        # Relire sous verrou: un autre worker a pu migrer entre-temps
+        current = schema_version(conn)
+        for version in range(current, SCHEMA_VERSION):
+            description, apply = MIGRATIONS[version]
+            apply(conn)
+            logger.info(f"[DB] Migration {version + 1} appliquée: {description}")
+        if current < SCHEMA_VERSION:
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    return max(current, SCHEMA_VERSION)
@@ -3,40 +3,157 @@ Utilitaires pour le chargement et gestion des modèles
 """
 import joblib
 import os
-from typing import Dict, Any
+import sys
+import threading
+import types
+import time
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional
 from app_module.config.settings import Config
+from app_module.utils import get_logger
+from app_module.utils.dataset_cache import file_checksum
+from app_module.utils.memory import read_memory
+
+logger = get_logger(__name__)
+
+
+def load_model(model_path: str) -> Any:
+    """
+    Charger un pipeline joblib. Avec MODEL_MMAP_MODE (par défaut 'r'), les tableaux NumPy d'un
+    fichier non compressé (matrice d'entraînement du KNN, arbres) sont mappés en mémoire au lieu
+    d'être copiés: les workers gunicorn partagent ces pages. Un fichier compressé est chargé
+    entièrement, comme sans mmap.
+    """
+    _register_pickle_helpers()
+    return joblib.load(model_path, mmap_mode=Config.MODEL_MMAP_MODE or None)
+
+
+def _register_pickle_helpers() -> None:
+    """Les pipelines ont été sérialisés avec __main__.binary_transform (voir app.py): l'exposer dans
+    tout processus qui les charge (commandes CLI, processus des calculs hors ligne)"""
+    from app_module.utils.data import binary_transform
+
+    main_module = sys.modules.get('__main__')
+    if main_module is None:
+        main_module = sys.modules['__main__'] = types.ModuleType('__main__')
+    if not hasattr(main_module, 'binary_transform'):
+        setattr(main_module, 'binary_transform', binary_transform)
+
+
+class ModelRegistry(Mapping):
+    """
+    Registre des pipelines, partagé par app.py et l'application factory: chaque fichier est
+    chargé une seule fois par processus, à la première utilisation. Se lit comme un dict
+    {nom: modèle}; la somme SHA-256, la durée de chargement et la mémoire de chaque modèle
+    sont conservées pour /api/health et `flask models info`.
+    """
+
+    def __init__(self, paths: Optional[Dict[str, str]] = None):
+        self.paths = dict(Config.MODELS if paths is None else paths)
+        self._models: Dict[str, Any] = {}
+        self._info: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> Any:
+        path = self.paths[name]
+        before = read_memory()
+        start = time.perf_counter()
+        model = load_model(path)
+        load_seconds = time.perf_counter() - start
+        after = read_memory()
+
+        self._info[name] = {
+            'sha256': file_checksum(path),
+            'size': os.path.getsize(path),
+            'load_seconds': round(load_seconds, 3),
+            # Pages effectivement chargées (les tableaux mappés ne comptent qu'une fois lus)
+            'rss_kb': after['Rss'] - before['Rss'] if before and after else None,
+        }
+        logger.info(f"✓ Modèle chargé: {name} ({load_seconds:.2f}s, sha256 {self._info[name]['sha256'][:12]})")
+        return model
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Modèle chargé à la demande; default si inconnu ou fichier absent"""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        if name not in self.paths or not os.path.exists(self.paths[name]):
+            if name in self.paths:
+                logger.error(f"✗ Erreur: Fichier {self.paths[name]} non trouvé")
+            return default
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+            return self._models[name]
+
+    def __getitem__(self, name: str) -> Any:
+        model = self.get(name)
+        if model is None:
+            raise KeyError(name)
+        return model
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def available(self) -> List[str]:
+        """Modèles dont le fichier existe (sans les charger)"""
+        return [name for name, path in self.paths.items() if os.path.exists(path)]
+
+    def load_all(self) -> Dict[str, Any]:
+        """Charger tous les modèles disponibles (master gunicorn avant le fork)"""
+        return {name: self.get(name) for name in self.available()}
+
+    def loaded(self) -> List[str]:
+        return list(self._models)
+
+    def checksum(self, name: str) -> Optional[str]:
+        """SHA-256 du modèle servi: celle relevée au chargement, sinon celle du fichier (None si absent)"""
+        info = self._info.get(name)
+        if info is not None:
+            return info['sha256']
+        path = self.paths.get(name)
+        if path is None or not os.path.exists(path):
+            return None
+        return file_checksum(path)
+
+    def info(self) -> Dict[str, Dict[str, Any]]:
+        """État de chaque modèle: chemin, chargé ou non, et mesures du chargement"""
+        return {
+            name: {'path': path, 'available': os.path.exists(path), 'loaded': name in self._models,
+                   **self._info.get(name, {})}
+            for name, path in self.paths.items()
+        }
+
+    def public_info(self) -> Dict[str, Dict[str, Any]]:
+        """État exposé par /api/health: sans chemin ni mesure mémoire du serveur"""
+        return {
+            name: {'loaded': name in self._models, 'sha256': self._info.get(name, {}).get('sha256'),
+                   'load_seconds': self._info.get(name, {}).get('load_seconds')}
+            for name in self.paths
+        }
+
+
+# Registre unique du processus
+registry = ModelRegistry()
 
 
 class ModelManager:
-    """Gestionnaire centralisé des modèles ML"""
-    
-    _models = {}
-    
+    """Gestionnaire centralisé des modèles ML (accès au registre partagé)"""
+
     @classmethod
     def load_models(cls) -> Dict[str, Any]:
         """Charger tous les modèles"""
-        if cls._models:
-            return cls._models
-        
-        for model_name, model_path in Config.MODELS.items():
-            if os.path.exists(model_path):
-                cls._models[model_name] = joblib.load(model_path)
-                print(f"✓ Modèle chargé: {model_name}")
-            else:
-                print(f"✗ Erreur: Fichier {model_path} non trouvé")
-        
-        return cls._models
-    
+        return registry.load_all()
+
     @classmethod
     def get_model(cls, model_name: str) -> Any:
         """Obtenir un modèle spécifique"""
-        if not cls._models:
-            cls.load_models()
-        return cls._models.get(model_name)
-    
+        return registry.get(model_name)
+
     @classmethod
     def get_all_models(cls) -> Dict[str, Any]:
         """Obtenir tous les modèles"""
-        if not cls._models:
-            cls.load_models()
-        return cls._models
+        return registry.load_all()
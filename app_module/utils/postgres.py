@@ -0,0 +1,449 @@
+"""
+Stockage des tests dans PostgreSQL (DB_BACKEND=postgresql), partagé entre plusieurs
+conteneurs web. Pool de connexions par processus, insertions groupées via execute_values.
+Nécessite psycopg2 (optionnel).
+"""
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from app_module.config.settings import Config
+from app_module.utils.db_writer import BatchWriter, INSERT_COLUMNS
+from app_module.utils.storage import TestStorage, decode_cursor, filter_clause, page_result
+from app_module.utils import get_logger
+
+try:
+    import psycopg2
+    from psycopg2.extras import Json, RealDictCursor, execute_values
+    from psycopg2.pool import ThreadedConnectionPool
+except ImportError:  # backend PostgreSQL indisponible
+    psycopg2 = None
+
+logger = get_logger(__name__)
+
+# Timestamp renvoyé sous la même forme texte que SQLite ('YYYY-MM-DD HH:MM:SS')
+_TIMESTAMP = "to_char(tests.timestamp, 'YYYY-MM-DD HH24:MI:SS') AS timestamp"
+LIST_COLUMNS = f'id, {_TIMESTAMP}, model_used, prediction, probability, input_features, certificate_path, user_ip'
+DETAIL_COLUMNS = LIST_COLUMNS + ', explanation'
+# Lecture incrémentale du tableau de suivi (tests d'id > dernier id vu)
+TESTS_SINCE_QUERY = f'SELECT id, {_TIMESTAMP}, model_used, prediction, probability FROM tests WHERE id > %s ORDER BY id LIMIT %s'
+
+# Verrou consultatif pris pendant les migrations (un seul conteneur les applique)
+_MIGRATION_LOCK = 0x7465_7374
+
+# Tests courants et archivés, sous le nom tests (les colonnes qualifiées tests.* restent valides)
+_ALL_TESTS = '(SELECT * FROM tests UNION ALL SELECT * FROM tests_archive) AS tests'
+
+
+def _rebuild_summary_sql(source: str = 'tests') -> str:
+    return f'''
+    DELETE FROM tests_summary;
+    INSERT INTO tests_summary (day, model_used, prediction, count)
+    SELECT to_char(timestamp, 'YYYY-MM-DD'), model_used, prediction, COUNT(*)
+    FROM {source} GROUP BY 1, model_used, prediction;
+    INSERT INTO tests_summary (day, model_used, prediction, count)
+    SELECT '', model_used, prediction, COUNT(*)
+    FROM {source} GROUP BY model_used, prediction
+'''
+
+
+_REBUILD_SUMMARY = _rebuild_summary_sql()
+
+# Un lot de tests anciens déplacé vers tests_archive en une instruction (une seule transaction);
+# DELETE ne déclenche pas tests_summary_bump: les compteurs restent cumulés
+_ARCHIVE_BATCH = '''
+    WITH moved AS (
+        DELETE FROM tests WHERE id IN (
+            SELECT id FROM tests WHERE timestamp < %s ORDER BY timestamp, id LIMIT %s
+        )
+        RETURNING *
+    ), archived AS (
+        INSERT INTO tests_archive SELECT * FROM moved RETURNING timestamp
+    )
+    SELECT to_char(timestamp, 'YYYY-MM') AS month, COUNT(*) AS count FROM archived GROUP BY 1 ORDER BY 1
+'''
+
+MIGRATIONS: List[Tuple[str, str]] = [
+    ('table tests', '''
+        CREATE TABLE IF NOT EXISTS tests (
+            id BIGSERIAL PRIMARY KEY,
+            timestamp TIMESTAMP(0) NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            model_used TEXT NOT NULL,
+            prediction SMALLINT NOT NULL,
+            probability DOUBLE PRECISION NOT NULL,
+            input_features JSONB NOT NULL,
+            explanation JSONB,
+            certificate_path TEXT,
+            user_ip TEXT
+        )
+    '''),
+    ('index de la liste admin et des certificats', '''
+        CREATE INDEX IF NOT EXISTS idx_tests_certificate_path ON tests(certificate_path);
+        CREATE INDEX IF NOT EXISTS idx_tests_timestamp ON tests(timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_tests_model_timestamp ON tests(model_used, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_tests_prediction_timestamp ON tests(prediction, timestamp, id)
+    '''),
+    ('compteurs agrégés tests_summary', '''
+        CREATE TABLE IF NOT EXISTS tests_summary (
+            day TEXT NOT NULL,
+            model_used TEXT NOT NULL,
+            prediction SMALLINT NOT NULL,
+            count BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, model_used, prediction)
+        );
+        CREATE OR REPLACE FUNCTION tests_summary_bump() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' THEN
+                UPDATE tests_summary SET count = count - 1
+                WHERE model_used = OLD.model_used AND prediction = OLD.prediction
+                  AND day IN (to_char(OLD.timestamp, 'YYYY-MM-DD'), '');
+            END IF;
+            INSERT INTO tests_summary (day, model_used, prediction, count)
+            VALUES (to_char(NEW.timestamp, 'YYYY-MM-DD'), NEW.model_used, NEW.prediction, 1),
+                   ('', NEW.model_used, NEW.prediction, 1)
+            ON CONFLICT (day, model_used, prediction) DO UPDATE SET count = tests_summary.count + 1;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql;
+        DROP TRIGGER IF EXISTS trg_tests_summary_insert ON tests;
+        CREATE TRIGGER trg_tests_summary_insert AFTER INSERT ON tests
+            FOR EACH ROW EXECUTE FUNCTION tests_summary_bump();
+        DROP TRIGGER IF EXISTS trg_tests_summary_update ON tests;
+        CREATE TRIGGER trg_tests_summary_update AFTER UPDATE OF timestamp, model_used, prediction ON tests
+            FOR EACH ROW EXECUTE FUNCTION tests_summary_bump();
+    ''' + _REBUILD_SUMMARY),
+    ('archive tests_archive', '''
+        CREATE TABLE IF NOT EXISTS tests_archive (LIKE tests, PRIMARY KEY (id));
+        CREATE INDEX IF NOT EXISTS idx_tests_archive_timestamp ON tests_archive(timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_tests_archive_certificate_path ON tests_archive(certificate_path)
+    '''),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+class PostgresTestDatabase(TestStorage):
+    """Stockage des tests dans PostgreSQL"""
+
+    def __init__(self, dsn: Optional[str] = None, write_behind: Optional[bool] = None,
+                 min_connections: Optional[int] = None, max_connections: Optional[int] = None):
+        if psycopg2 is None:
+            raise RuntimeError("Le backend PostgreSQL nécessite psycopg2 (pip install psycopg2-binary)")
+        self.dsn = dsn or Config.DATABASE_URL
+        if not self.dsn:
+            raise RuntimeError("DATABASE_URL doit être défini pour DB_BACKEND=postgresql")
+        self.min_connections = min_connections or Config.DB_POOL_MIN
+        self.max_connections = max_connections or Config.DB_POOL_MAX
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.init_database()
+
+        if write_behind is None:
+            write_behind = Config.DB_WRITE_BEHIND
+        self.writer = BatchWriter(self) if write_behind else None
+
+    def get_pool(self):
+        """Pool du processus courant (recréé après un fork, sans toucher aux sockets du parent)"""
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._pool = ThreadedConnectionPool(self.min_connections, self.max_connections, self.dsn)
+                    self._pid = os.getpid()
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Connexion empruntée au pool: validée en sortie, annulée en cas d'erreur"""
+        pool = self.get_pool()
+        conn = pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+
+    def _fetchall(self, sql: str, params=()) -> List[Dict[str, Any]]:
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+
+    def _execute(self, sql: str, params=()) -> int:
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.rowcount
+
+    def close(self):
+        """Vider la file d'écriture et fermer le pool du processus courant"""
+        if self.writer is not None:
+            self.writer.close()
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._pid == os.getpid():
+            pool.closeall()
+
+    def init_database(self) -> int:
+        """Appliquer les migrations en attente (version stockée dans schema_version)"""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+                if cursor.fetchone()[0]:
+                    cursor.execute('SELECT version FROM schema_version')
+                    row = cursor.fetchone()
+                    if row and row[0] >= SCHEMA_VERSION:
+                        return row[0]
+
+                # Sous verrou: un autre conteneur a pu migrer entre-temps
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', (_MIGRATION_LOCK,))
+                cursor.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+                cursor.execute('SELECT version FROM schema_version')
+                row = cursor.fetchone()
+                current = row[0] if row else 0
+                for version in range(current, SCHEMA_VERSION):
+                    description, sql = MIGRATIONS[version]
+                    cursor.execute(sql)
+                    logger.info(f"[DB] Migration PostgreSQL {version + 1} appliquée: {description}")
+                cursor.execute('DELETE FROM schema_version')
+                cursor.execute('INSERT INTO schema_version (version) VALUES (%s)', (max(current, SCHEMA_VERSION),))
+        return max(current, SCHEMA_VERSION)
+
+    def rebuild_summary(self) -> int:
+        """Recalculer entièrement les compteurs agrégés, archives comprises"""
+        self._execute(_rebuild_summary_sql(_ALL_TESTS))
+        return self.get_test_count()
+
+    def archive_tests(
+        self,
+        older_than_days: Optional[int] = None,
+        batch_size: int = 1000,
+        vacuum: bool = True,
+        dry_run: bool = False,
+        progress=None
+    ) -> Dict[str, Any]:
+        """
+        Déplacer les tests plus anciens que older_than_days vers la table tests_archive, par lots
+        validés chacun en une transaction (pas de doublon ni de perte en cas d'interruption).
+        Les compteurs agrégés sont cumulés et ne changent pas.
+        """
+        older_than_days = Config.DB_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).strftime('%Y-%m-%d %H:%M:%S')
+        stats = {'archived': 0, 'months': [], 'cutoff': cutoff}
+
+        if dry_run:
+            rows = self._fetchall(
+                "SELECT to_char(timestamp, 'YYYY-MM') AS month, COUNT(*) AS count FROM tests "
+                "WHERE timestamp < %s GROUP BY 1 ORDER BY 1", (cutoff,)
+            )
+            stats['archived'] = sum(row['count'] for row in rows)
+            stats['months'] = [row['month'] for row in rows]
+            return stats
+
+        while True:
+            rows = self._fetchall(_ARCHIVE_BATCH, (cutoff, batch_size))
+            if not rows:
+                break
+            for row in rows:
+                stats['archived'] += row['count']
+                if row['month'] not in stats['months']:
+                    stats['months'].append(row['month'])
+            if progress:
+                progress(dict(stats))
+
+        if stats['archived'] and vacuum:
+            # VACUUM hors transaction: espace des lignes supprimées réutilisable, statistiques à jour
+            with self.connection() as conn:
+                conn.autocommit = True
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute('VACUUM ANALYZE tests')
+                        cursor.execute('ANALYZE tests_archive')
+                finally:
+                    conn.autocommit = False
+
+        return stats
+
+    def _test_row(self, model_used, prediction, probability, input_features, explanation, certificate_path, user_ip):
+        """Valeurs d'INSERT dans l'ordre de INSERT_COLUMNS (JSONB pour les variables et l'explication)"""
+        return (
+            model_used,
+            int(prediction),
+            float(probability),
+            Json(input_features),
+            Json(explanation) if explanation else None,
+            certificate_path,
+            user_ip
+        )
+
+    def save_test(
+        self,
+        model_used: str,
+        prediction: int,
+        probability: float,
+        input_features: Dict[str, Any],
+        explanation: Optional[Dict[str, Any]] = None,
+        certificate_path: Optional[str] = None,
+        user_ip: Optional[str] = None
+    ) -> int:
+        """Sauvegarder un test et renvoyer son id"""
+        row = self._test_row(model_used, prediction, probability, input_features,
+                             explanation, certificate_path, user_ip)
+        if self.writer is not None:
+            return self.writer.submit(row).result(timeout=Config.DB_WRITE_RESULT_TIMEOUT)
+        return self.insert_batch([row])[0]
+
+    def insert_batch(self, rows: Sequence[Tuple]) -> List[int]:
+        """Insérer un lot en une requête multi-VALUES (execute_values)"""
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                # RETURNING id suit l'ordre de VALUES pour un INSERT simple
+                result = execute_values(
+                    cursor,
+                    f"INSERT INTO tests ({', '.join(INSERT_COLUMNS)}) VALUES %s RETURNING id",
+                    list(rows),
+                    page_size=max(len(rows), 1),
+                    fetch=True
+                )
+        return [row[0] for row in result]
+
+    def get_test_by_id(self, test_id: int, include_archive: bool = False) -> Optional[Dict[str, Any]]:
+        source = _ALL_TESTS if include_archive else 'tests'
+        rows = self._fetchall(f'SELECT {DETAIL_COLUMNS} FROM {source} WHERE id = %s', (test_id,))
+        return dict(rows[0]) if rows else None
+
+    def get_all_tests(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        rows = self._fetchall(
+            f'SELECT {LIST_COLUMNS} FROM tests ORDER BY tests.timestamp DESC LIMIT %s OFFSET %s',
+            (limit, offset)
+        )
+        return [dict(row) for row in rows]
+
+    def get_tests_page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        direction: str = 'next',
+        model: Optional[str] = None,
+        prediction: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        include_archive: bool = False
+    ) -> Dict[str, Any]:
+        """Page keyset, comme TestDatabase.get_tests_page (avec include_archive, tests_archive comprise)"""
+        where, params = filter_clause(model, prediction, date_from, date_to, placeholder='%s')
+
+        position = decode_cursor(cursor) if cursor else None
+        backwards = direction == 'prev' and position is not None
+        if position is not None:
+            # tests.timestamp: la colonne, pas l'alias texte de la liste de sélection
+            where.append('(tests.timestamp, id) > (%s, %s)' if backwards else '(tests.timestamp, id) < (%s, %s)')
+            params.extend(position)
+
+        order = 'ASC' if backwards else 'DESC'
+        sql = f'SELECT {LIST_COLUMNS} FROM {_ALL_TESTS if include_archive else "tests"}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY tests.timestamp {order}, id {order} LIMIT %s'
+        params.append(limit + 1)
+
+        rows = self._fetchall(sql, params)
+        return page_result([dict(row) for row in rows], limit, backwards, position is not None)
+
+    def iter_tests(
+        self,
+        chunk_size: int = 1000,
+        model: Optional[str] = None,
+        prediction: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        include_archive: bool = False
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Parcourir les tests filtrés avec un curseur côté serveur (lots de chunk_size), archives comprises si demandé"""
+        where, params = filter_clause(model, prediction, date_from, date_to, placeholder='%s')
+        sql = f'SELECT {LIST_COLUMNS} FROM {_ALL_TESTS if include_archive else "tests"}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY id'
+
+        with self.connection() as conn:
+            with conn.cursor(name='tests_export', cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(sql, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        return
+                    yield [dict(row) for row in rows]
+
+    def update_certificate_path(self, test_id: int, certificate_path: Optional[str]) -> None:
+        self._execute('UPDATE tests SET certificate_path = %s WHERE id = %s', (certificate_path, test_id))
+
+    def get_certificate_paths(self, after_id: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        rows = self._fetchall('''
+            SELECT id, certificate_path FROM tests
+            WHERE id > %s AND certificate_path IS NOT NULL
+            ORDER BY id
+            LIMIT %s
+        ''', (after_id, limit))
+        return [dict(row) for row in rows]
+
+    def get_referenced_certificate_paths(self, paths: List[str]) -> set:
+        if not paths:
+            return set()
+        # Les tests archivés gardent leurs certificats
+        rows = self._fetchall(f'SELECT certificate_path FROM {_ALL_TESTS} WHERE certificate_path = ANY(%s)',
+                              (list(paths),))
+        return {row['certificate_path'] for row in rows}
+
+    def clear_certificate_paths(self, paths: List[str]) -> int:
+        if not paths:
+            return 0
+        return self._execute('UPDATE tests SET certificate_path = NULL WHERE certificate_path = ANY(%s)',
+                             (list(paths),))
+
+    def get_test_count(self) -> int:
+        rows = self._fetchall("SELECT COALESCE(SUM(count), 0) AS count FROM tests_summary WHERE day = ''")
+        return int(rows[0]['count'])
+
+    def get_risk_count(self) -> int:
+        rows = self._fetchall(
+            "SELECT COALESCE(SUM(count), 0) AS count FROM tests_summary WHERE day = '' AND prediction = 1"
+        )
+        return int(rows[0]['count'])
+
+    def get_summary(self) -> Dict[str, Any]:
+        return self.summarize(self._fetchall(
+            "SELECT model_used, prediction, count FROM tests_summary WHERE day = ''"
+        ))
+
+    def get_daily_counts(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows = self._fetchall(
+            'SELECT day, model_used, prediction, count FROM tests_summary WHERE day > %s ORDER BY day',
+            (since or '',)
+        )
+        return [dict(row) for row in rows]
+
+    def get_live_snapshot(self, since: Optional[str] = None) -> Dict[str, Any]:
+        # REPEATABLE READ: les deux lectures voient le même instantané
+        with self.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                cursor.execute('SELECT COALESCE(MAX(id), 0) AS last_id FROM tests')
+                last_id = cursor.fetchone()['last_id']
+                cursor.execute(
+                    'SELECT day, model_used, prediction, count FROM tests_summary WHERE day > %s ORDER BY day',
+                    (since or '',)
+                )
+                rows = cursor.fetchall()
+        return {'last_id': last_id, 'daily': [dict(row) for row in rows]}
+
+    def get_tests_since(self, last_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        # Les id d'une séquence ne suivent pas l'ordre des commits: un test validé après un id
+        # plus grand déjà lu n'est pas vu par les lectures incrémentales (tableau de suivi uniquement)
+        rows = self._fetchall(TESTS_SINCE_QUERY, (last_id, limit))
+        return [dict(row) for row in rows]
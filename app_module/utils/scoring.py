@@ -0,0 +1,193 @@
+"""
+Probabilités prédites par chaque pipeline sur tout le dataset (couche « risque prédit » du dashboard).
+
+score_dataset() découpe la copie en colonnes du dataset en blocs de lignes, répartis entre les
+processus d'un pool: chaque processus charge les pipelines une fois, lit ses blocs dans les
+fichiers mappés et renvoie les probabilités. Une colonne float32 par modèle est écrite dans
+DATASET_CACHE_DIR/scores/, décrite dans scores.json avec les sommes SHA-256 du modèle et du
+dataset: seuls les modèles dont le fichier a changé (ou tous, si le dataset a changé) sont
+recalculés.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import numpy as np
+from app_module.config.settings import Config
+from app_module.utils import get_logger
+from app_module.utils.codec import FEATURE_NAMES
+from app_module.utils.data import as_object_columns
+from app_module.utils.dataset_cache import ensure_dataset_cache, file_checksum, read_cached_rows
+
+logger = get_logger(__name__)
+
+SCORES_DIR = 'scores'
+SCORES_META = 'scores.json'
+
+# Classes de probabilité des graphiques (distribution et calibration)
+RISK_BINS = 10
+RISK_EDGES = np.linspace(0.0, 1.0, RISK_BINS + 1)
+RISK_LABELS = [f'{low:.1f}-{high:.1f}' for low, high in zip(RISK_EDGES[:-1], RISK_EDGES[1:])]
+
+
+def risk_column(model: str) -> str:
+    """Colonne catégorielle (classe de probabilité) d'un modèle dans le cube du dashboard"""
+    return f'risk_{model}'
+
+
+def scores_dir(cache_dir: Optional[str] = None) -> str:
+    return os.path.join(cache_dir or Config.DATASET_CACHE_DIR, SCORES_DIR)
+
+
+def read_scores_meta(cache_dir: Optional[str] = None) -> Dict[str, Any]:
+    """{modèle: {'file', 'model_sha256', 'dataset_sha256', 'rows', 'mean'}}"""
+    try:
+        with open(os.path.join(scores_dir(cache_dir), SCORES_META), encoding='utf-8') as f:
+            return json.load(f).get('models', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_scores_meta(directory: str, models: Dict[str, Any]) -> None:
+    tmp_path = os.path.join(directory, f'.{SCORES_META}.{os.getpid()}')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'models': models}, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, SCORES_META))
+
+
+def load_scores(meta: Dict[str, Any], cache_dir: Optional[str] = None,
+                model_checksums: Optional[Dict[str, Optional[str]]] = None) -> Dict[str, np.ndarray]:
+    """
+    Probabilités à jour pour cette version du dataset et du fichier de chaque modèle, en mémoire
+    mappée. Sans model_checksums, les sommes sont celles du registre; les modèles non calculés,
+    inconnus ou remplacés depuis le calcul sont absents.
+    """
+    from app_module.utils.models import registry
+
+    directory = scores_dir(cache_dir)
+    scores = {}
+    for name, entry in read_scores_meta(cache_dir).items():
+        if entry.get('dataset_sha256') != meta['sha256'] or entry.get('rows') != meta['rows']:
+            continue
+        checksum = registry.checksum(name) if model_checksums is None else model_checksums.get(name)
+        if entry.get('model_sha256') != checksum:
+            logger.warning(f"Scores du modèle {name} calculés avec un autre fichier: relancer `flask models score`")
+            continue
+        try:
+            scores[name] = np.load(os.path.join(directory, entry['file']), mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning(f"Scores du modèle {name} illisibles: {e}")
+    return scores
+
+
+def risk_codes(probabilities: np.ndarray) -> np.ndarray:
+    """Classe de probabilité de chaque ligne (int8, -1 si manquante)"""
+    values = np.asarray(probabilities, dtype=np.float64)
+    codes = np.full(len(values), -1, dtype=np.int8)
+    present = ~np.isnan(values)
+    codes[present] = np.clip(np.searchsorted(RISK_EDGES, values[present], side='right') - 1, 0, RISK_BINS - 1)
+    return codes
+
+
+# État des processus du pool: pipelines chargés une fois par processus
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(cache_dir: str, meta: Dict[str, Any], paths: Dict[str, str]) -> None:
+    from app_module.utils.models import load_model
+
+    _worker.update(cache_dir=cache_dir, meta=meta, models={name: load_model(path) for name, path in paths.items()})
+
+
+def _score_rows(bounds) -> Dict[str, np.ndarray]:
+    """Probabilités (classe positive, float32) des lignes [start, stop) pour chaque modèle du processus"""
+    start, stop = bounds
+    frame = read_cached_rows(_worker['cache_dir'], _worker['meta'], start, stop, FEATURE_NAMES)
+    features = as_object_columns(frame[FEATURE_NAMES])
+    results = {}
+    for name, model in _worker['models'].items():
+        if hasattr(model, 'predict_proba'):
+            values = model.predict_proba(features)[:, 1]
+        else:
+            values = model.predict(features)
+        results[name] = np.asarray(values, dtype=np.float32)
+    return results
+
+
+def score_dataset(
+    paths: Optional[Dict[str, str]] = None,
+    csv_path: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_rows: Optional[int] = None,
+    force: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """
+    Calculer les probabilités des modèles dont les scores manquent ou sont périmés.
+    Renvoie {'rows', 'scored': [...], 'skipped': [...]}.
+    """
+    csv_path = csv_path or Config.DATASET_PATH
+    cache_dir = cache_dir or Config.DATASET_CACHE_DIR
+    paths = {name: path for name, path in (Config.MODELS if paths is None else paths).items() if os.path.exists(path)}
+    workers = workers or Config.SCORING_WORKERS or os.cpu_count() or 1
+    chunk_rows = chunk_rows or Config.SCORING_CHUNK_ROWS
+
+    meta = ensure_dataset_cache(csv_path, cache_dir)
+    rows = meta['rows']
+    entries = read_scores_meta(cache_dir)
+    directory = scores_dir(cache_dir)
+    checksums = {name: file_checksum(path) for name, path in paths.items()}
+
+    def up_to_date(name: str) -> bool:
+        entry = entries.get(name)
+        return (not force and entry is not None and entry.get('model_sha256') == checksums[name]
+                and entry.get('dataset_sha256') == meta['sha256'] and entry.get('rows') == rows
+                and os.path.exists(os.path.join(directory, entry['file'])))
+
+    todo = [name for name in paths if not up_to_date(name)]
+    skipped = [name for name in paths if name not in todo]
+    if not todo:
+        return {'rows': rows, 'scored': [], 'skipped': skipped}
+
+    os.makedirs(directory, exist_ok=True)
+    outputs = {}
+    for name in todo:
+        filename = f'{name}-{checksums[name][:12]}-{meta["sha256"][:12]}.npy'
+        tmp_path = os.path.join(directory, f'.{filename}.{os.getpid()}.tmp')
+        outputs[name] = (filename, tmp_path, np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                                                       shape=(rows,)) if rows else None)
+
+    ranges = [(start, min(start + chunk_rows, rows)) for start in range(0, rows, chunk_rows)]
+    done = 0
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(ranges), 1)), initializer=_init_worker,
+                             initargs=(cache_dir, meta, {name: paths[name] for name in todo})) as pool:
+        for (start, stop), result in zip(ranges, pool.map(_score_rows, ranges)):
+            for name, values in result.items():
+                outputs[name][2][start:stop] = values
+            done += stop - start
+            if progress:
+                progress(done, rows)
+
+    for name, (filename, tmp_path, values) in outputs.items():
+        if values is None:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.zeros(0, dtype=np.float32))
+            mean = None
+        else:
+            values.flush()
+            mean = round(float(np.mean(values)), 6)
+        del values
+        os.replace(tmp_path, os.path.join(directory, filename))
+        entries[name] = {'file': filename, 'model_sha256': checksums[name], 'dataset_sha256': meta['sha256'],
+                         'rows': rows, 'mean': mean}
+    _write_scores_meta(directory, entries)
+
+    # Colonnes remplacées: les processus qui les ont mappées gardent leurs pages
+    referenced = {entry['file'] for entry in entries.values()} | {SCORES_META}
+    for filename in os.listdir(directory):
+        if filename not in referenced and not filename.startswith('.'):
+            os.remove(os.path.join(directory, filename))
+
+    logger.info(f"Scores calculés sur {rows} lignes: {', '.join(todo)}")
+    return {'rows': rows, 'scored': todo, 'skipped': skipped}
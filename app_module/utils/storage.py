@@ -0,0 +1,218 @@
+"""
+Interface de stockage des tests, commune aux implémentations SQLite (database.TestDatabase)
+et PostgreSQL (postgres.PostgresTestDatabase). Le backend est choisi par Config.DB_BACKEND.
+"""
+import base64
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def utc_today() -> date:
+    """Jour courant des compteurs tests_summary: les timestamps sont stockés en UTC"""
+    return datetime.now(timezone.utc).date()
+
+
+def encode_cursor(test: Dict[str, Any]) -> str:
+    """Curseur opaque de pagination: position (timestamp, id) d'un test"""
+    raw = f"{test['timestamp']}|{test['id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    """Décoder un curseur; None s'il est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        timestamp, test_id = raw.rsplit('|', 1)
+        return timestamp, int(test_id)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def filter_clause(model=None, prediction=None, date_from=None, date_to=None, placeholder='?'):
+    """Conditions WHERE des filtres de la liste (alignées sur les index)"""
+    where, params = [], []
+    if model:
+        where.append(f'model_used = {placeholder}')
+        params.append(model)
+    if prediction is not None:
+        where.append(f'prediction = {placeholder}')
+        params.append(int(prediction))
+    if date_from:
+        where.append(f'timestamp >= {placeholder}')
+        params.append(date_from)
+    if date_to:
+        # Borne incluse: jusqu'à la fin de la journée
+        where.append(f'timestamp < {placeholder}')
+        params.append((datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d'))
+    return where, params
+
+
+def page_result(tests: List[Dict[str, Any]], limit: int, backwards: bool, has_position: bool) -> Dict[str, Any]:
+    """
+    Mettre en forme une page keyset à partir des limit + 1 lignes lues
+    (dans l'ordre de lecture: décroissant, ou croissant pour une page précédente)
+    """
+    has_more = len(tests) > limit
+    tests = tests[:limit]
+    if backwards:
+        tests.reverse()
+
+    next_cursor = prev_cursor = None
+    if tests:
+        if backwards or has_more:
+            next_cursor = encode_cursor(tests[-1])
+        if (backwards and has_more) or (not backwards and has_position):
+            prev_cursor = encode_cursor(tests[0])
+
+    return {'tests': tests, 'next_cursor': next_cursor, 'prev_cursor': prev_cursor}
+
+
+class TestStorage(ABC):
+    """Opérations de stockage des tests utilisées par l'application"""
+
+    writer = None
+    # Encodage binaire compact de input_features / explanation (recode_storage, `flask db compact`)
+    supports_compact_encoding = False
+
+    @abstractmethod
+    def init_database(self) -> int:
+        """Mettre le schéma à jour et renvoyer sa version"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Vider les écritures en attente et libérer les connexions"""
+
+    @abstractmethod
+    def save_test(
+        self,
+        model_used: str,
+        prediction: int,
+        probability: float,
+        input_features: Dict[str, Any],
+        explanation: Optional[Dict[str, Any]] = None,
+        certificate_path: Optional[str] = None,
+        user_ip: Optional[str] = None
+    ) -> int:
+        """Sauvegarder un test et renvoyer son id"""
+
+    @abstractmethod
+    def insert_batch(self, rows: Sequence[Tuple]) -> List[int]:
+        """Insérer des lignes (ordre de INSERT_COLUMNS) dans une transaction; ids dans le même ordre"""
+
+    def save_test_async(
+        self,
+        model_used: str,
+        prediction: int,
+        probability: float,
+        input_features: Dict[str, Any],
+        explanation: Optional[Dict[str, Any]] = None,
+        certificate_path: Optional[str] = None,
+        user_ip: Optional[str] = None
+    ) -> Future:
+        """Mettre un test en file d'écriture; le Future renvoie son id (mode write-behind)"""
+        if self.writer is not None:
+            return self.writer.submit(self._test_row(model_used, prediction, probability, input_features,
+                                                     explanation, certificate_path, user_ip))
+
+        future = Future()
+        future.set_result(self.save_test(model_used, prediction, probability, input_features,
+                                          explanation, certificate_path, user_ip))
+        return future
+
+    @abstractmethod
+    def _test_row(self, model_used, prediction, probability, input_features, explanation, certificate_path, user_ip):
+        """Valeurs d'INSERT dans l'ordre de INSERT_COLUMNS"""
+
+    @abstractmethod
+    def get_test_by_id(self, test_id: int, include_archive: bool = False) -> Optional[Dict[str, Any]]:
+        """Test complet (explication comprise), ou None"""
+
+    @abstractmethod
+    def get_all_tests(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Tests les plus récents, sans explication"""
+
+    @abstractmethod
+    def get_tests_page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        direction: str = 'next',
+        model: Optional[str] = None,
+        prediction: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        include_archive: bool = False
+    ) -> Dict[str, Any]:
+        """Page keyset: {'tests': [...], 'next_cursor': str|None, 'prev_cursor': str|None}"""
+
+    @abstractmethod
+    def iter_tests(self, chunk_size: int = 1000, **filters) -> Iterator[List[Dict[str, Any]]]:
+        """Parcourir les tests filtrés par id croissant, par lots (export)"""
+
+    @abstractmethod
+    def update_certificate_path(self, test_id: int, certificate_path: Optional[str]) -> None:
+        """Mettre à jour le chemin du certificat d'un test"""
+
+    @abstractmethod
+    def get_certificate_paths(self, after_id: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Tests ayant un certificat, par lots d'id croissants"""
+
+    @abstractmethod
+    def get_referenced_certificate_paths(self, paths: List[str]) -> set:
+        """Parmi les chemins donnés, ceux qui sont référencés par un test"""
+
+    @abstractmethod
+    def clear_certificate_paths(self, paths: List[str]) -> int:
+        """Retirer les chemins donnés des tests qui les référencent"""
+
+    @abstractmethod
+    def get_test_count(self) -> int:
+        """Nombre total de tests"""
+
+    @abstractmethod
+    def get_risk_count(self) -> int:
+        """Nombre de tests avec risque détecté"""
+
+    @abstractmethod
+    def get_summary(self) -> Dict[str, Any]:
+        """Totaux par modèle et par prédiction"""
+
+    @abstractmethod
+    def get_daily_counts(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Compteurs par jour, modèle et prédiction"""
+
+    @abstractmethod
+    def get_live_snapshot(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """Compteurs par jour et plus grand id lus dans la même transaction: {'last_id': int, 'daily': [...]}"""
+
+    @abstractmethod
+    def get_tests_since(self, last_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Tests d'id > last_id par id croissant (id, timestamp, model_used, prediction, probability)"""
+
+    @abstractmethod
+    def rebuild_summary(self) -> int:
+        """Recalculer les compteurs agrégés; renvoie le total"""
+
+    @abstractmethod
+    def archive_tests(self, older_than_days: Optional[int] = None, batch_size: int = 1000,
+                      vacuum: bool = True, dry_run: bool = False, progress=None) -> Dict[str, Any]:
+        """
+        Déplacer les tests plus anciens que older_than_days hors de la table courante, par lots
+        (compteurs agrégés inchangés); renvoie {'archived', 'months', 'cutoff'}
+        """
+
+    @staticmethod
+    def summarize(rows) -> Dict[str, Any]:
+        """Agréger les lignes (model_used, prediction, count) des totaux"""
+        summary = {'total': 0, 'risk': 0, 'by_model': {}, 'by_prediction': {0: 0, 1: 0}}
+        for row in rows:
+            summary['total'] += row['count']
+            summary['by_prediction'][row['prediction']] = summary['by_prediction'].get(row['prediction'], 0) + row['count']
+            model = summary['by_model'].setdefault(row['model_used'], {'total': 0, 'risk': 0})
+            model['total'] += row['count']
+            if row['prediction'] == 1:
+                model['risk'] += row['count']
+        summary['risk'] = summary['by_prediction'].get(1, 0)
+        return summary
@@ -10,9 +10,100 @@ from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier,
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import LabelEncoder
 import lime
 import lime.lime_tabular
 from app_module.config.settings import Config
+from app_module.utils.data import as_object_columns, load_dataset
+
+# Échantillons et explainers dérivés du dataset, réutilisés tant que le dataset partagé ne change pas
+_background_cache: Dict[Tuple, Tuple[pd.DataFrame, pd.DataFrame]] = {}
+_lime_cache: Dict[Tuple, Tuple[pd.DataFrame, Dict[int, LabelEncoder], Any]] = {}
+
+
+def _shap_background(columns: List[str], n_background: int) -> pd.DataFrame:
+    """Échantillon de fond SHAP (random_state fixe), calculé une fois par jeu de colonnes"""
+    dataset = load_dataset(Config.DATASET_PATH)
+    missing_cols = [c for c in columns if c not in dataset.columns]
+    if dataset.empty or missing_cols:
+        raise KeyError(f"Colonnes absentes du dataset: {missing_cols}")
+
+    key = (tuple(columns), n_background)
+    cached = _background_cache.get(key)
+    if cached is not None and cached[0] is dataset:
+        return cached[1]
+
+    bg = dataset[columns]
+    # Échantillonnage (pour avoir des exemples représentatifs sans tout le dataset)
+    if bg.shape[0] > n_background:
+        bg = bg.sample(n=n_background, random_state=42)
+    bg = as_object_columns(bg)
+    _background_cache[key] = (dataset, bg)
+    return bg
+
+
+def _build_lime_explainer(train_data: pd.DataFrame, extra_values: Dict[str, List[str]]):
+    """
+    Encoder les colonnes non numériques en entiers (LIME ne connaît que des nombres) et créer
+    l'explainer. Les colonnes category sont encodées à partir de leurs codes, sans relire les chaînes.
+    """
+    encoders = {}
+    encoded = {}
+    for idx, col in enumerate(train_data.columns):
+        series = train_data[col]
+        if pd.api.types.is_numeric_dtype(series):
+            encoded[col] = series.to_numpy()
+            continue
+        if series.isna().any():
+            series = series.astype(str)
+        categorical = series.astype('category')
+        categories = np.asarray(categorical.cat.categories, dtype=str)
+        le = LabelEncoder()
+        le.fit(np.concatenate([categories, np.asarray(extra_values.get(col, []), dtype=str)]))
+        encoded[col] = np.searchsorted(le.classes_, categories)[categorical.cat.codes.to_numpy()]
+        encoders[idx] = le
+
+    train_encoded = pd.DataFrame(encoded, columns=train_data.columns)
+    explainer = lime.lime_tabular.LimeTabularExplainer(
+        train_encoded.values,
+        feature_names=list(train_data.columns),
+        class_names=['Sain', 'Risque'],
+        categorical_features=list(encoders.keys()),
+        mode='classification',
+        discretize_continuous=True
+    )
+    return encoders, explainer
+
+
+def _lime_explainer(df_input: pd.DataFrame):
+    """
+    Explainer LIME et encodeurs pour ces colonnes: les statistiques du training set sont
+    calculées une fois par processus. Une modalité inconnue du dataset impose un explainer dédié.
+    """
+    columns = list(df_input.columns)
+    try:
+        dataset = load_dataset(Config.DATASET_PATH)
+        train_data = dataset[columns]
+    except Exception:
+        # Fallback: très mauvais pour LIME mais évite le crash
+        return _build_lime_explainer(df_input.copy(), {})
+
+    key = tuple(columns)
+    cached = _lime_cache.get(key)
+    if cached is None or cached[0] is not dataset:
+        encoders, explainer = _build_lime_explainer(train_data, {})
+        cached = (dataset, encoders, explainer)
+        _lime_cache[key] = cached
+    encoders, explainer = cached[1], cached[2]
+
+    unseen = {}
+    for idx, le in encoders.items():
+        value = str(df_input[columns[idx]].iloc[0])
+        if value not in le.classes_:
+            unseen[columns[idx]] = [value]
+    if unseen:
+        return _build_lime_explainer(train_data, unseen)
+    return encoders, explainer
 
 
 def _get_original_feature_mapping(preprocessor: ColumnTransformer, input_cols: List[str]) -> Dict[int, str]:
@@ -152,6 +243,56 @@ def _aggregate_shap_by_original_features(shap_values: np.ndarray, mapping: Dict[
     return aggregated
 
 
+def batch_shap_values(model: Any, data: pd.DataFrame, background: pd.DataFrame) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Valeurs SHAP de la classe positive pour un lot de lignes, shape (n_lignes, n_features transformées),
+    et mapping index transformé -> feature originale. Toujours sur l'échelle des probabilités (y compris
+    TreeExplainer, sinon en log-odds pour le gradient boosting): les modèles restent comparables.
+    """
+    clf = model
+    preprocess = None
+    if isinstance(model, Pipeline):
+        preprocess = model.named_steps.get("preprocess", None)
+        clf = model.named_steps.get("clf", model)
+
+    if preprocess is not None:
+        bg_trans = preprocess.transform(background)
+        data_trans = preprocess.transform(data)
+        feature_mapping = _get_original_feature_mapping(preprocess, list(data.columns))
+    else:
+        bg_trans = background.values
+        data_trans = data.values
+        feature_mapping = {i: col for i, col in enumerate(data.columns)}
+    if hasattr(bg_trans, 'toarray'):
+        bg_trans = bg_trans.toarray()
+    if hasattr(data_trans, 'toarray'):
+        data_trans = data_trans.toarray()
+    bg_trans = np.asarray(bg_trans)
+    data_trans = np.asarray(data_trans)
+
+    def model_predict_proba(x):
+        proba = clf.predict_proba(np.asarray(x))
+        return proba[:, 1] if proba.ndim == 2 and proba.shape[1] > 1 else proba.flatten()
+
+    tree_types = (RandomForestClassifier, GradientBoostingClassifier,
+                  HistGradientBoostingClassifier, DecisionTreeClassifier)
+    if isinstance(clf, tree_types):
+        try:
+            values = shap.TreeExplainer(clf, bg_trans[:100], feature_perturbation="interventional",
+                                        model_output="probability")(data_trans).values
+        except Exception:
+            values = shap.Explainer(model_predict_proba, bg_trans[:100])(data_trans).values
+    else:
+        values = shap.Explainer(model_predict_proba, bg_trans[:100])(data_trans).values
+
+    # (n, features, classes) pour les explainers d'arbres: classe positive
+    if values.ndim == 3:
+        classes = list(getattr(clf, 'classes_', [0, 1]))
+        pos_idx = classes.index(1) if 1 in classes else values.shape[2] - 1
+        values = values[:, :, pos_idx] if values.shape[2] == len(classes) else values[:, pos_idx, :]
+    return np.asarray(values), feature_mapping
+
+
 def explain_model_prediction(model: Any, df_input: pd.DataFrame, n_background: int = 200) -> Dict[str, Any]:
     """
     Retourne les contributions SHAP pour une prédiction.
@@ -162,26 +303,8 @@ def explain_model_prediction(model: Any, df_input: pd.DataFrame, n_background: i
         # 1) CHARGEMENT DU BACKGROUND DATASET (plus représentatif)
         # ------------------------------------------------------------
         try:
-            df_full = pd.read_csv(Config.DATASET_PATH)
-            
-            # S'assurer que toutes les colonnes nécessaires sont présentes
-            required_cols = list(df_input.columns)
-            missing_cols = [c for c in required_cols if c not in df_full.columns]
-            
-            if missing_cols:
-                # Utiliser df_input comme fallback
-                bg = df_input.copy()
-            else:
-                # Sélectionner uniquement les colonnes nécessaires
-                bg = df_full[required_cols].copy()
-                
-                # Échantillonnage stratifié si possible (pour avoir des exemples représentatifs)
-                if bg.shape[0] > n_background:
-                    bg = bg.sample(n=min(n_background, bg.shape[0]), random_state=42)
-            
-            # S'assurer que l'ordre des colonnes correspond
-            bg = bg[df_input.columns]
-            
+            # Dataset partagé (cache binaire) et échantillon mémorisé par jeu de colonnes
+            bg = _shap_background(list(df_input.columns), n_background)
         except Exception as e:
             # Fallback: utiliser df_input
             bg = df_input.copy()
@@ -365,106 +488,26 @@ def explain_model_prediction_lime(model: Any, df_input: pd.DataFrame, n_samples:
     Retourne les contributions LIME pour une prédiction.
     """
     try:
-        # 1) CHARGEMENT DU TRAIN SET (LIME a besoin de stats sur le training set)
-        try:
-            df_full = pd.read_csv(Config.DATASET_PATH)
-            # S'assurer que les colonnes correspondent
-            train_data = df_full[df_input.columns]
-        except:
-            # Fallback
-            train_data = df_input.copy() # Très mauvais pour LIME mais évite le crash
-
-        # 2) GESTION DU PIPELINE ET PREPROCESSING
-        # LIME a besoin de travailler sur des arrays numpy si c'est un modèle sklearn standard,
-        # ou on peut lui passer le pipeline complet s'il gère les colonnes brutes.
-        # Ici nos pipelines gèrent les DataFrames bruts via 'preprocess'.
-        
-        # On va utiliser LIME sur les données BRUTES (avant preprocessing)
-        # car c'est plus interprétable pour l'utilisateur.
-        
-        # Convertir les colonnes catégorielles en indices pour LIME (si besoin) ou laisser LIME gérer
-        # LimeTabularExplainer gère les catégorielles si on lui dit lesquelles c'est.
-        
-        categorical_features = []
-        categorical_names = {}
-        for idx, col in enumerate(train_data.columns):
-            if train_data[col].dtype == 'object':
-                categorical_features.append(idx)
-                # On doit encoder les valeurs pour LIME
-                # Pour simplifier ici, on va laisser LIME se débrouiller ou
-                # convertir temporairement en label encoding pour fit l'explainer
-                pass
-
-        # NOTE: LIME est complexe à setup parfaitement avec des pipelines complexes.
-        # Approche simplifiée: On passe le train_data tel quel, mais LIME attend du numpy souvent.
-        
-        # Convert to numpy for LIME
-        train_data_np = train_data.values
-        input_np = df_input.values[0]
-
-        # Fonction de prédiction probabiliste custom
-        def predict_proba_fn(arr):
-            # arr est un numpy array de (n_samples, n_features)
-            # Reconvertir en DataFrame pour le pipeline
-            df = pd.DataFrame(arr, columns=df_input.columns)
-            
-            # Restaurer les types (LIME convertit souvent en float)
-            # Ceci est critique car le pipeline attend des strings pour les catégorielles
-            for col in df_input.columns:
-                if df_input[col].dtype == 'object':
-                     # Essayer de mapper les floats vers les valeurs originales si on avait encodé...
-                     # C'est là que ça coince souvent.
-                     # Simplification: SI le pipeline plante sur des types, on a un souci.
-                     pass
-            
-            return model.predict_proba(df)
-
-        # Pour faire fonctionner LIME proprement avec des features string/catégorielles sans prise de tête:
-        # On va créer un explainer qui 'apprend' sur le training set brut.
-        # MAIS LimeTabularExplainer attend que les catégorielles soient des entiers.
-        
-        # ==> STRATÉGIE ROBUSTE:
-        # Encoder les strings en entiers pour LIME, et décoder dans la predict_fn.
-        
-        transformers = {} # col_idx -> LabelEncoder
-        from sklearn.preprocessing import LabelEncoder
-        
-        train_encoded = train_data.copy()
-        
-        for idx, col in enumerate(train_data.columns):
-            if train_data[col].dtype == 'object':
-                le = LabelEncoder()
-                # Fit sur train + input pour être sûr d'avoir toutes les classes
-                combined = pd.concat([train_data[col], df_input[col]])
-                le.fit(combined.astype(str))
-                
-                train_encoded[col] = le.transform(train_data[col].astype(str))
-                transformers[idx] = le
-            
-        # Créer l'explainer
-        explainer = lime.lime_tabular.LimeTabularExplainer(
-            train_encoded.values,
-            feature_names=list(train_data.columns),
-            class_names=['Sain', 'Risque'],
-            categorical_features=list(transformers.keys()),
-            mode='classification',
-            discretize_continuous=True
-        )
+        # 1) EXPLAINER (LIME a besoin de stats sur le training set, calculées une fois par processus)
+        # LIME travaille sur les données BRUTES (avant preprocessing), plus interprétables pour l'utilisateur.
+        # LimeTabularExplainer attend des catégorielles entières: on encode les chaînes en entiers
+        # pour LIME, et on les décode dans la fonction de prédiction.
+        transformers, explainer = _lime_explainer(df_input)
 
         # Encoder l'input
         input_encoded = df_input.copy()
         for idx, le in transformers.items():
             name = df_input.columns[idx]
             input_encoded[name] = le.transform(df_input[name].astype(str))
-            
+
         # Wrapper de prédiction qui décode
         def custom_predict(np_array):
             # np_array: shape (n, n_features) ints/floats
-            df_temp = pd.DataFrame(np_array, columns=train_data.columns)
+            df_temp = pd.DataFrame(np_array, columns=df_input.columns)
             
             # Décoder
             for idx, le in transformers.items():
-                name = train_data.columns[idx]
+                name = df_input.columns[idx]
                 # LIME perturbe en float, on arrondi
                 vals = df_temp[name].round().astype(int)
                 # Clip pour éviter erreurs d'index
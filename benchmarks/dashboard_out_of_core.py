@@ -0,0 +1,105 @@
+"""
+Banc d'essai du mode hors mémoire du dashboard.
+
+Pour chaque taille, génère un CSV synthétique (lignes tirées avec remise dans data/dataset.csv),
+construit la copie en colonnes par blocs, puis le cube du dashboard en une fois (DataFrame
+complet) et bloc par bloc (DataCube.from_chunks). Affiche les durées et les pics d'allocation
+Python/NumPy (tracemalloc; les pages des fichiers mappés n'y figurent pas).
+
+    python -m benchmarks.dashboard_out_of_core --rows 45000 1000000 10000000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from app_module.config.settings import Config
+from app_module.routes.dashboard import CUBE_MEASURES, FILTER_COLUMNS
+from app_module.utils.data_cube import DataCube
+from app_module.utils.dataset_cache import (build_dataset_cache, cached_categories, iter_cached_frames,
+                                            load_cached_frame)
+
+GENERATION_CHUNK = 500000
+
+
+def generate_csv(path: str, rows: int, seed: int = 0) -> None:
+    """CSV de `rows` lignes tirées au hasard dans le dataset réel, écrit par blocs"""
+    source = pd.read_csv(Config.DATASET_PATH)
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, rows, GENERATION_CHUNK):
+            size = min(GENERATION_CHUNK, rows - start)
+            chunk = source.iloc[rng.integers(0, len(source), size)]
+            chunk.to_csv(f, index=False, header=start == 0)
+
+
+def measure(label: str, func):
+    """(résultat, secondes, pic d'allocation en Mo)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    print(f"  {label:<28} {elapsed:8.2f} s   pic {peak:9.1f} Mo")
+    return result, elapsed, peak
+
+
+def run(rows: int, workdir: str, chunk_rows: int, max_in_memory: int) -> None:
+    print(f"{rows:,} lignes")
+    csv_path = os.path.join(workdir, f'dataset_{rows}.csv')
+    cache_dir = os.path.join(workdir, f'cache_{rows}')
+    started = time.perf_counter()
+    generate_csv(csv_path, rows)
+    print(f"  {'génération du CSV':<28} {time.perf_counter() - started:8.2f} s")
+    print(f"  {'taille du CSV':<28} {os.path.getsize(csv_path) / 1e6:8.1f} Mo")
+
+    meta, _, _ = measure('copie en colonnes', lambda: build_dataset_cache(csv_path, cache_dir, chunk_rows=chunk_rows))
+
+    columns = {*FILTER_COLUMNS, *CUBE_MEASURES['distributions'], *CUBE_MEASURES['sums'],
+               *CUBE_MEASURES['histograms'], *(c for pair in CUBE_MEASURES['crosstabs'] for c in pair)}
+    chunked, _, _ = measure('cube par blocs', lambda: DataCube.from_chunks(
+        lambda: iter_cached_frames(cache_dir, meta, columns, chunk_rows=chunk_rows),
+        cached_categories(meta), FILTER_COLUMNS, **CUBE_MEASURES))
+
+    if rows <= max_in_memory:
+        def in_memory():
+            df = load_cached_frame(cache_dir, meta)
+            return DataCube(df, FILTER_COLUMNS, **CUBE_MEASURES)
+        cube, _, _ = measure('cube en une fois', in_memory)
+        assert np.array_equal(cube.counts, chunked.counts)
+
+    selection = {'AgeCategory': ['60-64', '65-69'], 'Smoking': 'Yes'}
+    started = time.perf_counter()
+    for _ in range(100):
+        stats = chunked.select(selection)
+        stats.value_counts('GenHealth'), stats.histogram('BMI'), stats.mean('BMI')
+    print(f"  {'requête filtrée (moyenne)':<28} {(time.perf_counter() - started) * 10:8.2f} ms")
+
+    os.remove(csv_path)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[45000, 1000000, 10000000])
+    parser.add_argument('--chunk-rows', type=int, default=Config.DATASET_CHUNK_ROWS)
+    parser.add_argument('--max-in-memory', type=int, default=10000000,
+                        help="taille maximale pour la construction en une fois (comparaison)")
+    parser.add_argument('--workdir', default=None, help="répertoire des fichiers générés (temporaire par défaut)")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='dashboard-bench-')
+    try:
+        for rows in args.rows:
+            run(rows, workdir, args.chunk_rows, args.max_in_memory)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Configuration gunicorn (gunicorn -c gunicorn.conf.py app:app).
+
+preload_app: app.py est importé une seule fois par le master, qui charge aussi tous les modèles
+du registre et construit les dashboards Dash; les workers sont ensuite créés par fork et
+partagent ces pages en copy-on-write.
+Sans preload, chaque worker sert dès son import et construit les dashboards dans un thread
+(DASHBOARD_WARMUP), ou au premier accès à /dashboard.
+Juste avant le fork, le tas Python est gelé (gc.freeze) pour que le ramasse-miettes des
+workers ne réécrive pas les en-têtes des objets hérités.
+
+Bilan mémoire des workers: flask --app app workers memory
+"""
+import os
+from app_module.config.settings import Config
+from app_module.utils.memory import format_memory, freeze_heap, read_memory
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+pidfile = Config.GUNICORN_PIDFILE
+
+
+def when_ready(server):
+    """Master prêt, workers pas encore créés"""
+    if preload_app:
+        # Le registre est celui qu'app.py a importé: les modèles chargés ici sont hérités par les workers
+        from app_module.utils.models import registry
+        registry.load_all()
+        mount = _dash_mount(server.app.wsgi())
+        if mount is not None:
+            try:
+                mount.load()
+            except Exception as e:
+                server.log.error(f"Dashboards non préchargés (construits au premier accès): {e}")
+        frozen = freeze_heap()
+        server.log.info(f"Tas Python gelé avant fork: {frozen} objets")
+    values = read_memory()
+    if values:
+        server.log.info(f"Mémoire du master: {format_memory(values)}")
+
+
+def post_worker_init(worker):
+    """Mémoire du worker une fois initialisé (pages partagées avec le master = économie)"""
+    mount = _dash_mount(worker.wsgi)
+    if Config.DASHBOARD_WARMUP and mount is not None and not mount.loaded:
+        mount.warm_up()
+    values = read_memory()
+    if values:
+        worker.log.info(f"Mémoire du worker {worker.pid}: {format_memory(values)}")
+
+
+def _dash_mount(app):
+    """Montage différé des dashboards (app_module.routes.dash_mount), s'il est installé"""
+    return getattr(app, 'extensions', {}).get('dash_mount')
+
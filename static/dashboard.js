@@ -33,6 +33,16 @@ class Dashboard {
 
     // Mettre à jour les cartes de statistiques
     updateStatsCards(data) {
+        // Cartes de templates/dashboard.html
+        const total = document.getElementById('stats-total');
+        if (total && data.totalPredictions !== undefined) {
+            total.textContent = data.totalPredictions;
+        }
+        const risk = document.getElementById('stats-risk');
+        if (risk && data.positiveCases !== undefined) {
+            risk.textContent = data.positiveCases;
+        }
+
         const statsContainer = document.querySelector('.dashboard-stats');
         if (!statsContainer) return;
 
@@ -0,0 +1,160 @@
+import os
+import pytest
+from flask import Flask
+from app_module.utils import database
+from app_module.utils.certificate_cache import CertificateCache, certificate_token
+from app_module.routes import certificates as certificates_routes
+
+
+def _fake_test(test_id):
+    return {
+        'id': test_id,
+        'timestamp': '2025-01-01 10:00:00',
+        'model_used': 'log_reg',
+        'prediction': 1,
+        'probability': 0.42,
+        'input_features': {'BMI': 27.3, 'Sex': 'Male'},
+    }
+
+
+def test_cache_renders_once_and_evicts_lru(tmp_path):
+    cache = CertificateCache(cache_dir=str(tmp_path), max_files=2, max_bytes=10 ** 9)
+
+    first = cache.get_or_render(_fake_test(1))
+    assert os.path.exists(first)
+    mtime = os.path.getmtime(first)
+    os.utime(first, (mtime - 100, mtime - 100))
+
+    second = cache.get_or_render(_fake_test(2))
+    os.utime(second, (mtime - 50, mtime - 50))
+    # Accès au premier: il redevient le plus récent
+    assert cache.get_or_render(_fake_test(1)) == first
+
+    cache.get_or_render(_fake_test(3))
+    remaining = sorted(os.listdir(tmp_path))
+    assert len(remaining) == 2
+    assert not os.path.exists(second)
+    assert os.path.exists(first)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    test_db = database.TestDatabase(str(tmp_path / 'tests.db'))
+    monkeypatch.setattr(database, '_db', test_db)
+    monkeypatch.setattr(certificates_routes, 'get_certificate_cache',
+                        lambda: CertificateCache(cache_dir=str(tmp_path / 'cache')))
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(certificates_routes.certificates_bp)
+    test_id = test_db.save_test('log_reg', 0, 0.1, {'BMI': 22.0})
+    with app.test_client() as client:
+        yield client, test_id
+
+
+def test_lazy_certificate_requires_token_and_supports_conditional_get(client):
+    client, test_id = client
+
+    assert client.get(f'/certificates/{test_id}').status_code == 403
+
+    url = f'/certificates/{test_id}?t={certificate_token(test_id)}'
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert 'immutable' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+
+    revalidated = client.get(url, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+
+
+def test_save_certificate_uses_sharded_layout_and_thumbnail(tmp_path, monkeypatch):
+    from app_module.config.settings import Config
+    from app_module.utils.certificate import render_certificate_from_test, save_certificate, thumbnail_path
+
+    monkeypatch.setattr(Config, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'CERTIFICATE_FORMAT', 'webp')
+    monkeypatch.setattr(Config, 'CERTIFICATE_THUMBNAIL_WIDTH', 160)
+
+    relative = save_certificate(render_certificate_from_test(_fake_test(7)), 'certificate_7')
+    parts = relative.split('/')
+    assert parts[0] == 'certificates' and len(parts) == 4
+    assert all(len(part) == 2 for part in parts[1:3])
+    assert relative.endswith('.webp')
+    assert (tmp_path / thumbnail_path(relative)).exists()
+
+
+def test_migrate_certificates_moves_legacy_files(tmp_path, monkeypatch):
+    from app_module.config.settings import Config
+    from app_module.utils.certificate import render_certificate_from_test
+    from app_module.utils.certificate_maintenance import migrate_certificates, target_certificate_path
+
+    monkeypatch.setattr(Config, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'CERTIFICATE_FORMAT', 'png-palette')
+    (tmp_path / 'certificates').mkdir()
+    render_certificate_from_test(_fake_test(1)).save(tmp_path / 'certificates' / 'certificate_1_x.png', 'PNG')
+
+    test_db = database.TestDatabase(str(tmp_path / 'tests.db'))
+    test_id = test_db.save_test('log_reg', 1, 0.9, {'BMI': 30.0}, certificate_path='certificates/certificate_1_x.png')
+
+    stats = migrate_certificates(test_db, batch_size=1)
+    assert stats['migrated'] == 1
+    new_path = test_db.get_test_by_id(test_id)['certificate_path']
+    assert new_path == target_certificate_path('certificates/certificate_1_x.png')
+    assert (tmp_path / new_path).exists()
+    assert not (tmp_path / 'certificates' / 'certificate_1_x.png').exists()
+
+    assert migrate_certificates(test_db)['skipped'] == 1
+
+
+def test_migrate_certificates_reencodes_in_place(tmp_path, monkeypatch):
+    from PIL import Image
+    from app_module.config.settings import Config
+    from app_module.utils.certificate import render_certificate_from_test, save_certificate
+    from app_module.utils.certificate_maintenance import migrate_certificates
+
+    monkeypatch.setattr(Config, 'DATA_DIR', str(tmp_path))
+    path = save_certificate(render_certificate_from_test(_fake_test(1)), 'certificate_1_x', 'png')
+    test_db = database.TestDatabase(str(tmp_path / 'tests.db'))
+    test_db.save_test('log_reg', 1, 0.9, {'BMI': 30.0}, certificate_path=path)
+    size_before = os.path.getsize(tmp_path / path)
+
+    # Même extension et même chemin: seul l'encodage du fichier change
+    monkeypatch.setattr(Config, 'CERTIFICATE_FORMAT', 'png-palette')
+    stats = migrate_certificates(test_db)
+    assert stats['migrated'] == 1
+    with Image.open(tmp_path / path) as im:
+        assert im.mode == 'P'
+    assert os.path.getsize(tmp_path / path) < size_before
+
+    assert migrate_certificates(test_db)['skipped'] == 1
+    assert migrate_certificates(test_db, force=True)['migrated'] == 1
+
+
+def test_sweep_certificates_clears_dangling_orphans_and_budget(tmp_path, monkeypatch):
+    from app_module.config.settings import Config
+    from app_module.utils.certificate_maintenance import sweep_certificates
+
+    monkeypatch.setattr(Config, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'CERTIFICATES_DIR', str(tmp_path / 'certificates'))
+    shard = tmp_path / 'certificates' / 'aa'
+    shard.mkdir(parents=True)
+
+    test_db = database.TestDatabase(str(tmp_path / 'tests.db'))
+    dangling = test_db.save_test('knn', 0, 0.2, {}, certificate_path='certificates/aa/gone.png')
+    old = test_db.save_test('knn', 0, 0.2, {}, certificate_path='certificates/aa/old.png')
+    new = test_db.save_test('knn', 0, 0.2, {}, certificate_path='certificates/aa/new.png')
+    for name, age in (('old.png', 300), ('old.thumb.png', 300), ('new.png', 100), ('orphan.png', 200)):
+        path = shard / name
+        path.write_bytes(b'x' * 1000)
+        stamp = os.path.getmtime(path) - age
+        os.utime(path, (stamp, stamp))
+
+    stats = sweep_certificates(test_db, max_bytes=1500, max_age_days=0, batch_size=1, grace_seconds=0)
+
+    assert stats['dangling_cleared'] == 1
+    assert stats['orphans_removed'] == 1
+    assert stats['budget_removed'] == 2
+    assert sorted(os.listdir(shard)) == ['new.png']
+    assert test_db.get_test_by_id(dangling)['certificate_path'] is None
+    assert test_db.get_test_by_id(old)['certificate_path'] is None
+    assert test_db.get_test_by_id(new)['certificate_path'] == 'certificates/aa/new.png'
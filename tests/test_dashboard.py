@@ -0,0 +1,254 @@
+import numpy as np
+import pandas as pd
+from app_module.utils.charts import bin_codes, histogram_bins, histogram_figure
+from app_module.utils.dashboard_cache import DashboardCache, filter_key
+from app_module.utils.data_cube import DataCube
+
+
+def _sample_frame(rows=400):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'AgeCategory': rng.choice(['18-24', '25-29', '80 or older'], rows),
+        'Smoking': pd.Categorical(rng.choice(['No', 'Yes'], rows)),
+        'Sex': rng.choice(['Female', 'Male'], rows),
+        'PhysicalActivity': rng.choice(['No', 'Yes'], rows),
+        'BMI': rng.uniform(15, 45, rows),
+    })
+
+
+def test_data_cube_merges_cells_like_raw_rows():
+    df = _sample_frame()
+    rng = np.random.default_rng(1)
+    df['GenHealth'] = rng.choice(['Good', 'Poor', 'Fair'], len(df))
+    df['HeartDisease'] = rng.choice(['No', 'Yes'], len(df))
+    df['SkinCancer'] = rng.choice(['No', 'Yes'], len(df))
+    df.loc[::7, 'BMI'] = np.nan
+    cube = DataCube(df, ['AgeCategory', 'Smoking', 'Sex', 'PhysicalActivity'], distributions=('GenHealth',), crosstabs=[('HeartDisease', 'SkinCancer')],
+                    sums=('BMI',), histograms={'BMI': 10})
+
+    selection = {'AgeCategory': ['25-29', '80 or older'], 'Smoking': None, 'Sex': 'Male', 'PhysicalActivity': ['Yes']}
+    rows = df[df['AgeCategory'].isin(['25-29', '80 or older']) & (df['Sex'] == 'Male') & (df['PhysicalActivity'] == 'Yes')]
+    stats = cube.select(selection)
+
+    assert len(stats) == len(rows)
+    assert stats.value_counts('GenHealth').to_dict() == rows['GenHealth'].value_counts().to_dict()
+    assert stats.value_counts('AgeCategory').to_dict() == rows['AgeCategory'].value_counts().to_dict()
+    assert stats.count_where('SkinCancer', ['Yes']) == int((rows['SkinCancer'] == 'Yes').sum())
+    assert np.isclose(stats.mean('BMI'), rows['BMI'].mean())
+    expected = rows.groupby(['HeartDisease', 'SkinCancer']).size().unstack(fill_value=0)
+    assert stats.crosstab('HeartDisease', 'SkinCancer').to_numpy().tolist() == expected.to_numpy().tolist()
+
+    counts, edges = stats.histogram('BMI')
+    assert counts.tolist() == np.histogram(rows['BMI'].dropna(), bins=edges)[0].tolist()
+    assert len(cube.select({'Sex': ['Unknown']})) == 0
+    assert len(cube.select({'AgeCategory': None, 'Smoking': 'all', 'Sex': [], 'PhysicalActivity': ['all', 'No']})) == len(df)
+
+
+def test_histogram_figure_sends_bins_not_raw_values():
+    values = np.random.default_rng(2).normal(28, 6, 50000)
+    counts, edges = histogram_bins(values, bins=30)
+    assert counts.sum() == len(values)
+    assert np.array_equal(bin_codes(values, edges), np.clip(np.digitize(values, edges) - 1, 0, 29))
+
+    figure = histogram_figure(counts, edges, 'BMI', color='#0d9488')
+    assert len(figure.data[0].x) == 30
+    assert len(figure.to_json()) < 4096
+
+
+def test_dashboard_cache_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'dashboard.db')
+    first, second = DashboardCache(path, max_size=2), DashboardCache(path, max_size=2)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'y': [1, 2, 3]}
+
+    key = filter_key([['Yes', 'No', 'Yes'], 'all', [], 'Male'])
+    assert key == (('No', 'Yes'), None, None, ('Male',))
+    assert first.get_or_compute('bmi', 'v1', key, compute) == {'y': [1, 2, 3]}
+    assert first.get_or_compute('bmi', 'v1', key, compute) == {'y': [1, 2, 3]}
+    # Autre worker: lu dans la table partagée, pas recalculé
+    assert second.get_or_compute('bmi', 'v1', key, compute) == {'y': [1, 2, 3]}
+    assert len(calls) == 1 and first.hits == 1 and second.shared_hits == 1
+
+    # Nouvelle version des données: recalcul
+    second.get_or_compute('bmi', 'v2', key, compute)
+    assert len(calls) == 2
+
+
+def test_stats_endpoint_serves_cached_aggregates_with_etag(tmp_path, monkeypatch):
+    from flask import Flask
+    from app_module.routes.stats import stats_bp
+    from app_module.utils import database, dashboard_stats
+
+    test_db = database.TestDatabase(str(tmp_path / 'tests.db'))
+    monkeypatch.setattr(database, '_db', test_db)
+    monkeypatch.setattr(dashboard_stats, 'stats_cache', dashboard_stats.StatsCache(dashboard_stats.compute_dashboard_stats, ttl=60))
+    monkeypatch.setattr('app_module.routes.stats.stats_cache', dashboard_stats.stats_cache)
+    for prediction in (1, 0, 1):
+        test_db.save_test('knn', prediction, 0.5, {'BMI': 25.0})
+
+    app = Flask(__name__)
+    app.register_blueprint(stats_bp)
+    client = app.test_client()
+
+    response = client.get('/api/dashboard/stats')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['totalPredictions'] == 3 and data['positiveCases'] == 2
+    assert data['tests']['byModel']['knn'] == {'total': 3, 'risk': 2}
+    assert data['tests']['today'] == 3
+    assert data['dataset']['rows'] > 0
+
+    etag = response.headers['ETag']
+    assert client.get('/api/dashboard/stats', headers={'If-None-Match': etag}).status_code == 304
+
+    # Dans le TTL: valeur précalculée, la nouvelle ligne n'apparaît qu'après expiration
+    test_db.save_test('knn', 0, 0.1, {'BMI': 25.0})
+    assert client.get('/api/dashboard/stats').get_json()['totalPredictions'] == 3
+    dashboard_stats.stats_cache.invalidate()
+    assert client.get('/api/dashboard/stats', headers={'If-None-Match': etag}).get_json()['totalPredictions'] == 4
+
+
+def test_live_aggregates_merge_only_new_tests(tmp_path):
+    from app_module.utils import database
+    from app_module.utils.live_stats import LiveAggregates
+
+    test_db = database.TestDatabase(str(tmp_path / 'tests.db'))
+    for model, prediction in (('knn', 1), ('knn', 0), ('log_reg', 1)):
+        test_db.save_test(model, prediction, 0.5, {'BMI': 25.0})
+
+    aggregates = LiveAggregates(test_db, batch_size=2)
+    assert aggregates.refresh() == 0  # initialisation depuis tests_summary
+    first = aggregates.snapshot(days=7)
+    assert first['total'] == 3 and first['risk'] == 2 and first['lastId'] == 3
+    assert first['byModel'] == {'knn': 2, 'log_reg': 1}
+
+    seen = []
+    get_tests_since = test_db.get_tests_since
+    test_db.get_tests_since = lambda last_id, limit: seen.append(last_id) or get_tests_since(last_id, limit)
+    for prediction in (1, 1, 0):
+        test_db.save_test('rf', prediction, 0.7, {'BMI': 30.0})
+
+    assert aggregates.refresh() == 3
+    assert seen == [3, 5]  # lots de 2 à partir du dernier id vu
+    data = aggregates.snapshot(days=7)
+    assert data['total'] == 6 and data['risk'] == 4 and data['today'] == 6
+    assert data['byModel']['rf'] == 3 and data['version'] > first['version']
+    assert data['riskRatePerDay'][-1] == round(4 / 6, 4)
+
+    assert aggregates.refresh() == 0
+    assert aggregates.snapshot(days=7)['version'] == data['version']
+    test_db.close()
+
+
+def test_today_counts_follow_utc_days_whatever_the_server_timezone(tmp_path, monkeypatch):
+    import time
+    from app_module.utils import database
+    from app_module.utils.dashboard_stats import prediction_statistics
+    from app_module.utils.live_stats import LiveAggregates
+
+    test_db = database.TestDatabase(str(tmp_path / 'tests.db'))
+    test_db.save_test('knn', 1, 0.5, {'BMI': 25.0})
+    # UTC+14 et UTC-12: à toute heure, l'un des deux fuseaux n'est pas au même jour que UTC
+    try:
+        for zone in ('Pacific/Kiritimati', 'Etc/GMT+12'):
+            monkeypatch.setenv('TZ', zone)
+            time.tzset()
+            assert prediction_statistics(test_db)['today'] == 1
+            aggregates = LiveAggregates(test_db)
+            aggregates.refresh()
+            assert aggregates.snapshot(days=7)['today'] == 1
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+        test_db.close()
+
+
+def test_data_cube_from_chunks_matches_in_memory_cube():
+    df = _sample_frame(rows=1000)
+    rng = np.random.default_rng(2)
+    df['GenHealth'] = rng.choice(['Good', 'Poor', 'Fair'], len(df))
+    df.loc[::9, 'BMI'] = np.nan
+    df.loc[::13, 'Sex'] = None
+    for column in ('AgeCategory', 'Sex', 'PhysicalActivity', 'GenHealth'):
+        df[column] = df[column].astype('category')
+    categories = {column: df[column].cat.categories for column in df.columns if column != 'BMI'}
+    measures = {'distributions': ('GenHealth',), 'sums': ('BMI',), 'histograms': {'BMI': 12}}
+    columns = ['AgeCategory', 'Smoking', 'Sex', 'PhysicalActivity']
+
+    cube = DataCube(df, columns, **measures)
+    chunked = DataCube.from_chunks(lambda: (df.iloc[start:start + 128] for start in range(0, len(df), 128)),
+                                   categories, columns, **measures)
+
+    assert np.array_equal(chunked.counts, cube.counts)
+    assert np.array_equal(chunked.distributions['GenHealth'], cube.distributions['GenHealth'])
+    assert np.allclose(chunked.sums['BMI'][0], cube.sums['BMI'][0])  # sommes par blocs: arrondis près
+    assert np.array_equal(chunked.histograms['BMI'][1], cube.histograms['BMI'][1])
+    assert np.array_equal(chunked.histograms['BMI'][0], cube.histograms['BMI'][0])
+    selection = {'AgeCategory': ['18-24'], 'Sex': 'Female'}
+    assert chunked.select(selection).value_counts('GenHealth').to_dict() == cube.select(selection).value_counts('GenHealth').to_dict()
+
+
+def test_dashboards_are_built_on_first_access_or_warm_up():
+    from flask import Flask
+    from app_module.routes.dash_mount import mount_dashboards
+
+    app = Flask(__name__)
+    app.add_url_rule('/ping', 'ping', lambda: 'pong')
+    mount = mount_dashboards(app)
+    client = app.test_client()
+
+    assert client.get('/ping').data == b'pong'
+    assert not mount.loaded  # démarrage sans Dash
+
+    assert client.get('/dashboard/').status_code == 200
+    assert mount.loaded
+    server = mount.load()
+    assert client.get('/dashboard/live/_dash-layout').status_code == 200
+    assert client.get('/dashboards').status_code == 404  # hors préfixe: application principale
+
+    other = mount_dashboards(Flask(__name__))
+    other.warm_up().join()
+    assert other.loaded and other.load() is not server
+
+
+def test_stratified_sample_keeps_class_proportions():
+    from app_module.utils.importance import stratified_sample
+
+    df = pd.DataFrame({'SkinCancer': ['Yes'] * 100 + ['No'] * 900, 'BMI': np.arange(1000.0)})
+    sample = stratified_sample(df, 100)
+
+    assert len(sample) == 100
+    assert (sample['SkinCancer'] == 'Yes').sum() == 10
+    # Graine fixe: même échantillon d'un calcul à l'autre
+    pd.testing.assert_frame_equal(sample, stratified_sample(df, 100))
+
+
+def test_importance_endpoint_serves_versioned_artifact(tmp_path, monkeypatch):
+    import json
+    from flask import Flask
+    from app_module.config.settings import Config
+    from app_module.routes.models import models_bp
+    from app_module.utils.importance import IMPORTANCE_INDEX
+
+    monkeypatch.setattr(Config, 'IMPORTANCE_DIR', str(tmp_path))
+    artifact = {'model': 'knn', 'sample_size': 1000, 'created_at': '2026-01-01T00:00:00Z',
+                'features': [{'feature': 'AgeCategory', 'importance': 0.12}, {'feature': 'BMI', 'importance': 0.03}]}
+    (tmp_path / 'knn-aaaa-bbbb.json').write_text(json.dumps(artifact))
+    (tmp_path / IMPORTANCE_INDEX).write_text(json.dumps({'models': {'knn': {'file': 'knn-aaaa-bbbb.json'}}}))
+
+    app = Flask(__name__)
+    app.register_blueprint(models_bp)
+    client = app.test_client()
+
+    response = client.get('/api/models/knn/importance')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert data['features'][0] == {'feature': 'AgeCategory', 'importance': 0.12}
+    assert data['version'] == 'knn-aaaa-bbbb'
+    assert client.get('/api/models/knn/importance', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    assert client.get('/api/models/log_reg/importance').status_code == 404
+    assert client.get('/api/models/unknown/importance').status_code == 404
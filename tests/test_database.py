@@ -0,0 +1,324 @@
+import os
+import threading
+import pytest
+from app_module.utils import database
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    instance = database.TestDatabase(str(tmp_path / 'tests.db'))
+    yield instance
+    instance.close()
+
+
+def test_connection_is_persistent_per_thread_and_uses_wal(test_db):
+    conn = test_db.get_connection()
+    assert test_db.get_connection() is conn
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(test_db.get_connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+
+
+def test_save_and_read_back(test_db):
+    test_id = test_db.save_test('log_reg', 1, 0.8, {'BMI': 31.0}, explanation={'top_features': []})
+    test = test_db.get_test_by_id(test_id)
+    assert test['input_features'] == {'BMI': 31.0}
+    assert test['explanation'] == {'top_features': []}
+    assert test_db.get_test_count() == 1
+    assert test_db.get_risk_count() == 1
+
+
+def test_close_releases_connections(test_db):
+    conn = test_db.get_connection()
+    test_db.close()
+    with pytest.raises(database.sqlite3.ProgrammingError):
+        conn.execute('SELECT 1')
+    # Une nouvelle connexion est ouverte à la demande
+    assert test_db.get_test_count() == 0
+
+
+def test_write_behind_batches_concurrent_inserts(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    batched = database.TestDatabase(str(tmp_path / 'batched.db'), write_behind=True)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = list(pool.map(lambda i: batched.save_test('knn', i % 2, 0.5, {'i': i}), range(50)))
+        future = batched.save_test_async('knn', 1, 0.9, {'i': 50})
+        ids.append(future.result(timeout=5))
+    finally:
+        batched.close()
+
+    assert sorted(ids) == list(range(1, 52))
+    assert batched.get_test_by_id(ids[10])['input_features'] == {'i': 10}
+    assert batched.get_test_count() == 51
+
+
+def _seed(test_db, count):
+    conn = test_db.get_connection()
+    with conn:
+        conn.executemany(
+            'INSERT INTO tests (timestamp, model_used, prediction, probability, input_features) VALUES (?, ?, ?, ?, ?)',
+            [(f'2025-01-{1 + i % 28:02d} 10:00:00', 'knn' if i % 2 else 'log_reg', i % 3 == 0, 0.5, '{}')
+             for i in range(count)]
+        )
+
+
+def test_keyset_pagination_walks_forward_and_back(test_db):
+    _seed(test_db, 45)
+
+    seen, cursor = [], None
+    pages = []
+    while True:
+        page = test_db.get_tests_page(limit=10, cursor=cursor)
+        pages.append(page)
+        seen.extend(t['id'] for t in page['tests'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(seen) == 45 and len(set(seen)) == 45
+    assert pages[0]['prev_cursor'] is None
+    keys = [(t['timestamp'], t['id']) for p in pages for t in p['tests']]
+    assert keys == sorted(keys, reverse=True)
+
+    back = test_db.get_tests_page(limit=10, cursor=pages[2]['prev_cursor'], direction='prev')
+    assert [t['id'] for t in back['tests']] == [t['id'] for t in pages[1]['tests']]
+    assert back['next_cursor'] is not None and back['prev_cursor'] is not None
+
+
+def test_filters_use_indexes(test_db):
+    _seed(test_db, 30)
+    page = test_db.get_tests_page(limit=50, model='knn', prediction=1, date_from='2025-01-05', date_to='2025-01-10')
+    assert page['tests']
+    for test in page['tests']:
+        assert test['model_used'] == 'knn' and test['prediction'] == 1
+        assert '2025-01-05' <= test['timestamp'] < '2025-01-11'
+
+    plan = ' '.join(row[3] for row in test_db.get_connection().execute(
+        'EXPLAIN QUERY PLAN SELECT * FROM tests WHERE model_used = ? ORDER BY timestamp DESC, id DESC LIMIT 10',
+        ('knn',)))
+    assert 'idx_tests_model_timestamp' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_admin_list_renders_filters_and_cursor_links(test_db, monkeypatch):
+    import os
+    from flask import Flask
+    from app_module.routes import admin
+
+    _seed(test_db, 90)
+    monkeypatch.setattr(database, '_db', test_db)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    app = Flask(__name__, template_folder=os.path.join(root, 'templates'), static_folder=os.path.join(root, 'static'))
+    app.secret_key = 'test'
+    app.register_blueprint(admin.admin_bp)
+
+    with app.test_client() as client:
+        with client.session_transaction() as session:
+            session['admin_logged_in'] = True
+        html = client.get('/admin/tests?model=knn&outcome=0').get_data(as_text=True)
+        assert 'cursor=' in html and 'model=knn' in html
+        data = client.get('/admin/api/tests?limit=5').get_json()
+        assert len(data['tests']) == 5 and data['next_cursor']
+
+
+def test_summary_counters_follow_inserts_and_rebuild(test_db):
+    _seed(test_db, 30)
+    test_db.save_test('knn', 1, 0.9, {})
+    conn = test_db.get_connection()
+
+    assert test_db.get_test_count() == 31
+    assert test_db.get_risk_count() == conn.execute('SELECT COUNT(*) FROM tests WHERE prediction = 1').fetchone()[0]
+    summary = test_db.get_summary()
+    assert summary['by_model']['knn']['total'] == 16
+    assert sum(row['count'] for row in test_db.get_daily_counts()) == 31
+
+    with conn:
+        conn.execute("UPDATE tests SET prediction = 1 WHERE prediction = 0")
+    assert test_db.get_risk_count() == 31
+
+    with conn:
+        conn.execute("UPDATE tests_summary SET count = 999")
+    assert test_db.rebuild_summary() == 31
+    assert test_db.get_risk_count() == 31
+
+
+SAMPLE_FEATURES = {
+    'HeartDisease': 'No', 'BMI': 27.5, 'Smoking': 'Yes', 'AlcoholDrinking': 'No', 'Stroke': 'No',
+    'PhysicalHealth': 3.0, 'MentalHealth': 0.0, 'DiffWalking': 'No', 'Sex': 'Female',
+    'AgeCategory': '55-59', 'Race': 'White', 'Diabetic': 'No, borderline diabetes',
+    'PhysicalActivity': 'Yes', 'GenHealth': 'Very good', 'SleepTime': 7.0, 'Asthma': 'No',
+    'KidneyDisease': 'No',
+}
+
+
+def _sample_explanation():
+    items = [{'feature': name, 'shap_value': (i - 8) / 100} for i, name in enumerate(reversed(list(SAMPLE_FEATURES)))]
+    return {'base_value': 0.12, 'top_features': items[:10], 'all_features': items}
+
+
+def test_compact_storage_round_trips_and_migrates(test_db):
+    from app_module.utils import codec
+
+    json_id = test_db.save_test('log_reg', 0, 0.2, SAMPLE_FEATURES, explanation=_sample_explanation())
+    test_db.compact = True
+    compact_id = test_db.save_test('log_reg', 1, 0.7, SAMPLE_FEATURES, explanation=_sample_explanation())
+
+    raw = test_db.get_connection().execute('SELECT input_features, explanation FROM tests WHERE id = ?',
+                                           (compact_id,)).fetchone()
+    assert isinstance(raw['input_features'], bytes) and len(raw['input_features']) < 64
+    assert codec.encode_features({'BMI': 1.0}, compact=True) == '{"BMI": 1.0}'
+
+    for test_id in (json_id, compact_id):
+        test = test_db.get_test_by_id(test_id)
+        assert test['input_features'] == SAMPLE_FEATURES
+        decoded = test['explanation']['all_features']
+        for got, expected in zip(decoded, _sample_explanation()['all_features']):
+            assert got['feature'] == expected['feature']
+            assert got['shap_value'] == pytest.approx(expected['shap_value'], abs=1e-5)
+
+    assert test_db.recode_storage(compact=True) == 1
+    assert test_db.recode_storage(compact=True) == 0
+    assert test_db.recode_storage(compact=False) == 2
+    assert test_db.get_test_by_id(compact_id)['input_features'] == SAMPLE_FEATURES
+
+
+def test_list_queries_skip_explanation(test_db):
+    test_db.save_test('knn', 1, 0.9, SAMPLE_FEATURES, explanation=_sample_explanation())
+    listed = test_db.get_tests_page(limit=10)['tests'][0]
+    assert 'explanation' not in listed
+    assert listed['input_features'] == SAMPLE_FEATURES
+    assert 'explanation' not in test_db.get_all_tests()[0]
+
+
+def test_migrations_run_once_and_upgrade_legacy_schema(tmp_path):
+    import sqlite3
+    from app_module.utils import migrations
+
+    path = str(tmp_path / 'legacy.db')
+    legacy = sqlite3.connect(path)
+    legacy.execute('''
+        CREATE TABLE tests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            model_used TEXT NOT NULL,
+            prediction INTEGER NOT NULL,
+            probability REAL NOT NULL,
+            input_features TEXT NOT NULL,
+            explanation TEXT
+        )
+    ''')
+    legacy.execute("INSERT INTO tests (model_used, prediction, probability, input_features) VALUES ('knn', 1, 0.9, '{}')")
+    legacy.commit()
+    legacy.close()
+
+    upgraded = database.TestDatabase(path)
+    try:
+        conn = upgraded.get_connection()
+        assert migrations.schema_version(conn) == migrations.SCHEMA_VERSION
+        assert migrations.column_exists(conn.cursor(), 'tests', 'user_ip')
+        assert upgraded.get_risk_count() == 1
+
+        statements = []
+        conn.set_trace_callback(statements.append)
+        assert upgraded.init_database() == migrations.SCHEMA_VERSION
+        conn.set_trace_callback(None)
+        assert statements == ['PRAGMA user_version']
+    finally:
+        upgraded.close()
+
+
+def test_shared_instance_is_created_lazily(monkeypatch, tmp_path):
+    monkeypatch.setattr(database.Config, 'BASE_DIR', str(tmp_path))
+    monkeypatch.setattr(database, '_db', None)
+    assert not (tmp_path / 'data' / 'tests.db').exists()
+    shared = database.get_db()
+    assert database.db is shared and database.get_db() is shared
+    assert (tmp_path / 'data' / 'tests.db').exists()
+    shared.close()
+
+
+def test_export_streams_filtered_csv_in_chunks(test_db, monkeypatch):
+    import csv
+    import io
+    from flask import Flask
+    from app_module.routes import admin
+    from app_module.utils.export import EXPORT_COLUMNS, export_tests
+
+    for i in range(7):
+        test_db.save_test('knn' if i % 2 else 'log_reg', i % 2, 0.5, SAMPLE_FEATURES)
+
+    parts = list(export_tests(test_db, fmt='csv', chunk_size=2, model='knn'))
+    assert len(parts) == 1 + 2  # en-tête + 3 tests knn par lots de 2
+    rows = list(csv.DictReader(io.StringIO(''.join(parts))))
+    assert [row['id'] for row in rows] == ['2', '4', '6']
+    assert list(rows[0]) == EXPORT_COLUMNS
+    assert rows[0]['AgeCategory'] == '55-59' and float(rows[0]['BMI']) == 27.5
+
+    monkeypatch.setattr(database, '_db', test_db)
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.register_blueprint(admin.admin_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin_logged_in'] = True
+    response = client.get('/admin/export?format=csv&outcome=0')
+    assert response.is_streamed
+    assert 'attachment' in response.headers['Content-Disposition']
+    assert response.get_data(as_text=True).count('\n') == 1 + 4
+    assert client.get('/admin/export?format=xls').status_code == 400
+
+
+def test_backend_selection(monkeypatch):
+    from app_module.utils.storage import TestStorage
+
+    assert issubclass(database.TestDatabase, TestStorage)
+    monkeypatch.setattr(database.Config, 'DB_BACKEND', 'oracle')
+    with pytest.raises(ValueError):
+        database.create_storage()
+
+
+def test_archive_moves_old_tests_to_monthly_files(test_db):
+    conn = test_db.get_connection()
+    with conn:
+        for i, timestamp in enumerate(['2024-01-05 10:00:00', '2024-01-20 10:00:00', '2024-02-03 10:00:00']):
+            conn.execute(
+                "INSERT INTO tests (timestamp, model_used, prediction, probability, input_features, certificate_path) "
+                "VALUES (?, 'knn', ?, 0.5, '{}', ?)", (timestamp, i % 2, f'certificates/old{i}.png')
+            )
+    for i in range(5):
+        test_db.save_test('log_reg', 0, 0.2, {'i': i})
+
+    assert test_db.archive_tests(older_than_days=30, dry_run=True)['archived'] == 3
+    stats = test_db.archive_tests(older_than_days=30, batch_size=2)
+    assert stats['archived'] == 3 and stats['months'] == ['2024-01', '2024-02']
+    assert sorted(os.listdir(test_db.archive_dir)) == ['tests-2024-01.db', 'tests-2024-02.db']
+
+    assert conn.execute('SELECT COUNT(*) FROM tests').fetchone()[0] == 5
+    assert test_db.get_test_count() == 8  # compteurs cumulés
+    assert test_db.rebuild_summary() == 8
+
+    assert test_db.get_test_by_id(1) is None
+    assert test_db.get_test_by_id(1, include_archive=True)['timestamp'] == '2024-01-05 10:00:00'
+    assert len(test_db.get_tests_page(limit=20)['tests']) == 5
+
+    seen, cursor = [], None
+    while True:
+        page = test_db.get_tests_page(limit=3, cursor=cursor, include_archive=True)
+        seen.extend(test['id'] for test in page['tests'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert seen[-3:] == [3, 2, 1] and len(seen) == 8
+    back = test_db.get_tests_page(limit=3, cursor=page['prev_cursor'], direction='prev', include_archive=True)
+    assert [test['id'] for test in back['tests']] == seen[-5:-2]
+
+    exported = [test['id'] for chunk in test_db.iter_tests(chunk_size=2, include_archive=True) for test in chunk]
+    assert exported == list(range(1, 9))
+    assert test_db.get_referenced_certificate_paths(['certificates/old0.png']) == {'certificates/old0.png'}
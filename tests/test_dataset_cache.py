@@ -0,0 +1,228 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from app_module.utils import dataset_cache
+
+
+def _write_csv(path, rows=50, smoking='Yes'):
+    df = pd.DataFrame({
+        'HeartDisease': ['No', 'Yes'] * (rows // 2),
+        'BMI': np.linspace(18.0, 40.0, rows),
+        'Smoking': [smoking] * rows,
+        'SleepTime': np.arange(rows) % 12,
+    })
+    df.to_csv(path, index=False)
+    return df
+
+
+def test_cache_round_trips_with_categorical_dtypes(tmp_path):
+    csv_path = str(tmp_path / 'dataset.csv')
+    cache_dir = str(tmp_path / 'cache')
+    _write_csv(csv_path)
+
+    meta = dataset_cache.ensure_dataset_cache(csv_path, cache_dir)
+    frame = dataset_cache.load_cached_frame(cache_dir, meta)
+
+    assert meta['rows'] == 50
+    assert str(frame['Smoking'].dtype) == 'category'
+    # Colonnes numériques lues en mémoire mappée
+    assert not frame['BMI'].to_numpy().flags.writeable
+    expected = pd.read_csv(csv_path)
+    pd.testing.assert_frame_equal(frame.astype({'HeartDisease': object, 'Smoking': object}), expected,
+                                  check_dtype=False)
+
+
+def test_cache_is_reused_then_rebuilt_when_csv_changes(tmp_path):
+    csv_path = str(tmp_path / 'dataset.csv')
+    cache_dir = str(tmp_path / 'cache')
+    _write_csv(csv_path)
+
+    first = dataset_cache.ensure_dataset_cache(csv_path, cache_dir)
+    # Fichier touché sans changement: même version, pas de reconstruction
+    os.utime(csv_path, ns=(first['mtime_ns'] + 10 ** 9, first['mtime_ns'] + 10 ** 9))
+    touched = dataset_cache.ensure_dataset_cache(csv_path, cache_dir)
+    assert touched['directory'] == first['directory']
+
+    _write_csv(csv_path, smoking='No')
+    rebuilt = dataset_cache.ensure_dataset_cache(csv_path, cache_dir)
+    assert rebuilt['sha256'] != first['sha256']
+    assert not os.path.exists(os.path.join(cache_dir, first['directory']))
+
+    frame = dataset_cache.get_dataset_frame(csv_path, cache_dir)
+    assert list(frame['Smoking'].cat.categories) == ['No']
+    assert dataset_cache.get_dataset_frame(csv_path, cache_dir) is frame
+
+
+def test_chunked_build_renumbers_categories_found_in_later_chunks(tmp_path):
+    csv_path = str(tmp_path / 'dataset.csv')
+    cache_dir = str(tmp_path / 'cache')
+    df = _write_csv(csv_path, rows=50)
+    df.loc[40:, 'Smoking'] = 'Former'
+    df.loc[45, 'Smoking'] = None
+    df.loc[47, 'BMI'] = np.nan
+    df.to_csv(csv_path, index=False)
+
+    meta = dataset_cache.build_dataset_cache(csv_path, cache_dir, chunk_rows=16)
+    frame = dataset_cache.load_cached_frame(cache_dir, meta)
+
+    assert meta['rows'] == 50
+    assert list(frame['Smoking'].cat.categories) == ['Former', 'Yes']
+    assert frame['Smoking'].cat.codes.dtype == np.int8
+    assert frame['Smoking'].isna().sum() == 1 and np.isnan(frame['BMI'][47])
+    assert not [name for name in os.listdir(os.path.join(cache_dir, meta['directory'])) if not name.endswith('.npy')]
+
+    chunks = list(dataset_cache.iter_cached_frames(cache_dir, meta, ['Smoking', 'BMI'], chunk_rows=20))
+    assert [len(chunk) for chunk in chunks] == [20, 20, 10]
+    pd.testing.assert_frame_equal(pd.concat(chunks), frame[['BMI', 'Smoking']])
+
+
+def _train_pipeline(df, path, C=1.0):
+    import joblib
+    from sklearn.compose import ColumnTransformer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+    from app_module.utils.codec import FEATURE_SCHEMA
+
+    categorical = [name for name, values in FEATURE_SCHEMA if values is not None]
+    pipeline = Pipeline([
+        ('prep', ColumnTransformer([('cat', OneHotEncoder(handle_unknown='ignore'), categorical)],
+                                   remainder='passthrough')),
+        ('clf', LogisticRegression(C=C, max_iter=500)),
+    ])
+    features = [name for name, _ in FEATURE_SCHEMA]
+    pipeline.fit(df[features], df['SkinCancer'])
+    joblib.dump(pipeline, path)
+    return pipeline
+
+
+def test_scoring_writes_float32_columns_and_rescores_changed_models_only(tmp_path):
+    from app_module.config.settings import Config
+    from app_module.utils import scoring
+    from app_module.utils.codec import FEATURE_NAMES
+
+    csv_path = str(tmp_path / 'dataset.csv')
+    cache_dir = str(tmp_path / 'cache')
+    df = pd.read_csv(Config.DATASET_PATH, nrows=600)
+    df.to_csv(csv_path, index=False)
+    paths = {'a': str(tmp_path / 'a.pkl'), 'b': str(tmp_path / 'b.pkl')}
+    pipeline = _train_pipeline(df, paths['a'])
+    _train_pipeline(df, paths['b'], C=0.1)
+
+    result = scoring.score_dataset(paths, csv_path, cache_dir, workers=2, chunk_rows=128)
+    assert result == {'rows': 600, 'scored': ['a', 'b'], 'skipped': []}
+
+    meta = dataset_cache.ensure_dataset_cache(csv_path, cache_dir)
+
+    def checksums():
+        return {name: dataset_cache.file_checksum(path) for name, path in paths.items()}
+
+    scores = scoring.load_scores(meta, cache_dir, checksums())
+    assert scores['a'].dtype == np.float32 and len(scores['a']) == 600
+    expected = pipeline.predict_proba(df[FEATURE_NAMES])[:, 1]
+    assert np.allclose(scores['a'], expected, atol=1e-6)
+    # Modèles inconnus du registre: pas de somme à comparer, colonnes ignorées
+    assert scoring.load_scores(meta, cache_dir) == {}
+
+    assert scoring.score_dataset(paths, csv_path, cache_dir, workers=2, chunk_rows=128)['scored'] == []
+    _train_pipeline(df, paths['b'], C=10.0)
+    # Fichier remplacé: l'ancienne colonne n'est plus affichée sous ce nom
+    assert list(scoring.load_scores(meta, cache_dir, checksums())) == ['a']
+    assert scoring.score_dataset(paths, csv_path, cache_dir, workers=2, chunk_rows=128)['scored'] == ['b']
+    assert list(scoring.load_scores(meta, cache_dir, checksums())) == ['a', 'b']
+    assert len(os.listdir(scoring.scores_dir(cache_dir))) == 3  # a, b et scores.json
+
+
+def test_scores_survive_a_rebuild_of_the_same_csv(tmp_path):
+    from app_module.config.settings import Config
+    from app_module.utils import scoring
+
+    csv_path = str(tmp_path / 'dataset.csv')
+    cache_dir = str(tmp_path / 'cache')
+    df = pd.read_csv(Config.DATASET_PATH, nrows=200)
+    df.to_csv(csv_path, index=False)
+    paths = {'a': str(tmp_path / 'a.pkl')}
+    _train_pipeline(df, paths['a'])
+    scoring.score_dataset(paths, csv_path, cache_dir, workers=1)
+
+    # Équivalent de `flask dataset build-cache --force`: même CSV, même version
+    meta = dataset_cache.build_dataset_cache(csv_path, cache_dir)
+    assert os.path.isdir(scoring.scores_dir(cache_dir))
+    assert list(scoring.load_scores(meta, cache_dir, {'a': dataset_cache.file_checksum(paths['a'])})) == ['a']
+
+
+def test_importance_merges_batches_into_versioned_artifacts(tmp_path, monkeypatch):
+    from app_module.config.settings import Config
+    from app_module.utils import importance
+
+    csv_path = str(tmp_path / 'dataset.csv')
+    cache_dir = str(tmp_path / 'cache')
+    directory = str(tmp_path / 'importance')
+    df = pd.read_csv(Config.DATASET_PATH, nrows=600)
+    df.to_csv(csv_path, index=False)
+    paths = {'a': str(tmp_path / 'a.pkl'), 'b': str(tmp_path / 'b.pkl')}
+    _train_pipeline(df, paths['a'])
+    _train_pipeline(df, paths['b'], C=0.1)
+
+    # Valeurs SHAP déterministes (shap n'est pas requis ici): les processus forkés héritent du remplacement
+    def fake_shap_values(model, rows, background):
+        values = np.column_stack([np.ones(len(rows)), -np.ones(len(rows)), rows['BMI'].to_numpy() / 100])
+        return values, {0: 'Sex', 1: 'Sex', 2: 'BMI'}
+
+    monkeypatch.setattr(importance, '_shap_values', fake_shap_values)
+    result = importance.compute_importance(paths, csv_path, cache_dir, directory, sample_size=200, workers=3)
+    assert result == {'sample_size': 200, 'computed': ['a', 'b'], 'skipped': []}
+
+    artifact = importance.load_importance('a', directory)
+    sample = importance.stratified_sample(dataset_cache.get_dataset_frame(csv_path, cache_dir), 200)
+    assert artifact['sample_size'] == 200
+    # Moyenne sur tout l'échantillon, quel que soit le découpage en lots
+    assert artifact['features'][0] == {'feature': 'Sex', 'importance': 2.0}
+    assert artifact['features'][1]['importance'] == round(float(sample['BMI'].mean() / 100), 6)
+    assert artifact['version'].startswith(f"a-{dataset_cache.file_checksum(paths['a'])[:12]}-")
+
+    assert importance.compute_importance(paths, csv_path, cache_dir, directory, sample_size=200, workers=3)['computed'] == []
+    _train_pipeline(df, paths['b'], C=10.0)
+    assert importance.compute_importance(paths, csv_path, cache_dir, directory, sample_size=200, workers=3)['computed'] == ['b']
+    assert len(os.listdir(directory)) == 3  # a, b et importance.json
+
+
+def test_batch_shap_values_are_on_probability_scale_for_tree_models():
+    pytest.importorskip('shap')
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+    from app_module.utils.xai import batch_shap_values
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'Sex': rng.choice(['Female', 'Male'], 300), 'BMI': rng.uniform(15, 45, 300)})
+    target = ((df['BMI'] > 30) | (df['Sex'] == 'Male')).astype(int)
+    pipeline = Pipeline([
+        ('preprocess', ColumnTransformer([('cat', OneHotEncoder(), ['Sex'])], remainder='passthrough')),
+        ('clf', GradientBoostingClassifier(n_estimators=20, random_state=0)),
+    ]).fit(df, target)
+
+    values, mapping = batch_shap_values(pipeline, df.iloc[:20], df.iloc[20:120])
+    assert values.shape == (20, 3) and set(mapping.values()) == {'Sex', 'BMI'}
+    # Probabilités (et non log-odds): une contribution totale ne dépasse jamais 1
+    assert np.all(np.abs(values).sum(axis=1) <= 1.0)
+
+
+def test_concurrent_builds_of_the_same_csv_do_not_clobber_each_other(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    csv_path = str(tmp_path / 'dataset.csv')
+    cache_dir = str(tmp_path / 'cache')
+    _write_csv(csv_path, rows=2000)
+
+    # Même répertoire de version, fichiers bruts distincts pour chaque constructeur
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        metas = list(pool.map(lambda _: dataset_cache.build_dataset_cache(csv_path, cache_dir, chunk_rows=50),
+                              range(4)))
+
+    assert all(meta['rows'] == 2000 for meta in metas)
+    frame = dataset_cache.load_cached_frame(cache_dir, dataset_cache.read_meta(cache_dir))
+    assert frame['BMI'].tolist() == pd.read_csv(csv_path)['BMI'].tolist()
+    assert not [name for name in os.listdir(os.path.join(cache_dir, metas[0]['directory'])) if not name.endswith('.npy')]
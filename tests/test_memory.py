@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import joblib
+import numpy as np
+import pytest
+from app_module.config.settings import Config
+from app_module.utils import memory
+from app_module.utils.models import load_model
+
+pytestmark = pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup'), reason='/proc/smaps_rollup requis')
+
+
+def test_memory_report_covers_master_and_children():
+    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        report = memory.memory_report(os.getpid())
+    finally:
+        child.kill()
+        child.wait()
+
+    roles = {p['pid']: p['role'] for p in report['processes']}
+    assert roles[os.getpid()] == 'master'
+    assert roles[child.pid] == 'worker'
+    assert report['total_rss_kb'] >= report['total_pss_kb'] > 0
+    assert report['saved_kb'] == report['total_rss_kb'] - report['total_pss_kb']
+
+
+def test_models_are_memory_mapped(tmp_path, monkeypatch):
+    path = str(tmp_path / 'model.pkl')
+    joblib.dump({'fit_X': np.arange(1000, dtype=np.float64)}, path)
+
+    monkeypatch.setattr(Config, 'MODEL_MMAP_MODE', 'r')
+    assert isinstance(load_model(path)['fit_X'], np.memmap)
+
+    monkeypatch.setattr(Config, 'MODEL_MMAP_MODE', '')
+    assert not isinstance(load_model(path)['fit_X'], np.memmap)
+
+
+def test_registry_loads_each_model_once_on_first_use(tmp_path):
+    from app_module.utils.dataset_cache import file_checksum
+    from app_module.utils.models import ModelRegistry
+
+    path = str(tmp_path / 'model.pkl')
+    joblib.dump({'coef': np.ones(10)}, path)
+    registry = ModelRegistry({'log_reg': path, 'knn': str(tmp_path / 'missing.pkl')})
+
+    assert registry.loaded() == []
+    assert registry.available() == ['log_reg']
+    assert registry.checksum('log_reg') == file_checksum(path) and registry.checksum('knn') is None
+    model = registry['log_reg']
+    assert registry.get('log_reg') is model
+    assert registry.get('knn') is None and registry.get('unknown') is None
+    assert registry.load_all() == {'log_reg': model}
+
+    info = registry.info()
+    assert info['log_reg']['loaded'] and info['log_reg']['sha256'] == file_checksum(path)
+    assert info['log_reg']['load_seconds'] >= 0
+    assert not info['knn']['available']
+
+
+def test_health_does_not_expose_model_paths(tmp_path, monkeypatch):
+    from flask import Flask
+    from app_module.routes import health_bp
+    from app_module.utils.models import ModelRegistry
+
+    path = str(tmp_path / 'model.pkl')
+    joblib.dump({'coef': np.ones(10)}, path)
+    registry = ModelRegistry({'log_reg': path})
+    registry.load_all()
+    monkeypatch.setattr('app_module.routes.registry', registry)
+
+    app = Flask(__name__)
+    app.register_blueprint(health_bp)
+    response = app.test_client().get('/api/health')
+
+    assert response.status_code == 200
+    assert set(response.get_json()['data']['models']['log_reg']) == {'loaded', 'sha256', 'load_seconds'}
+    assert str(tmp_path) not in response.get_data(as_text=True)